@@ -7,7 +7,7 @@ import uuid
 from pathlib import Path
 
 import anyio
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, HTTPException, UploadFile
 from fastapi.responses import FileResponse
 from openpyxl import load_workbook
 from openpyxl.workbook.defined_name import DefinedName
@@ -16,10 +16,17 @@ from pydantic import BaseModel
 from app.auth.session import get_current_user
 from app.config import BASE_DIR, get_config
 from app.services.structure_analyzer import detect_xlsx_structure
-from app.services import project_manager
+from app.services import corpus_qa, job_queue, project_manager
+from app.services.timeline import load_timeline
 from app.services.reference_selector import score_corpus_entries
-from app.services.response_generator import run_generation
+from app.services.response_generator import (
+    has_full_generation,
+    load_saved_responses,
+    run_generation,
+    run_regeneration,
+)
 from app.services.anonymizer import (
+    anonymization_options,
     anonymize_docx,
     anonymize_xlsx,
     extract_metadata,
@@ -385,7 +392,9 @@ async def anonymize_project(
     map_path = PROJECTS_DIR / project_id / "anonymized_map.json"
 
     mapping = await anyio.to_thread.run_sync(
-        lambda: anonymize_xlsx(working_path, anonymized_path, raw_mapping)
+        lambda: anonymize_xlsx(
+            working_path, anonymized_path, raw_mapping, **anonymization_options(get_config())
+        )
     )
 
     map_path.write_text(json.dumps(mapping, ensure_ascii=False, indent=2), encoding="utf-8")
@@ -662,6 +671,7 @@ async def save_corpus_structure(
     structure_path.write_text(
         json.dumps(body.model_dump(), ensure_ascii=False, indent=2), encoding="utf-8"
     )
+    await anyio.to_thread.run_sync(lambda: corpus_qa.build_qa_artifact(corpus_id))
     logger.info("Structure saved for corpus %s by %s", corpus_id, user["email"])
     return {"status": "ok"}
 
@@ -738,6 +748,7 @@ async def save_corpus_metadata(
         })
 
     meta_path.write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+    await anyio.to_thread.run_sync(lambda: corpus_qa.build_qa_artifact(corpus_id))
     logger.info("Corpus %s metadata saved by %s", corpus_id, user["email"])
     return {"status": "ok"}
 
@@ -856,7 +867,9 @@ async def corpus_anonymize(
 
     if fmt == "xlsx":
         mapping = await anyio.to_thread.run_sync(
-            lambda: anonymize_xlsx(original_path, anonymized_path, raw_mapping)
+            lambda: anonymize_xlsx(
+                original_path, anonymized_path, raw_mapping, **anonymization_options(get_config())
+            )
         )
     else:
         mapping = await anyio.to_thread.run_sync(
@@ -875,6 +888,8 @@ async def corpus_anonymize(
         )
         logger.info("Corpus %s — contract anonymized (%d keywords)", corpus_id, len(raw_mapping))
 
+    await anyio.to_thread.run_sync(lambda: corpus_qa.build_qa_artifact(corpus_id))
+
     logger.info(
         "Corpus %s anonymized by %s — %d keywords", corpus_id, user["email"], len(mapping)
     )
@@ -1092,6 +1107,7 @@ async def get_corpus_selection(
             "date_remplissage": e.get("date_remplissage", ""),
             "expertise_atlassian": e.get("expertise_atlassian"),
             "poste_travail": e.get("poste_travail", ""),
+            "nb_questions": corpus_qa.qa_count(e["corpus_id"]),
             "score": e["score"],
         }
         for e in scored
@@ -1168,23 +1184,83 @@ async def download_anonymized(
 # ---------------------------------------------------------------------------
 
 
+class GenerateRequest(BaseModel):
+    mode: str = "interactive"
+
+
+def _enqueue_generation(
+    project_id: str, proj: dict, user: dict, fn, *args, priority: int, checkpoint: dict, **kwargs
+) -> int:
+    """Mark a project as generating and queue its job.
+
+    A "queued" checkpoint is written first, so that a job still waiting when the
+    server restarts is submitted again at startup (see resume_generation)
+    instead of being failed; the job replaces it when it starts.
+
+    Args:
+        project_id: UUID of the project.
+        proj: Project metadata before the request (restored if the job is refused).
+        user: The authenticated user.
+        fn: Job function (run_generation or run_regeneration).
+        priority: job_queue.PRIORITY_INTERACTIVE or PRIORITY_BULK.
+        checkpoint: Job description ("kind" and the arguments needed to run it again).
+
+    Returns:
+        1-based position of the job in the queue.
+
+    Raises:
+        HTTPException: 503 if the queue is full, 409 if a job is already queued.
+    """
+    # Status first: the job may start (and report progress) as soon as it is queued
+    project_manager.update_project(
+        project_id,
+        status="generating",
+        progress_step="En file d'attente...",
+        progress_done=None,
+        progress_total=None,
+        error_message=None,
+    )
+    project_manager.save_checkpoint(project_id, {"done": None, "resume_count": 0, "queued": True, **checkpoint})
+    try:
+        return job_queue.get_queue().submit(
+            project_id, user["email"], fn, project_id, *args, priority=priority, **kwargs
+        )
+    except (job_queue.QueueFullError, ValueError) as exc:
+        if isinstance(exc, job_queue.QueueFullError):
+            # A ValueError means the project's job is already queued: keep its checkpoint
+            project_manager.clear_checkpoint(project_id)
+        project_manager.update_project(
+            project_id,
+            status=proj.get("status"),
+            progress_step=proj.get("progress_step"),
+            error_message=proj.get("error_message"),
+        )
+        if isinstance(exc, ValueError):
+            raise HTTPException(status_code=409, detail="Une génération est déjà en cours pour ce projet.")
+        raise HTTPException(status_code=503, detail=str(exc))
+
+
 @router.post("/projects/{project_id}/generate", status_code=202)
 async def start_generation(
     project_id: str,
-    background_tasks: BackgroundTasks,
+    body: GenerateRequest | None = None,
     user: dict = Depends(get_current_user),
 ) -> dict:
-    """Trigger response generation as a background task.
+    """Queue response generation (see job_queue for the scheduling policy).
 
-    Allowed from statuses: corpus_selected, completed, error (allows re-generation).
+    Allowed from statuses: corpus_selected, completed, error, cancelled (allows re-generation).
 
     Args:
         project_id: UUID of the project.
-        background_tasks: FastAPI background task queue.
+        body: Optional generation mode: "interactive" (default) or "batch"
+            (Message Batches API — slower, cheaper, for non-interactive runs).
         user: The authenticated user (injected by dependency).
 
     Returns:
-        {"status": "generating"}
+        {"status": "generating", "mode": str, "queue_position": int}
+
+    Raises:
+        HTTPException: 503 if the generation queue is full.
     """
     try:
         proj = project_manager.load_project(project_id)
@@ -1194,22 +1270,165 @@ async def start_generation(
     if proj.get("user_email") != user["email"]:
         raise HTTPException(status_code=403, detail="Accès refusé.")
 
-    allowed = {"corpus_selected", "completed", "error"}
+    allowed = {"corpus_selected", "completed", "error", "cancelled"}
     if proj.get("status") not in allowed:
         raise HTTPException(
             status_code=400,
             detail="Le projet n'est pas dans un état permettant la génération.",
         )
 
-    project_manager.update_project(
-        project_id,
-        status="generating",
-        progress_step="Démarrage...",
-        error_message=None,
+    mode = body.mode if body else "interactive"
+    if mode not in {"interactive", "batch"}:
+        raise HTTPException(status_code=400, detail="Mode de génération inconnu.")
+
+    # Batch mode is asynchronous by nature: it yields to interactive generations
+    priority = job_queue.PRIORITY_BULK if mode == "batch" else job_queue.PRIORITY_INTERACTIVE
+    position = _enqueue_generation(
+        project_id, proj, user, run_generation, priority=priority, mode=mode,
+        checkpoint={"kind": "generation", "mode": mode},
     )
-    background_tasks.add_task(run_generation, project_id)
-    logger.info("Generation started for project %s by %s", project_id, user["email"])
-    return {"status": "generating"}
+    logger.info("Generation queued for project %s by %s (mode=%s)", project_id, user["email"], mode)
+    return {"status": "generating", "mode": mode, "queue_position": position}
+
+
+# ---------------------------------------------------------------------------
+# Selective regeneration — POST /api/projects/{project_id}/regenerate
+# ---------------------------------------------------------------------------
+
+
+class RegenerateRequest(BaseModel):
+    question_ids: list[str] = []
+    failed_only: bool = False
+
+
+@router.post("/projects/{project_id}/regenerate", status_code=202)
+async def start_regeneration(
+    project_id: str,
+    body: RegenerateRequest,
+    user: dict = Depends(get_current_user),
+) -> dict:
+    """Queue the regeneration of a subset of answers.
+
+    Only the selected questions (and, with failed_only, every question left
+    without an answer) are sent to Claude; the new answers are patched into
+    responses.json and output.xlsx. Attention points are kept as they are.
+
+    Allowed from statuses: completed, error, cancelled — once a full generation
+    has completed (responses, output and attention points present).
+
+    Args:
+        project_id: UUID of the project.
+        body: Question IDs to regenerate and/or the failed_only flag.
+        user: The authenticated user (injected by dependency).
+
+    Returns:
+        {"status": "generating", "count": int, "queue_position": int}
+
+    Raises:
+        HTTPException: 503 if the generation queue is full.
+    """
+    try:
+        proj = project_manager.load_project(project_id)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Projet introuvable.")
+
+    if proj.get("user_email") != user["email"]:
+        raise HTTPException(status_code=403, detail="Accès refusé.")
+
+    if proj.get("status") not in {"completed", "error", "cancelled"}:
+        raise HTTPException(
+            status_code=400,
+            detail="Le projet n'est pas dans un état permettant la régénération.",
+        )
+
+    saved = load_saved_responses(project_id)
+    if saved is None or not has_full_generation(project_id):
+        raise HTTPException(
+            status_code=400,
+            detail="Aucune génération complète : lancez d'abord une génération complète.",
+        )
+
+    known_ids = {e["question_id"] for e in saved}
+    question_ids = [qid.strip() for qid in body.question_ids if qid.strip()]
+    unknown = [qid for qid in question_ids if qid not in known_ids]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Questions inconnues : {', '.join(unknown[:10])}",
+        )
+
+    targets = set(question_ids)
+    if body.failed_only:
+        targets |= {e["question_id"] for e in saved if not (e.get("response") or "").strip()}
+    if not targets:
+        raise HTTPException(status_code=400, detail="Aucune question à régénérer.")
+
+    position = _enqueue_generation(
+        project_id, proj, user, run_regeneration, question_ids, body.failed_only,
+        priority=job_queue.PRIORITY_INTERACTIVE,
+        checkpoint={"kind": "regeneration", "question_ids": question_ids, "failed_only": body.failed_only},
+    )
+    logger.info(
+        "Regeneration of %d question(s) queued for project %s by %s",
+        len(targets), project_id, user["email"],
+    )
+    return {"status": "generating", "count": len(targets), "queue_position": position}
+
+
+# ---------------------------------------------------------------------------
+# Cancellation — POST /api/projects/{project_id}/cancel
+# ---------------------------------------------------------------------------
+
+
+@router.post("/projects/{project_id}/cancel", status_code=202)
+async def cancel_generation(
+    project_id: str,
+    user: dict = Depends(get_current_user),
+) -> dict:
+    """Cancel the queued or running generation of a project.
+
+    A queued job is dropped at once. A running job stops at its next
+    cancellation point (between stages, between batches, between two chunks of
+    a streamed Claude answer, or during a rate limiter wait or retry backoff)
+    and then sets the status to 'cancelled'. A non-streamed Claude call already
+    sent is not interrupted: it finishes first.
+
+    Args:
+        project_id: UUID of the project.
+        user: The authenticated user (injected by dependency).
+
+    Returns:
+        {"status": "cancelled"}, {"status": "cancelling"} (running job), or the
+        current status if the job ended before it could be cancelled.
+    """
+    try:
+        proj = project_manager.load_project(project_id)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Projet introuvable.")
+
+    if proj.get("user_email") != user["email"]:
+        raise HTTPException(status_code=403, detail="Accès refusé.")
+
+    if proj.get("status") != "generating":
+        raise HTTPException(status_code=400, detail="Aucune génération en cours pour ce projet.")
+
+    outcome = job_queue.get_queue().cancel(project_id)
+    if outcome == "running":
+        project_manager.update_project(project_id, progress_step="Annulation en cours...")
+        logger.info("Cancellation of project %s requested by %s", project_id, user["email"])
+        return {"status": "cancelling"}
+
+    if outcome == "queued":
+        # Queued job dropped: nothing else will update the project
+        cancelled = project_manager.update_project_if(
+            project_id, "generating", status="cancelled", progress_step="Annulé.", error_message=None
+        )
+        if cancelled is not None:
+            logger.info("Generation of project %s cancelled by %s", project_id, user["email"])
+            return {"status": "cancelled"}
+
+    # No job left: it ended between the status check and cancel(), keep its outcome
+    return {"status": project_manager.load_project(project_id).get("status")}
 
 
 # ---------------------------------------------------------------------------
@@ -1229,7 +1448,10 @@ async def get_project_status(
         user: The authenticated user (injected by dependency).
 
     Returns:
-        {"status": str, "progress_step": str | None, "error_message": str | None}
+        {"status": str, "progress_step": str | None, "progress_done": int | None,
+        "progress_total": int | None, "error_message": str | None,
+        "queue_position": int | None} — queue_position is set while the job waits
+        for a worker.
     """
     try:
         proj = project_manager.load_project(project_id)
@@ -1242,10 +1464,46 @@ async def get_project_status(
     return {
         "status": proj.get("status"),
         "progress_step": proj.get("progress_step"),
+        "progress_done": proj.get("progress_done"),
+        "progress_total": proj.get("progress_total"),
         "error_message": proj.get("error_message"),
+        "queue_position": job_queue.get_queue().position(project_id),
     }
 
 
+# ---------------------------------------------------------------------------
+# Timeline — GET /api/projects/{project_id}/timeline
+# ---------------------------------------------------------------------------
+
+
+@router.get("/projects/{project_id}/timeline")
+async def get_project_timeline(
+    project_id: str,
+    user: dict = Depends(get_current_user),
+) -> dict:
+    """Return the stage durations and Claude calls of the last generation.
+
+    Args:
+        project_id: UUID of the project.
+        user: The authenticated user (injected by dependency).
+
+    Returns:
+        Content of timeline.json (see app.services.timeline).
+    """
+    try:
+        proj = project_manager.load_project(project_id)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Projet introuvable.")
+
+    if proj.get("user_email") != user["email"]:
+        raise HTTPException(status_code=403, detail="Accès refusé.")
+
+    timeline = load_timeline(project_id)
+    if timeline is None:
+        raise HTTPException(status_code=404, detail="Aucune génération enregistrée pour ce projet.")
+    return timeline
+
+
 # ---------------------------------------------------------------------------
 # Download output — GET /api/projects/{project_id}/output
 # ---------------------------------------------------------------------------
@@ -5,8 +5,8 @@ import os
 from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv
-from fastapi import Depends, FastAPI
-from fastapi.responses import FileResponse, RedirectResponse
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse, PlainTextResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from starlette.middleware.sessions import SessionMiddleware
 
@@ -14,7 +14,9 @@ from app.api.web import router as web_router
 from app.auth.router import router as auth_router
 from app.auth.session import get_current_user, get_optional_user
 from app.config import BASE_DIR, load_config
-from app.services import project_manager
+from app.services import job_queue, metrics, project_manager
+from app.services.anonymizer import shutdown_part_pool
+from app.services.response_generator import resume_generation
 
 logging.basicConfig(
     level=logging.INFO,
@@ -33,13 +35,35 @@ else:
     load_dotenv()  # searches cwd and parent dirs — finds _vXX/.env in dev
 
 
+def _resume_interrupted(project_ids: list[str]) -> None:
+    """Queue the interrupted generations (bulk priority, no admission limit)."""
+    queue = job_queue.get_queue()
+    for project_id in project_ids:
+        proj = project_manager.load_project(project_id)
+        queue.submit(
+            project_id, proj.get("user_email", ""), resume_generation, project_id,
+            priority=job_queue.PRIORITY_BULK, force=True,
+        )
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Load full configuration at startup."""
-    load_config()
-    project_manager.recover_stale_projects()
+    """Load full configuration at startup and resume interrupted generations.
+
+    At shutdown, stop the anonymization worker processes so that they do not
+    outlive the server.
+    """
+    config = load_config()
+    gen_config = config.get("generation", {})
+    to_resume = project_manager.recover_stale_projects(
+        resume=bool(gen_config.get("resume_on_startup", True)),
+        max_resumes=int(gen_config.get("max_resumes", 2)),
+    )
+    if to_resume:
+        _resume_interrupted(to_resume)
     logger.info("PAS Assistant started")
     yield
+    shutdown_part_pool()
     logger.info("PAS Assistant stopped")
 
 
@@ -70,6 +94,19 @@ async def health() -> dict:
     return {"status": "ok"}
 
 
+@app.get("/api/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics(request: Request) -> PlainTextResponse:
+    """Prometheus metrics — loopback only, no authentication.
+
+    nginx sets X-Forwarded-For on proxied requests: a request carrying it came
+    from outside, even though it reaches uvicorn from 127.0.0.1.
+    """
+    host = request.client.host if request.client else ""
+    if host not in ("127.0.0.1", "::1") or "x-forwarded-for" in request.headers:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/api/auth/me")
 async def auth_me(user: dict = Depends(get_current_user)) -> dict:
     """Return the current authenticated user info."""
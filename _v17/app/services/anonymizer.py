@@ -3,21 +3,31 @@
 Handles:
 - Metadata extraction from docProps/core.xml and docProps/app.xml (xlsx)
   and from core_properties (docx)
-- Keyword-based text replacement (sorted by length descending)
+- Keyword-based text replacement (single pass, longest keyword first — see keyword_matcher)
 - File metadata stripping
 - Preservation of local defined names (Excel dropdowns) across the roundtrip
 """
 
+import codecs
 import html
 import logging
+import multiprocessing
 import re
-import shutil
+import threading
 import xml.etree.ElementTree as ET
 import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
+from typing import Iterator, Sequence
 
 from docx import Document as DocxDocument
 
+from app.services import metrics
+from app.services.keyword_matcher import KeywordMatcher, RegexReplacer, compile_mapping
+from app.services.zip_rewrite import ZipRewriter
+
 logger = logging.getLogger(__name__)
 
 _XLSX_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
@@ -52,27 +62,40 @@ _CLEAN_CORE_XML = (
 # XML files inside an xlsx zip that may contain user-visible text to anonymize
 _XLSX_TEXT_TARGETS = frozenset(["xl/sharedStrings.xml"])
 
-# Catamania — correction post-dé-anonymisation (case-insensitive)
+# Text parts of a docx package: body, headers, footers, notes and comments
+_DOCX_TEXT_PART_RE = re.compile(r"word/(document|header|footer|footnotes|endnotes|comments)\d*\.xml$")
+
+# Text nodes (tag, attributes, escaped text); deleted text of tracked changes included
+_DOCX_TEXT_NODE_RE = re.compile(r"<w:(t|delText)(\s[^>]*)?>([^<]*)</w:\1>")
+
+# Markup between two text nodes that ends a segment (a keyword can't span it)
+_DOCX_SEGMENT_BREAK_RE = re.compile(r"</w:p>|<w:(?:p|tab|ptab|br|cr|sym|drawing|fldChar)\b")
+
+# Page background of document.xml (removed with strip_layout)
+_DOCX_BACKGROUND_RE = re.compile(r"<w:background\b[^>]*?(?:/>|>.*?</w:background>)", re.DOTALL)
+
+# Catamania — correction post-dé-anonymisation (case-insensitive): any occurrence
+# introduced by Claude (despite instructions to use FOURNISSEUR) is corrected
 _CATAMANIA_RE = re.compile(r'cat-amania', re.IGNORECASE)
 
+# Text fixers applied after de-anonymization, in order (xlsx parts and plain text)
+_DEANONYMIZATION_FIXERS: tuple[RegexReplacer, ...] = (
+    RegexReplacer(_CATAMANIA_RE, "Catamania", len("cat-amania")),
+)
 
-def _is_worksheet_xml(fname: str) -> bool:
-    """Return True for xl/worksheets/sheet*.xml entries."""
-    return fname.startswith("xl/worksheets/") and fname.endswith(".xml")
+# Text parts larger than this (uncompressed) are transformed chunk by chunk
+_STREAM_THRESHOLD_BYTES = 8 * 1024 * 1024
+_STREAM_CHUNK_BYTES = 1024 * 1024
 
+# Worker processes transforming xlsx text parts (workers > 1), started on first use and shared by every anonymization of the process
+_part_pool: ProcessPoolExecutor | None = None
+_part_pool_workers = 0
+_part_pool_lock = threading.Lock()
 
-def _apply_mapping_to_xml(text: str, mapping: dict[str, str]) -> str:
-    """Replace keywords in raw XML text.
 
-    Handles both plain form and XML-encoded form (e.g., '&' → '&amp;')
-    so keywords containing special XML characters are matched correctly.
-    """
-    for kw, token in mapping.items():
-        text = text.replace(kw, token)
-        kw_enc = html.escape(kw, quote=False)
-        if kw_enc != kw:
-            text = text.replace(kw_enc, html.escape(token, quote=False))
-    return text
+def _is_worksheet_xml(fname: str) -> bool:
+    """Return True for xl/worksheets/sheet*.xml entries."""
+    return fname.startswith("xl/worksheets/") and fname.endswith(".xml")
 
 
 def safe_local_defined_names(xlsx_path: Path) -> list[tuple[str, str, int | None]]:
@@ -170,10 +193,212 @@ def extract_metadata(xlsx_path: Path) -> dict[str, str]:
     return meta
 
 
+def _stream_text(stream, replacers: Sequence) -> Iterator[bytes]:
+    """Decode a UTF-8 stream chunk by chunk, apply the replacers, re-encode."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+
+    def chunks() -> Iterator[str]:
+        while True:
+            data = stream.read(_STREAM_CHUNK_BYTES)
+            if not data:
+                break
+            yield decoder.decode(data)
+        yield decoder.decode(b"", final=True)
+
+    texts: Iterator[str] = chunks()
+    for replacer in replacers:
+        texts = replacer.stream(texts)
+    for text in texts:
+        yield text.encode("utf-8")
+
+
+def _is_text_part(fname: str) -> bool:
+    return fname in _XLSX_TEXT_TARGETS or _is_worksheet_xml(fname)
+
+
+def _transform_part(data: bytes, replacers: Sequence) -> bytes | None:
+    """Apply the replacers to an XML part; None if it is left unchanged.
+
+    Module-level so that it can run in the worker processes.
+    """
+    text = data.decode("utf-8")
+    patched = text
+    for replacer in replacers:
+        patched = replacer.sub(patched)
+    return None if patched == text else patched.encode("utf-8")
+
+
+def anonymization_options(config: dict) -> dict:
+    """Return the parallel-mode keyword arguments of anonymize_xlsx / deanonymize_xlsx.
+
+    Args:
+        config: Application config (its anonymization section is read).
+    """
+    cfg = config.get("anonymization", {})
+    return {
+        "workers": int(cfg.get("workers", 1)),
+        "parallel_min_mb": float(cfg.get("parallel_min_mb", 16)),
+    }
+
+
+def _parallel_workers(items: list[zipfile.ZipInfo], workers: int, parallel_min_mb: float) -> int:
+    """Return the number of worker processes for this package, 0 for serial mode.
+
+    Serial mode unless workers > 1 and the package has at least two in-memory
+    text parts totalling parallel_min_mb.
+    """
+    if workers <= 1:
+        return 0
+    sizes = [i.file_size for i in items if _is_text_part(i.filename) and i.file_size <= _STREAM_THRESHOLD_BYTES]
+    if len(sizes) < 2 or sum(sizes) < parallel_min_mb * 1024 * 1024:
+        return 0
+    return workers
+
+
+def _get_part_pool(workers: int) -> ProcessPoolExecutor:
+    global _part_pool, _part_pool_workers
+    with _part_pool_lock:
+        if _part_pool is not None and _part_pool_workers != workers:
+            # Worker count changed in the configuration: tasks already submitted
+            # to the old pool still complete, then its processes exit
+            _part_pool.shutdown(wait=False)
+            _part_pool = None
+            logger.info("Anonymization worker pool resized (%d -> %d processes)", _part_pool_workers, workers)
+        if _part_pool is None:
+            # spawn, not fork: the server process runs request and generation threads
+            _part_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _part_pool_workers = workers
+            logger.info("Anonymization worker pool started (%d processes)", workers)
+        return _part_pool
+
+
+def shutdown_part_pool(wait: bool = True) -> None:
+    """Stop the anonymization worker processes, if started.
+
+    Called at server shutdown, and on a broken pool (worker killed) so that the
+    next anonymization starts a new one.
+
+    Args:
+        wait: Wait for the worker processes to exit (pending tasks are cancelled).
+    """
+    global _part_pool
+    with _part_pool_lock:
+        if _part_pool is not None:
+            _part_pool.shutdown(wait=wait, cancel_futures=True)
+            _part_pool = None
+
+
+def _rewrite_entry(rw: ZipRewriter, item: zipfile.ZipInfo, replacers: Sequence, changed: list[str]) -> None:
+    """Write one entry of the package being rewritten (serial mode)."""
+    fname = item.filename
+    if fname == "docProps/core.xml":
+        rw.write(item, _CLEAN_CORE_XML)
+    elif fname == "docProps/app.xml":
+        rw.write(item, _CLEAN_APP_XML)
+    elif _is_text_part(fname) and item.file_size > _STREAM_THRESHOLD_BYTES:
+        with rw.open(fname) as src, rw.open_write(item) as dst:
+            for data in _stream_text(src, replacers):
+                dst.write(data)
+        changed.append(fname)
+    elif _is_text_part(fname):
+        patched = _transform_part(rw.read(fname), replacers)
+        if patched is not None:
+            changed.append(fname)
+            rw.write(item, patched)
+        else:
+            rw.copy(item)
+    else:
+        rw.copy(item)
+
+
+def _rewrite_xlsx_text(
+    source_path: Path,
+    dest_path: Path,
+    replacers: Sequence,
+    workers: int = 1,
+    parallel_min_mb: float = 16,
+) -> list[str]:
+    """Copy an xlsx, transforming its text parts and replacing its metadata.
+
+    One read/transform/write cycle per entry: the replacers (KeywordMatcher,
+    RegexReplacer) are applied in order to xl/sharedStrings.xml and every
+    xl/worksheets/*.xml, docProps/core.xml and docProps/app.xml are replaced
+    with clean versions. Every other entry, and every text part left unchanged,
+    is copied in compressed form (no recompression).
+
+    Text parts above _STREAM_THRESHOLD_BYTES are streamed instead of being
+    decoded whole, so memory stays bounded by the chunk size; they are always
+    rewritten.
+
+    In parallel mode (see _parallel_workers) the other text parts are
+    transformed in worker processes, at most two per worker in flight, while
+    the entries are still written in their original order.
+
+    Args:
+        source_path: Source xlsx file.
+        dest_path: Destination xlsx file (may be source_path).
+        replacers: Picklable objects with sub(text) and stream(chunks), applied in order.
+        workers: Worker processes for parallel mode (1 = serial).
+        parallel_min_mb: Total text size below which the package is handled serially.
+
+    Returns:
+        Names of the parts rewritten.
+    """
+    changed: list[str] = []
+    with ZipRewriter(source_path, dest_path) as rw:
+        items = rw.infolist()
+        workers = _parallel_workers(items, workers, parallel_min_mb)
+        if not workers:
+            for item in items:
+                _rewrite_entry(rw, item, replacers, changed)
+            return changed
+
+        pool = _get_part_pool(workers)
+        pending: deque = deque()  # (entry, future | None), in package order
+        in_flight = 0
+
+        def emit(item: zipfile.ZipInfo, future) -> None:
+            if future is None:
+                _rewrite_entry(rw, item, replacers, changed)
+                return
+            try:
+                patched = future.result()
+            except BrokenProcessPool:
+                shutdown_part_pool(wait=False)
+                raise
+            if patched is not None:
+                changed.append(item.filename)
+                rw.write(item, patched)
+            else:
+                rw.copy(item)
+
+        try:
+            for item in items:
+                if _is_text_part(item.filename) and item.file_size <= _STREAM_THRESHOLD_BYTES:
+                    pending.append((item, pool.submit(_transform_part, rw.read(item.filename), replacers)))
+                    in_flight += 1
+                else:
+                    pending.append((item, None))
+                while pending and (pending[0][1] is None or in_flight > 2 * workers):
+                    item, future = pending.popleft()
+                    in_flight -= future is not None
+                    emit(item, future)
+            while pending:
+                emit(*pending.popleft())
+        finally:
+            for _, future in pending:
+                if future is not None:
+                    future.cancel()
+    return changed
+
+
+@metrics.timed_operation("anonymize_xlsx")
 def anonymize_xlsx(
     source_path: Path,
     dest_path: Path,
     mapping: dict[str, str],
+    workers: int = 1,
+    parallel_min_mb: float = 16,
 ) -> dict[str, str]:
     """Replace keywords in xlsx content and strip file metadata.
 
@@ -190,9 +415,12 @@ def anonymize_xlsx(
         source_path: Path to the source xlsx file (working.xlsx).
         dest_path: Path to save the anonymized xlsx file.
         mapping: Dict of {original_keyword: replacement} pairs.
+        workers: Worker processes transforming the text parts (1 = serial,
+            see anonymization_options).
+        parallel_min_mb: Total text size below which the file is handled serially.
 
     Returns:
-        The mapping dict, sorted by key length descending (replacement order).
+        The mapping dict, sorted by key length descending (longest match wins).
     """
     mapping = dict(
         sorted(
@@ -201,31 +429,12 @@ def anonymize_xlsx(
             reverse=True,
         )
     )
+    # Plain and XML-escaped forms ('&' → '&amp;'), all keywords in one scan per part
+    matcher = KeywordMatcher(mapping, xml_escaped=True)
 
-    replaced_parts: list[str] = []
-    tmp_path = dest_path.with_suffix(".tmp.xlsx")
-    try:
-        with zipfile.ZipFile(source_path, "r") as zin:
-            with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as zout:
-                for item in zin.infolist():
-                    fname = item.filename
-                    if fname == "docProps/core.xml":
-                        zout.writestr(item, _CLEAN_CORE_XML)
-                    elif fname == "docProps/app.xml":
-                        zout.writestr(item, _CLEAN_APP_XML)
-                    elif fname in _XLSX_TEXT_TARGETS or _is_worksheet_xml(fname):
-                        text = zin.read(fname).decode("utf-8")
-                        patched = _apply_mapping_to_xml(text, mapping)
-                        if patched != text:
-                            replaced_parts.append(fname)
-                        zout.writestr(item, patched.encode("utf-8"))
-                    else:
-                        zout.writestr(item, zin.read(fname))
-        shutil.move(str(tmp_path), str(dest_path))
-    except Exception:
-        tmp_path.unlink(missing_ok=True)
-        raise
-
+    replaced_parts = _rewrite_xlsx_text(
+        source_path, dest_path, [matcher], workers=workers, parallel_min_mb=parallel_min_mb,
+    )
     logger.info(
         "Anonymized %s -> %s: %d keywords, replacements in: %s",
         source_path.name,
@@ -261,62 +470,87 @@ def extract_metadata_docx(docx_path: Path) -> dict[str, str]:
     return meta
 
 
-def _strip_docx_layout(doc: "DocxDocument") -> None:  # type: ignore[name-defined]
-    """Remove headers, footers, and background from a docx Document (in-place).
+def _docx_text_part(fname: str) -> str | None:
+    """Return the kind of a docx text part ("body", "header", "footer", ...), or None."""
+    match = _DOCX_TEXT_PART_RE.match(fname)
+    return match.group(1) if match else None
 
-    - Headers/footers: clears all runs in every section's header and footer
-      objects (default, first-page, even-page variants).
-    - Background: removes the <w:background> element from the document root,
-      which carries the page background color or fill.
-    """
-    from docx.oxml.ns import qn  # local import — only needed here
-
-    # --- headers & footers ---
-    for section in doc.sections:
-        for hf in (
-            section.header,
-            section.footer,
-            section.first_page_header,
-            section.first_page_footer,
-            section.even_page_header,
-            section.even_page_footer,
-        ):
-            try:
-                if not hf.is_linked_to_previous:
-                    for para in hf.paragraphs:
-                        for run in para.runs:
-                            run.text = ""
-                    for table in hf.tables:
-                        for row in table.rows:
-                            for cell in row.cells:
-                                for para in cell.paragraphs:
-                                    for run in para.runs:
-                                        run.text = ""
-            except Exception:
-                pass  # some hf objects raise if the part doesn't exist
-
-    # --- background ---
-    bg = doc.element.find(qn("w:background"))
-    if bg is not None:
-        doc.element.remove(bg)
 
+def _xml_text_node(tag: str, attrs: str, text: str) -> str:
+    """Serialize a w:t / w:delText node, preserving spaces Word would trim."""
+    if text != text.strip() and "xml:space" not in attrs:
+        attrs += ' xml:space="preserve"'
+    return f"<w:{tag}{attrs}>{html.escape(text, quote=False)}</w:{tag}>"
+
+
+def _anonymize_docx_xml(xml: str, matcher: KeywordMatcher, blank: bool = False) -> tuple[str, int]:
+    """Replace keywords in the text nodes of a WordprocessingML part.
+
+    Consecutive text nodes of a paragraph form one segment (a run boundary
+    does not stop a match); paragraphs, tabs, breaks and fields separate
+    segments. Only the nodes whose text changes are rewritten.
 
+    Args:
+        xml: Decoded part (document, header, footer, footnotes, comments...).
+        matcher: Compiled mapping (plain text form).
+        blank: Empty every text node instead (headers/footers with strip_layout).
+
+    Returns:
+        (patched xml, number of text nodes modified).
+    """
+    edits: list[tuple[int, int, str]] = []
+    segment: list[re.Match] = []
+
+    def flush() -> None:
+        pieces = [html.unescape(m.group(3)) for m in segment]
+        patched = [""] * len(pieces) if blank else matcher.sub_pieces(pieces)[0]
+        for m, before, after in zip(segment, pieces, patched):
+            if after != before:
+                edits.append((m.start(), m.end(), _xml_text_node(m.group(1), m.group(2) or "", after)))
+        segment.clear()
+
+    prev_end = 0
+    for m in _DOCX_TEXT_NODE_RE.finditer(xml):
+        if segment and (m.group(1) != segment[-1].group(1) or _DOCX_SEGMENT_BREAK_RE.search(xml, prev_end, m.start())):
+            flush()
+        segment.append(m)
+        prev_end = m.end()
+    if segment:
+        flush()
+
+    if not edits:
+        return xml, 0
+    out: list[str] = []
+    pos = 0
+    for start, stop, node in edits:
+        out.append(xml[pos:start])
+        out.append(node)
+        pos = stop
+    out.append(xml[pos:])
+    return "".join(out), len(edits)
+
+
+@metrics.timed_operation("anonymize_docx")
 def anonymize_docx(
     source_path: Path,
     dest_path: Path,
     mapping: dict[str, str],
     strip_layout: bool = False,
 ) -> dict[str, str]:
-    """Replace keywords in all docx text (paragraphs + tables) and strip metadata.
+    """Replace keywords in all docx text and strip metadata.
 
-    Keywords are sorted by length descending to avoid partial replacements.
+    Works on the zip/XML level like anonymize_xlsx: the body, headers,
+    footers, footnotes, endnotes and comments are rewritten in one pass over
+    the package, matching keywords across run boundaries (Word often splits a
+    name over several runs). docProps/core.xml and docProps/app.xml are
+    replaced with clean versions; every other entry is copied as-is.
 
     Args:
         source_path: Path to the source docx file.
         dest_path: Path to save the anonymized docx file.
         mapping: Dict of {original_keyword: replacement} pairs.
-        strip_layout: If True, also remove headers, footers, and page background.
-            Should be set for policy/politiques documents only.
+        strip_layout: If True, also empty headers and footers and remove the
+            page background. Should be set for policy/politiques documents only.
 
     Returns:
         The mapping dict, sorted by key length descending.
@@ -329,101 +563,78 @@ def anonymize_docx(
         )
     )
 
-    shutil.copy2(source_path, dest_path)
-    doc = DocxDocument(dest_path)
-
-    def _replace_in_paragraph(para) -> int:
-        count = 0
-        for run in para.runs:
-            if run.text:
-                original = run.text
-                for kw, token in mapping.items():
-                    run.text = run.text.replace(kw, token)
-                if run.text != original:
-                    count += 1
-        return count
+    matcher = KeywordMatcher(mapping)
 
     replaced_count = 0
-    for para in doc.paragraphs:
-        replaced_count += _replace_in_paragraph(para)
-    for table in doc.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                for para in cell.paragraphs:
-                    replaced_count += _replace_in_paragraph(para)
-
-    if strip_layout:
-        _strip_docx_layout(doc)
-
-    cp = doc.core_properties
-    cp.author = "ANONYME"
-    cp.last_modified_by = ""
-    cp.title = ""
-    cp.subject = ""
-    cp.keywords = ""
-    cp.company = ""
-
-    doc.save(dest_path)
+    with ZipRewriter(source_path, dest_path) as rw:
+        for item in rw.infolist():
+            fname = item.filename
+            kind = _docx_text_part(fname)
+            if fname == "docProps/core.xml":
+                rw.write(item, _CLEAN_CORE_XML)
+            elif fname == "docProps/app.xml":
+                rw.write(item, _CLEAN_APP_XML)
+            elif kind is not None:
+                xml = rw.read(fname).decode("utf-8")
+                patched, count = _anonymize_docx_xml(
+                    xml, matcher, blank=strip_layout and kind in ("header", "footer"),
+                )
+                if strip_layout and kind == "document":
+                    patched = _DOCX_BACKGROUND_RE.sub("", patched)
+                replaced_count += count
+                if patched != xml:
+                    rw.write(item, patched.encode("utf-8"))
+                else:
+                    rw.copy(item)
+            else:
+                rw.copy(item)
 
     logger.info(
-        "Anonymized docx %s -> %s: %d keywords, %d runs modified%s",
+        "Anonymized docx %s -> %s: %d keywords, %d text nodes modified%s",
         source_path.name, dest_path.name, len(mapping), replaced_count,
         " (layout stripped)" if strip_layout else "",
     )
     return mapping
 
 
-def _apply_catamania_fix_xlsx(xlsx_path: Path) -> None:
-    """Replace 'Cat-Amania' (case-insensitive) with 'Catamania' in xlsx text content (in-place).
-
-    Applied as a second pass after de-anonymization so that any occurrence
-    introduced by Claude (despite instructions to use FOURNISSEUR) is corrected.
-    """
-    tmp_path = xlsx_path.with_suffix(".tmp.xlsx")
-    try:
-        with zipfile.ZipFile(xlsx_path, "r") as zin:
-            with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as zout:
-                for item in zin.infolist():
-                    fname = item.filename
-                    if fname in _XLSX_TEXT_TARGETS or _is_worksheet_xml(fname):
-                        text = zin.read(fname).decode("utf-8")
-                        patched = _CATAMANIA_RE.sub("Catamania", text)
-                        zout.writestr(item, patched.encode("utf-8"))
-                    else:
-                        zout.writestr(item, zin.read(fname))
-        shutil.move(str(tmp_path), str(xlsx_path))
-    except Exception:
-        tmp_path.unlink(missing_ok=True)
-        raise
-
-
+@metrics.timed_operation("deanonymize_xlsx")
 def deanonymize_xlsx(
     source_path: Path,
     dest_path: Path,
     mapping: dict[str, str],
+    workers: int = 1,
+    parallel_min_mb: float = 16,
 ) -> None:
     """Reverse the anonymization of an xlsx file.
 
-    Replaces tokens with their original values by inverting the mapping and
-    calling anonymize_xlsx (which already handles length-sorted replacement).
-    Then applies the Catamania fix (case-insensitive 'Cat-Amania' → 'Catamania').
+    Replaces tokens with their original values (inverse mapping, longest token
+    first) and applies the de-anonymization fixers (Catamania fix) in the same
+    pass over each text part; metadata is stripped as by anonymize_xlsx.
 
     Args:
         source_path: Path to the anonymized xlsx (output_anon.xlsx).
         dest_path: Path to save the de-anonymized xlsx (output.xlsx).
         mapping: The original anonymization mapping {original: token} as stored
                  in anonymized_map.json.
+        workers: Worker processes transforming the text parts (1 = serial).
+        parallel_min_mb: Total text size below which the file is handled serially.
     """
-    inverse = {token: original for original, token in mapping.items() if token}
-    anonymize_xlsx(source_path, dest_path, inverse)
-    _apply_catamania_fix_xlsx(dest_path)
-    logger.info("De-anonymized %s -> %s", source_path.name, dest_path.name)
+    inverse = {token.strip(): original.strip() for original, token in mapping.items() if token.strip()}
+    matcher = KeywordMatcher(inverse, xml_escaped=True)
+    changed = _rewrite_xlsx_text(
+        source_path, dest_path, [matcher, *_DEANONYMIZATION_FIXERS],
+        workers=workers, parallel_min_mb=parallel_min_mb,
+    )
+    logger.info(
+        "De-anonymized %s -> %s: %d tokens, changes in: %s",
+        source_path.name, dest_path.name, len(inverse), changed or "none",
+    )
 
 
 def deanonymize_text(text: str, mapping: dict[str, str]) -> str:
     """Replace anonymization tokens with original values in a plain-text string.
 
-    Sorts by original value length descending to avoid partial replacements.
+    Tokens are matched longest first, in a single pass.
 
     Args:
         text: Text that may contain anonymization tokens.
@@ -432,12 +643,9 @@ def deanonymize_text(text: str, mapping: dict[str, str]) -> str:
     Returns:
         Text with tokens replaced by original values.
     """
-    # Sort by original (value) length descending to prevent partial matches
-    for original, token in sorted(mapping.items(), key=lambda x: len(x[1]), reverse=True):
-        if token:
-            text = text.replace(token, original)
-    # Second pass: fix 'Cat-Amania' → 'Catamania' (case-insensitive)
-    text = _CATAMANIA_RE.sub("Catamania", text)
+    text = compile_mapping({token: original for original, token in mapping.items() if token}).sub(text)
+    for fixer in _DEANONYMIZATION_FIXERS:
+        text = fixer.sub(text)
     return text
 
 
@@ -447,16 +655,9 @@ def _strip_app_xml(xlsx_path: Path) -> None:
     Rewrites the xlsx zip, substituting a clean app.xml that contains no
     company name, application name, or other extended properties.
     """
-    tmp_path = xlsx_path.with_suffix(".tmp.xlsx")
-    try:
-        with zipfile.ZipFile(xlsx_path, "r") as zin:
-            with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as zout:
-                for item in zin.infolist():
-                    if item.filename == "docProps/app.xml":
-                        zout.writestr(item, _CLEAN_APP_XML)
-                    else:
-                        zout.writestr(item, zin.read(item.filename))
-        shutil.move(str(tmp_path), str(xlsx_path))
-    except Exception:
-        tmp_path.unlink(missing_ok=True)
-        raise
+    with ZipRewriter(xlsx_path, xlsx_path) as rw:
+        for item in rw.infolist():
+            if item.filename == "docProps/app.xml":
+                rw.write(item, _CLEAN_APP_XML)
+            else:
+                rw.copy(item)
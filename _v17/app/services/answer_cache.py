@@ -0,0 +1,213 @@
+"""PAS Assistant — Persistent cache of generated answers.
+
+Stores one JSON file per answer under data/cache/answers/<key[:2]>/<key>.json.
+The key hashes everything that can change Claude's answer to a question: the
+normalized question text and a context fingerprint (cadrage, corpus ids and
+content hashes, retrieval settings, policies hash, model, verbosity level,
+status values, contract, system prompt). A regeneration with an unchanged context is served from disk.
+
+The file mtime is the LRU timestamp (bumped on every hit); evict() removes the
+least recently used entries once max_entries or max_bytes is exceeded.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+
+from app.config import BASE_DIR
+from app.services import metrics
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = BASE_DIR / "data" / "cache" / "answers"
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def normalize_question(text: str) -> str:
+    """Lowercase and collapse whitespace so cosmetic edits keep the same key."""
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def file_fingerprint(*paths: Path) -> str:
+    """Return a SHA-256 over the contents of the given files (missing files are skipped).
+
+    Args:
+        *paths: Files to hash, in a stable order.
+
+    Returns:
+        Hex digest.
+    """
+    h = hashlib.sha256()
+    for path in paths:
+        if not path.exists():
+            continue
+        h.update(path.name.encode("utf-8"))
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    return h.hexdigest()
+
+
+def context_fingerprint(
+    *,
+    cadrage: dict,
+    corpus: list[tuple[str, str]],
+    policies_hash: str,
+    model: str,
+    verbosity_level: int,
+    status_choices: list[str] | None,
+    contract_hash: str,
+    system_prompt: str,
+    retrieval: dict | None = None,
+) -> str:
+    """Hash the generation context shared by all questions of a project.
+
+    Args:
+        cadrage: Cadrage fields that reach the prompt.
+        corpus: (corpus_id, content hash) pairs of the corpus entries used.
+        policies_hash: Hash of POLITIQUES.md ("" if absent).
+        model: Claude model ID.
+        verbosity_level: Resolved verbosity level.
+        status_choices: Allowed status values, or None.
+        contract_hash: Hash of the anonymized contract ("" if absent).
+        system_prompt: Response-generation system prompt.
+        retrieval: Corpus retrieval settings, or None when whole files are sent.
+
+    Returns:
+        Hex digest.
+    """
+    payload = {
+        "cadrage": cadrage,
+        "corpus": sorted(corpus),
+        "policies": policies_hash,
+        "model": model,
+        "verbosity": verbosity_level,
+        "status_choices": status_choices or [],
+        "contract": contract_hash,
+        "system": hashlib.sha256(system_prompt.encode("utf-8")).hexdigest(),
+    }
+    if retrieval is not None:
+        payload["retrieval"] = retrieval
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def answer_key(context_fp: str, question_text: str) -> str:
+    """Return the cache key of one question within a generation context."""
+    raw = f"{context_fp}\n{normalize_question(question_text)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _entry_path(key: str) -> Path:
+    return CACHE_DIR / key[:2] / f"{key}.json"
+
+
+def get(key: str) -> dict | None:
+    """Return the cached answer for key, or None on a miss.
+
+    Args:
+        key: Key from answer_key().
+
+    Returns:
+        {"response": str, "status": str | None} or None.
+    """
+    path = _entry_path(key)
+    try:
+        entry = json.loads(path.read_text(encoding="utf-8"))
+        os.utime(path)  # LRU bump
+    except (OSError, json.JSONDecodeError):
+        with _stats_lock:
+            _stats["misses"] += 1
+        return None
+    with _stats_lock:
+        _stats["hits"] += 1
+    return entry
+
+
+def put(key: str, answer: dict) -> None:
+    """Store an answer (only its response and status fields).
+
+    Args:
+        key: Key from answer_key().
+        answer: Claude answer dict.
+    """
+    path = _entry_path(key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    entry = {"response": answer.get("response", ""), "status": answer.get("status")}
+    tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+    tmp_path.write_text(json.dumps(entry, ensure_ascii=False), encoding="utf-8")
+    tmp_path.replace(path)
+
+
+def evict(max_entries: int, max_bytes: int) -> int:
+    """Remove least recently used entries until both limits are respected.
+
+    Args:
+        max_entries: Maximum number of cached answers.
+        max_bytes: Maximum total size of the cache files.
+
+    Returns:
+        Number of entries removed.
+    """
+    if not CACHE_DIR.exists():
+        return 0
+
+    entries: list[tuple[float, int, str]] = []
+    total_bytes = 0
+    for shard in os.scandir(CACHE_DIR):
+        if not shard.is_dir():
+            continue
+        for e in os.scandir(shard.path):
+            if not e.name.endswith(".json"):
+                continue
+            try:
+                st = e.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, e.path))
+            total_bytes += st.st_size
+
+    if len(entries) <= max_entries and total_bytes <= max_bytes:
+        return 0
+
+    entries.sort()  # oldest access first
+    removed = 0
+    count = len(entries)
+    for _mtime, size, path in entries:
+        if count <= max_entries and total_bytes <= max_bytes:
+            break
+        try:
+            os.unlink(path)
+        except OSError:
+            continue
+        count -= 1
+        total_bytes -= size
+        removed += 1
+
+    logger.info("Answer cache: evicted %d entries (%d left, %d bytes)", removed, count, total_bytes)
+    return removed
+
+
+def stats() -> dict:
+    """Return process-wide hit/miss counters and the hit rate."""
+    with _stats_lock:
+        hits, misses = _stats["hits"], _stats["misses"]
+    total = hits + misses
+    return {"hits": hits, "misses": misses, "hit_rate": hits / total if total else 0.0}
+
+
+def _collect_metrics() -> list[tuple]:
+    counters = stats()
+    return [
+        ("pas_answer_cache_hits_total", "counter", "Answer cache hits.", [({}, counters["hits"])]),
+        ("pas_answer_cache_misses_total", "counter", "Answer cache misses.", [({}, counters["misses"])]),
+    ]
+
+
+metrics.register_collector(_collect_metrics)
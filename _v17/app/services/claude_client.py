@@ -0,0 +1,400 @@
+"""PAS Assistant — Shared Anthropic client and global rate limiter.
+
+Every Claude call of the process goes through one client (get_client()), so
+that concurrent generations and structure detections share a single pool of
+HTTP connections and a single RateLimiter:
+
+- before each request (httpx request hook), the limiter waits for one slot of
+  the requests-per-minute bucket and for the estimated input tokens of the
+  tokens-per-minute bucket;
+- after each response (httpx response hook), it aligns the buckets on the
+  anthropic-ratelimit-* headers and, on 429 (rate limited) or 529 (overloaded),
+  pauses every caller for retry-after or an exponential backoff with jitter.
+
+Failed calls are retried by a client middleware rather than by the SDK's own
+retry loop (claude.rate_limit.max_retries): each attempt goes through the request
+hook and therefore waits for the pause to end. Inside cancel_scope(event), these
+waits end as soon as the job's cancel event is set and the call raises
+JobCancelledError instead of being retried.
+
+With claude.transport.mode record or replay, the client's HTTP transport is a
+cassette transport (see llm_transport).
+"""
+
+import contextlib
+import contextvars
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime
+
+import anthropic
+
+from app.config import get_config
+from app.services import job_queue, llm_transport, metrics
+
+logger = logging.getLogger(__name__)
+
+# Rough size of a token in bytes of JSON request body (French text)
+_BYTES_PER_TOKEN = 4
+
+# Delays between retries not covered by a 429/529 pause (SDK defaults)
+_RETRY_DELAY_INITIAL = 0.5
+_RETRY_DELAY_MAX = 8.0
+
+# Cancel event of the job on whose behalf the current thread calls Claude
+_cancel_event: contextvars.ContextVar[threading.Event | None] = contextvars.ContextVar(
+    "claude_cancel_event", default=None,
+)
+
+
+def _parse_reset(value: str | None) -> float | None:
+    """Convert an RFC 3339 anthropic-ratelimit-*-reset header to a time.time() value."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def _parse_retry_after(headers) -> float | None:
+    """Return the retry-after delay in seconds (retry-after-ms first), or None."""
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return max(0.0, float(value) * scale)
+        except ValueError:
+            continue
+    return None
+
+
+def _header_int(headers, name: str) -> int | None:
+    value = headers.get(name)
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class _Bucket:
+    """Token bucket refilled continuously at capacity per minute (not thread-safe).
+
+    A capacity of 0 means no limit is known yet: the bucket never waits.
+    """
+
+    def __init__(self, per_minute: float) -> None:
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self._updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        if self.capacity <= 0:
+            self._updated = now
+            return
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.capacity / 60)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds before amount is available (amounts above capacity need a full bucket)."""
+        amount = min(amount, self.capacity)
+        if self.capacity <= 0 or self.level >= amount:
+            return 0.0
+        return (amount - self.level) * 60 / self.capacity
+
+
+class RateLimiter:
+    """Process-wide requests/tokens-per-minute limiter with a shared backoff pause."""
+
+    def __init__(
+        self,
+        requests_per_minute: float = 50,
+        input_tokens_per_minute: float = 0,
+        backoff_base: float = 2.0,
+        backoff_max: float = 60.0,
+    ) -> None:
+        """Create a limiter.
+
+        Args:
+            requests_per_minute: Initial request budget (0 = unlimited until the
+                API reports its limit).
+            input_tokens_per_minute: Initial input token budget (0 = same).
+            backoff_base: First backoff delay in seconds after a 429/529.
+            backoff_max: Cap on the backoff delay.
+        """
+        self._lock = threading.Lock()
+        self._requests = _Bucket(requests_per_minute)
+        self._tokens = _Bucket(input_tokens_per_minute)
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._pause_until = 0.0  # time.time() before which no request is sent
+        self._failures = 0       # consecutive 429/529 responses
+        self._stats = {"requests": 0, "throttled": 0, "rate_limited": 0, "overloaded": 0, "waited_seconds": 0.0}
+
+    def acquire(self, tokens: int = 0, cancel: threading.Event | None = None) -> float:
+        """Block until a request of about tokens input tokens may be sent.
+
+        Args:
+            tokens: Estimated input tokens of the request.
+            cancel: Optional event; once set, the wait is abandoned.
+
+        Returns:
+            Seconds spent waiting.
+
+        Raises:
+            job_queue.JobCancelledError: If cancel was set while waiting.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                delay = max(0.0, self._pause_until - time.time())
+                for bucket, amount in ((self._requests, 1), (self._tokens, tokens)):
+                    bucket.refill(now)
+                    delay = max(delay, bucket.wait_time(amount))
+                if delay <= 0:
+                    self._requests.level -= 1
+                    # May go negative for a request larger than the bucket
+                    self._tokens.level -= tokens
+                    self._stats["requests"] += 1
+                    if waited:
+                        self._stats["throttled"] += 1
+                        self._stats["waited_seconds"] += waited
+                    return waited
+            if cancel is None:
+                time.sleep(delay)
+            elif cancel.wait(delay):
+                raise job_queue.JobCancelledError("rate limiter")
+            waited += delay
+
+    def observe(self, status_code: int, headers) -> None:
+        """Update the limiter from an API response.
+
+        Args:
+            status_code: HTTP status of the response.
+            headers: Response headers (anthropic-ratelimit-*, retry-after).
+        """
+        with self._lock:
+            now = time.monotonic()
+            for bucket, prefix in (
+                (self._requests, "anthropic-ratelimit-requests"),
+                (self._tokens, "anthropic-ratelimit-input-tokens"),
+            ):
+                limit = _header_int(headers, f"{prefix}-limit")
+                if limit:
+                    if bucket.capacity <= 0:
+                        bucket.level = float(limit)
+                    bucket.capacity = float(limit)
+                remaining = _header_int(headers, f"{prefix}-remaining")
+                if remaining is not None:
+                    bucket.refill(now)
+                    bucket.level = min(bucket.level, float(remaining))
+                    if remaining <= 0:
+                        reset = _parse_reset(headers.get(f"{prefix}-reset"))
+                        if reset is not None:
+                            self._pause_until = max(self._pause_until, reset)
+
+            if status_code not in (429, 529):
+                self._failures = 0
+                return
+
+            self._failures += 1
+            reason = "rate_limited" if status_code == 429 else "overloaded"
+            self._stats[reason] += 1
+            metrics.CLAUDE_RETRIES.inc(reason=reason)
+            delay = min(self._backoff_max, self._backoff_base * 2 ** (self._failures - 1))
+            retry_after = _parse_retry_after(headers)
+            if retry_after is not None:
+                # The server's delay is a minimum; jitter spreads the restarts
+                delay = retry_after + random.uniform(0, self._backoff_base)
+            else:
+                delay = random.uniform(delay / 2, delay)
+            self._pause_until = max(self._pause_until, time.time() + delay)
+            logger.warning(
+                "Claude API %s — all calls paused for %.1fs (%d consecutive)",
+                "rate limited" if status_code == 429 else "overloaded", delay, self._failures,
+            )
+
+    def stats(self) -> dict:
+        """Return counters and the current bucket levels."""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["paused_seconds"] = max(0.0, self._pause_until - time.time())
+            for name, bucket in (("requests", self._requests), ("input_tokens", self._tokens)):
+                bucket.refill(time.monotonic())
+                snapshot[f"{name}_per_minute"] = bucket.capacity
+                snapshot[f"{name}_available"] = max(0.0, bucket.level)
+        return snapshot
+
+
+def _estimate_tokens(request) -> int:
+    """Estimate the input tokens of a Messages API request from its body size."""
+    if request.method != "POST" or not request.url.path.endswith("/v1/messages"):
+        return 0
+    try:
+        return int(request.headers.get("content-length") or 0) // _BYTES_PER_TOKEN
+    except ValueError:
+        return 0
+
+
+_clients: dict[tuple, anthropic.Anthropic] = {}
+_limiter: RateLimiter | None = None
+_registry_lock = threading.Lock()
+_limiter_lock = threading.Lock()
+
+
+def get_limiter() -> RateLimiter:
+    """Return the process-wide rate limiter (created from claude.rate_limit)."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            cfg = get_config().get("claude", {}).get("rate_limit", {})
+            _limiter = RateLimiter(
+                requests_per_minute=float(cfg.get("requests_per_minute", 50)),
+                input_tokens_per_minute=float(cfg.get("input_tokens_per_minute", 0)),
+                backoff_base=float(cfg.get("backoff_base_seconds", 2)),
+                backoff_max=float(cfg.get("backoff_max_seconds", 60)),
+            )
+        return _limiter
+
+
+def get_client() -> anthropic.Anthropic:
+    """Return the shared Anthropic client for the current API key and base URL.
+
+    Returns:
+        Client whose HTTP connections and rate limiter are shared process-wide.
+
+    Raises:
+        RuntimeError: If ANTHROPIC_API_KEY is not set (not needed to replay cassettes).
+    """
+    api_key = os.environ.get("ANTHROPIC_API_KEY", "")
+    if not api_key and llm_transport.transport_config()["mode"] == "replay":
+        api_key = "sk-replay"
+    if not api_key or api_key.startswith("sk-ant-..."):
+        raise RuntimeError("ANTHROPIC_API_KEY non configurée.")
+
+    key = (api_key, os.environ.get("ANTHROPIC_BASE_URL", ""))
+    with _registry_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _build_client(api_key)
+            _clients[key] = client
+    return client
+
+
+@contextlib.contextmanager
+def cancel_scope(cancel: threading.Event | None):
+    """Let cancel interrupt the rate limiter waits and retries of the Claude calls made in the block.
+
+    The scope is per thread: batch threads must enter it themselves.
+
+    Args:
+        cancel: Cancel event of the job (None = calls are not interruptible).
+    """
+    token = _cancel_event.set(cancel)
+    try:
+        yield
+    finally:
+        _cancel_event.reset(token)
+
+
+def _should_retry(response) -> bool:
+    """Same retry policy as the SDK: x-should-retry, then 408, 409, 429 and 5xx."""
+    header = response.headers.get("x-should-retry")
+    if header in ("true", "false"):
+        return header == "true"
+    return response.status_code in (408, 409, 429) or response.status_code >= 500
+
+
+def _retry_middleware(max_retries: int):
+    """Build the middleware that retries failed attempts in place of the SDK.
+
+    Args:
+        max_retries: Retries after the first attempt.
+
+    Returns:
+        Middleware callable for anthropic.Anthropic(middleware=...).
+    """
+
+    def retry(request, call_next):
+        cancel = _cancel_event.get()
+        attempt = 0
+        while True:
+            if cancel is not None and cancel.is_set():
+                raise job_queue.JobCancelledError("claude call")
+            try:
+                response = call_next(request)
+            except anthropic.APIConnectionError as exc:
+                if isinstance(exc.__cause__, job_queue.JobCancelledError):
+                    # Raised by the limiter in the request hook, wrapped by the SDK
+                    raise exc.__cause__ from None
+                if attempt >= max_retries:
+                    raise
+                status = None
+            else:
+                status = response.http_response.status_code
+                if attempt >= max_retries or not _should_retry(response.http_response):
+                    return response
+                response.http_response.close()
+            attempt += 1
+            if status not in (429, 529):
+                # A 429/529 already paused the limiter, which the next attempt waits for
+                delay = min(_RETRY_DELAY_MAX, _RETRY_DELAY_INITIAL * 2 ** (attempt - 1))
+                delay *= random.uniform(0.75, 1.0)
+                if cancel is None:
+                    time.sleep(delay)
+                elif cancel.wait(delay):
+                    raise job_queue.JobCancelledError("claude call")
+            logger.info("Retrying Claude call (%d/%d, %s)", attempt, max_retries, status or "connection error")
+
+    return retry
+
+
+def _build_client(api_key: str) -> anthropic.Anthropic:
+    """Create a client whose HTTP requests go through the rate limiter."""
+    limiter = get_limiter()
+    max_retries = int(get_config().get("claude", {}).get("rate_limit", {}).get("max_retries", 6))
+
+    def on_request(request) -> None:
+        limiter.acquire(_estimate_tokens(request), _cancel_event.get())
+
+    def on_response(response) -> None:
+        if response.status_code >= 400:
+            metrics.CLAUDE_HTTP_ERRORS.inc(status=str(response.status_code))
+        limiter.observe(response.status_code, response.headers)
+
+    http_kwargs = {}
+    transport = llm_transport.build_transport()
+    if transport is not None:
+        http_kwargs["transport"] = transport
+    http_client = anthropic.DefaultHttpxClient(
+        event_hooks={"request": [on_request], "response": [on_response]},
+        **http_kwargs,
+    )
+    return anthropic.Anthropic(
+        api_key=api_key,
+        http_client=http_client,
+        max_retries=0,
+        middleware=[_retry_middleware(max_retries)],
+    )
+
+
+def _collect_metrics() -> list[tuple]:
+    if _limiter is None:
+        return []
+    counters = _limiter.stats()
+    return [
+        ("pas_claude_throttled_total", "counter", "Claude calls delayed by the rate limiter.",
+         [({}, counters["throttled"])]),
+        ("pas_claude_throttle_wait_seconds_total", "counter", "Time spent waiting for the rate limiter.",
+         [({}, counters["waited_seconds"])]),
+        ("pas_claude_pause_seconds", "gauge", "Remaining pause after a 429/529 response.",
+         [({}, counters["paused_seconds"])]),
+    ]
+
+
+metrics.register_collector(_collect_metrics)
@@ -0,0 +1,194 @@
+"""PAS Assistant — Local lexical retrieval over corpus Q&A pairs.
+
+Builds an Okapi BM25 index over the question/answer pairs of the corpus
+(already filled questionnaires) so that each batch of questions only receives
+the past answers closest to it, instead of the first rows of whole corpus files.
+Everything runs in-process: no network, no external dependency.
+
+Pairs come from the qa.jsonl artifact of each entry (see corpus_qa). Indexes
+are kept in memory and rebuilt when an artifact changes.
+"""
+
+import logging
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter
+
+from app.services import corpus_qa
+
+logger = logging.getLogger(__name__)
+
+# Frequent French (and a few English) words that carry no retrieval signal
+_STOPWORDS = frozenset("""
+a afin ai aie aient ainsi al alors au aucun aucune aupres auquel aura aurait aussi autre autres aux
+avec avez avoir ayant c ca ce ceci cela celle celles celui cependant certain certains ces cet cette
+ceux chaque chez ci comme comment d dans de des desquelles desquels deux dont du duquel elle elles
+en encore entre est et etaient etait etant ete etre eu eux fait faire faut il ils j je l la laquelle
+le lequel les lesquelles lesquels leur leurs lors lui m ma mais me meme memes mes moi mon n ne ni
+non nos notre nous on ont ou oui par parmi pas pendant peu peut peuvent plus pour pourquoi qu quand
+que quel quelle quelles quels qui quoi s sa sans se selon ser sera serait ses si sinon soit son
+sont sous sur ta te tel telle telles tels tes toi ton tous tout toute toutes tres tu un une unes uns
+vos votre vous y
+the of and or to in is are be for on with by this that an as at it not
+""".split())
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _stem(term: str) -> str:
+    """Minimal French plural folding (sauvegardes → sauvegarde, reseaux → reseau, logs → log)."""
+    if len(term) > 3 and term[-1] in "sx" and term[-2] != "s":
+        return term[:-1]
+    return term
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase, strip accents and split text into index terms (stopwords removed)."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return [_stem(t) for t in _TOKEN_RE.findall(text) if len(t) > 1 and t not in _STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 index over Q&A pairs (question and answer text are both indexed)."""
+
+    def __init__(self, pairs: list[dict], k1: float = 1.5, b: float = 0.75) -> None:
+        self.pairs = pairs
+        self._k1 = k1
+        self._b = b
+        self._doc_tf: list[Counter] = []
+        self._doc_len: list[int] = []
+        df: Counter = Counter()
+        for p in pairs:
+            # The question is weighted twice: it is what new questions are compared to
+            terms = tokenize(p["question"]) * 2 + tokenize(p.get("answer") or "")
+            tf = Counter(terms)
+            self._doc_tf.append(tf)
+            self._doc_len.append(len(terms))
+            df.update(tf.keys())
+        n = len(pairs)
+        self._avg_len = (sum(self._doc_len) / n) if n else 0.0
+        self._idf = {t: math.log(1 + (n - f + 0.5) / (f + 0.5)) for t, f in df.items()}
+        # Inverted index: term → documents containing it
+        self._postings: dict[str, list[int]] = {}
+        for i, tf in enumerate(self._doc_tf):
+            for t in tf:
+                self._postings.setdefault(t, []).append(i)
+
+    def __len__(self) -> int:
+        return len(self.pairs)
+
+    def search(self, text: str, k: int, min_score: float = 0.0) -> list[tuple[float, dict]]:
+        """Return the k best (score, pair) matches for text, best first.
+
+        Args:
+            text: Query text (typically a questionnaire question).
+            k: Maximum number of results.
+            min_score: Results scoring below this threshold are dropped.
+        """
+        scores: dict[int, float] = {}
+        for t in set(tokenize(text)):
+            idf = self._idf.get(t)
+            if idf is None:
+                continue
+            for i in self._postings[t]:
+                f = self._doc_tf[i][t]
+                norm = self._k1 * (1 - self._b + self._b * self._doc_len[i] / self._avg_len)
+                scores[i] = scores.get(i, 0.0) + idf * f * (self._k1 + 1) / (f + norm)
+        best = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:k]
+        return [(s, self.pairs[i]) for i, s in best if s >= min_score]
+
+
+_indexes: dict[tuple, BM25Index] = {}
+_indexes_lock = threading.Lock()
+_MAX_CACHED_INDEXES = 8
+
+
+def _artifact_stamp(corpus_id: str) -> tuple:
+    """Identify the current Q&A artifact of a corpus entry (rebuilt first if stale)."""
+    qa_path = corpus_qa.ensure_qa_artifact(corpus_id)
+    stamp = []
+    for path in (qa_path, qa_path.parent / "metadata.json"):
+        try:
+            stamp.append(path.stat().st_mtime_ns)
+        except OSError:
+            stamp.append(None)
+    return (corpus_id, *stamp)
+
+
+def get_index(corpus_ids: list[str]) -> BM25Index:
+    """Return the BM25 index of the given corpus entries (built once, cached in memory).
+
+    Args:
+        corpus_ids: Corpus entries to index.
+
+    Returns:
+        BM25Index over all their Q&A pairs.
+    """
+    key = tuple(sorted(_artifact_stamp(cid) for cid in corpus_ids))
+    with _indexes_lock:
+        index = _indexes.get(key)
+    if index is not None:
+        return index
+
+    pairs = []
+    for cid in corpus_ids:
+        entry_pairs = corpus_qa.load_qa_pairs(cid)
+        if not entry_pairs:
+            logger.warning("Corpus entry %s adds no Q&A pair to the index", cid)
+        pairs.extend(entry_pairs)
+    index = BM25Index(pairs)
+    logger.info("Built corpus index: %d entries, %d Q&A pairs", len(corpus_ids), len(pairs))
+    with _indexes_lock:
+        if len(_indexes) >= _MAX_CACHED_INDEXES:
+            _indexes.pop(next(iter(_indexes)))
+        _indexes[key] = index
+    return index
+
+
+def retrieve_examples(
+    index: BM25Index,
+    questions: list[dict],
+    top_k: int = 3,
+    min_score: float = 1.0,
+    max_examples: int = 60,
+) -> list[dict]:
+    """Select the past Q&A pairs closest to a batch of questions.
+
+    Args:
+        index: Corpus index from get_index().
+        questions: List of {"question_id", "question_text"} dicts.
+        top_k: Matches kept per question.
+        min_score: Minimum BM25 score of a match.
+        max_examples: Cap on the number of distinct pairs for the whole batch.
+
+    Returns:
+        Distinct pairs, best matches of each question first.
+    """
+    selected: dict[tuple[str, str], dict] = {}
+    for q in questions:
+        for _score, pair in index.search(q["question_text"], top_k, min_score):
+            selected.setdefault((pair["corpus_id"], pair["id"]), pair)
+            if len(selected) >= max_examples:
+                return list(selected.values())
+    return list(selected.values())
+
+
+def format_examples(pairs: list[dict]) -> str:
+    """Format retrieved pairs for the prompt, grouped by corpus file."""
+    by_file: dict[str, list[dict]] = {}
+    for p in pairs:
+        by_file.setdefault(p["filename"], []).append(p)
+
+    lines: list[str] = []
+    for filename, file_pairs in by_file.items():
+        lines.append(f"=== {filename} ===")
+        for p in file_pairs:
+            line = f"ID: {p['id']} | Question: {p['question']}"
+            if p.get("answer"):
+                line += f" | Réponse: {p['answer']}"
+            lines.append(line)
+        lines.append("")
+    return "\n".join(lines).strip()
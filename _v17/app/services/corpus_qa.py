@@ -0,0 +1,306 @@
+"""PAS Assistant — Normalized Q&A artifact of corpus entries.
+
+When a corpus entry is anonymized or its structure / metadata are saved, its
+question/answer pairs are extracted once into data/corpus/<id>/qa.jsonl (one
+{"id", "question", "answer", "status"} object per line). Generation, retrieval
+and corpus selection read that file instead of reopening the Office documents.
+
+qa_meta.json records the size, mtime and SHA-256 of the sources the artifact was
+built from; a source whose mtime or size changed is re-hashed, and the artifact
+is rebuilt only if its content actually changed.
+"""
+
+import hashlib
+import json
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+
+from openpyxl import load_workbook
+from openpyxl.utils import column_index_from_string
+
+from app.config import BASE_DIR
+
+logger = logging.getLogger(__name__)
+
+CORPUS_DIR = BASE_DIR / "data" / "corpus"
+
+QA_FILENAME = "qa.jsonl"
+QA_META_FILENAME = "qa_meta.json"
+
+# Files the artifact is derived from (missing ones are recorded as absent)
+_SOURCES = ("anonymized.xlsx", "anonymized.docx", "structure.json")
+
+# Docx corpus entries have no Q&A structure: paragraphs are grouped into passages
+_DOCX_PASSAGE_CHARS = 800
+
+# Bumped when extraction changes, so that existing artifacts are rebuilt
+_ARTIFACT_VERSION = 2
+
+
+def _extract_xlsx_rows(anon_path: Path) -> list[dict]:
+    """Return the non-empty rows of the active sheet as passages (no confirmed structure)."""
+    wb = load_workbook(anon_path, read_only=True, data_only=True)
+    try:
+        pairs = []
+        for row_idx, row in enumerate(wb.active.iter_rows(values_only=True), start=1):
+            row_text = " | ".join(str(c).strip() for c in row if c is not None and str(c).strip())
+            if row_text:
+                pairs.append({"id": f"r{row_idx}", "question": row_text, "answer": "", "status": None})
+    finally:
+        wb.close()
+    return pairs
+
+
+def _extract_xlsx_pairs(corpus_dir: Path) -> list[dict]:
+    """Return every Q&A row of a corpus xlsx, or its rows as passages without a confirmed structure."""
+    anon_path = corpus_dir / "anonymized.xlsx"
+    struct_path = corpus_dir / "structure.json"
+    if not anon_path.exists():
+        return []
+    structure = json.loads(struct_path.read_text(encoding="utf-8")) if struct_path.exists() else {}
+    if not structure.get("col_question"):
+        # No confirmed structure — index non-empty rows, like docx passages
+        return _extract_xlsx_rows(anon_path)
+
+    first_data_row = int(structure.get("first_data_row") or 2)
+    col_q = column_index_from_string(structure["col_question"].upper()) - 1
+    col_r = (
+        column_index_from_string(structure["col_response"].upper()) - 1
+        if structure.get("col_response") else None
+    )
+    col_id = (
+        column_index_from_string(structure["col_id"].upper()) - 1
+        if structure.get("col_id") else None
+    )
+    col_s = (
+        column_index_from_string(structure["col_status"].upper()) - 1
+        if structure.get("col_status") else None
+    )
+
+    def cell(row: tuple, idx: int | None) -> str:
+        if idx is None or idx >= len(row) or row[idx] is None:
+            return ""
+        return str(row[idx]).strip()
+
+    wb = load_workbook(anon_path, read_only=True, data_only=True)
+    try:
+        sheet_name = structure.get("selected_sheet")
+        ws = wb[sheet_name] if sheet_name and sheet_name in wb.sheetnames else wb.active
+        pairs = []
+        for row_idx, row in enumerate(ws.iter_rows(values_only=True), start=1):
+            if row_idx < first_data_row:
+                continue
+            question = cell(row, col_q)
+            if not question:
+                continue
+            pairs.append({
+                "id": cell(row, col_id) or str(row_idx),
+                "question": question,
+                "answer": cell(row, col_r),
+                "status": cell(row, col_s) or None,
+            })
+    finally:
+        wb.close()
+    return pairs
+
+
+def _extract_docx_pairs(corpus_dir: Path) -> list[dict]:
+    """Return the passages of a corpus docx (table rows and paragraph groups)."""
+    anon_path = corpus_dir / "anonymized.docx"
+    if not anon_path.exists():
+        return []
+
+    from docx import Document as DocxDocument  # local import to avoid hard dep at module level
+
+    doc = DocxDocument(anon_path)
+    pairs: list[dict] = []
+
+    def add_passage(lines: list[str]) -> None:
+        pairs.append({"id": f"p{len(pairs) + 1}", "question": "\n".join(lines), "answer": "", "status": None})
+
+    passage: list[str] = []
+    for para in doc.paragraphs:
+        text = para.text.strip()
+        if not text:
+            continue
+        passage.append(text)
+        if sum(len(p) for p in passage) >= _DOCX_PASSAGE_CHARS:
+            add_passage(passage)
+            passage = []
+    if passage:
+        add_passage(passage)
+
+    # Two-column tables are usually question | answer
+    for t_idx, table in enumerate(doc.tables, start=1):
+        for r_idx, row in enumerate(table.rows, start=1):
+            cells = [c.text.strip() for c in row.cells if c.text.strip()]
+            if not cells:
+                continue
+            pairs.append({
+                "id": f"t{t_idx}.{r_idx}",
+                "question": cells[0],
+                "answer": " | ".join(cells[1:]),
+                "status": None,
+            })
+    return pairs
+
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _source_state(corpus_dir: Path, with_hash: bool) -> dict:
+    """Return {source name: {"mtime_ns", "size"[, "sha256"]} or None if absent}."""
+    state: dict = {}
+    for name in _SOURCES:
+        path = corpus_dir / name
+        try:
+            st = path.stat()
+        except OSError:
+            state[name] = None
+            continue
+        entry = {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+        if with_hash:
+            entry["sha256"] = _sha256(path)
+        state[name] = entry
+    return state
+
+
+def _read_meta(corpus_dir: Path) -> dict | None:
+    try:
+        return json.loads((corpus_dir / QA_META_FILENAME).read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _write_json_atomic(path: Path, text: str) -> None:
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_text(text, encoding="utf-8")
+    tmp_path.replace(path)
+
+
+def build_qa_artifact(corpus_id: str) -> int:
+    """Extract the Q&A pairs of a corpus entry into qa.jsonl.
+
+    Args:
+        corpus_id: UUID of the corpus entry.
+
+    Returns:
+        Number of pairs written (0 if the entry is not anonymized yet or unreadable).
+    """
+    corpus_dir = CORPUS_DIR / corpus_id
+    meta_path = corpus_dir / "metadata.json"
+    if not meta_path.exists():
+        return 0
+    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+
+    state = _source_state(corpus_dir, with_hash=True)
+    try:
+        if meta.get("format", "xlsx") == "docx":
+            pairs = _extract_docx_pairs(corpus_dir)
+        else:
+            pairs = _extract_xlsx_pairs(corpus_dir)
+    except Exception:
+        logger.exception("Failed to extract Q&A pairs from corpus entry %s", corpus_id)
+        pairs = []
+
+    _write_json_atomic(
+        corpus_dir / QA_FILENAME,
+        "".join(json.dumps(p, ensure_ascii=False) + "\n" for p in pairs),
+    )
+    _write_json_atomic(
+        corpus_dir / QA_META_FILENAME,
+        json.dumps(
+            {
+                "version": _ARTIFACT_VERSION,
+                "sources": state,
+                "count": len(pairs),
+                "built_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            },
+            ensure_ascii=False,
+            indent=2,
+        ),
+    )
+    logger.info("Corpus %s — Q&A artifact built (%d pairs)", corpus_id, len(pairs))
+    return len(pairs)
+
+
+def is_fresh(corpus_id: str) -> bool:
+    """Whether qa.jsonl still matches its sources.
+
+    Sources whose mtime and size are unchanged are trusted; the others are
+    re-hashed, and a matching hash refreshes the recorded mtime (touch, copy).
+    """
+    corpus_dir = CORPUS_DIR / corpus_id
+    meta = _read_meta(corpus_dir)
+    if meta is None or not (corpus_dir / QA_FILENAME).exists():
+        return False
+    if meta.get("version") != _ARTIFACT_VERSION:
+        return False
+
+    recorded = meta.get("sources", {})
+    current = _source_state(corpus_dir, with_hash=False)
+    refreshed = False
+    for name, cur in current.items():
+        old = recorded.get(name)
+        if cur is None or old is None:
+            if cur != old:
+                return False
+            continue
+        if cur["mtime_ns"] == old["mtime_ns"] and cur["size"] == old["size"]:
+            continue
+        if cur["size"] != old["size"] or _sha256(corpus_dir / name) != old.get("sha256"):
+            return False
+        old["mtime_ns"] = cur["mtime_ns"]
+        refreshed = True
+
+    if refreshed:
+        _write_json_atomic(
+            corpus_dir / QA_META_FILENAME, json.dumps(meta, ensure_ascii=False, indent=2)
+        )
+    return True
+
+
+def ensure_qa_artifact(corpus_id: str) -> Path:
+    """Rebuild qa.jsonl if it is missing or stale, and return its path."""
+    if not is_fresh(corpus_id):
+        build_qa_artifact(corpus_id)
+    return CORPUS_DIR / corpus_id / QA_FILENAME
+
+
+def load_qa_pairs(corpus_id: str) -> list[dict]:
+    """Return the Q&A pairs of a corpus entry, from its (fresh) qa.jsonl.
+
+    Args:
+        corpus_id: UUID of the corpus entry.
+
+    Returns:
+        List of {"corpus_id", "filename", "id", "question", "answer", "status"}
+        dicts (empty if the entry is unreadable).
+    """
+    corpus_dir = CORPUS_DIR / corpus_id
+    meta_path = corpus_dir / "metadata.json"
+    if not meta_path.exists():
+        return []
+    filename = json.loads(meta_path.read_text(encoding="utf-8")).get("filename", corpus_id)
+
+    path = ensure_qa_artifact(corpus_id)
+    if not path.exists():
+        return []
+    pairs = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                pairs.append({"corpus_id": corpus_id, "filename": filename, **json.loads(line)})
+    return pairs
+
+
+def qa_count(corpus_id: str) -> int | None:
+    """Return the number of pairs recorded at the last build, or None if never built."""
+    meta = _read_meta(CORPUS_DIR / corpus_id)
+    return meta.get("count") if meta else None
@@ -0,0 +1,246 @@
+"""PAS Assistant — In-process generation job queue.
+
+Generations run on a fixed number of worker threads (generation.workers)
+instead of one unbounded background task per request, so that a few
+simultaneous "Générer" clicks cannot exhaust the CPU and memory of the server.
+
+Scheduling, when a worker becomes free:
+1. priority first: interactive jobs before bulk jobs (Message Batches mode,
+   restarts of interrupted generations);
+2. then fairness between users: the user with the fewest running jobs, then
+   the one served least recently, so that one user's queue cannot starve others;
+3. then submission order.
+
+Admission control: submit() raises QueueFullError once generation.max_queued
+jobs are waiting, or generation.max_queued_per_user for the same user.
+
+Cancellation: cancel() drops a waiting job, or sets the cancel event of a
+running one; the job checks it at its cancellation points and raises
+JobCancelledError, which frees the worker.
+"""
+
+import itertools
+import logging
+import threading
+import time
+from typing import Callable
+
+from app.config import get_config
+from app.services import metrics
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 1
+
+
+class QueueFullError(Exception):
+    """Raised when a job is refused because the queue is too deep."""
+
+
+class JobCancelledError(Exception):
+    """Raised by a running job at a cancellation point once it has been cancelled."""
+
+
+class JobQueue:
+    """Bounded priority queue of generation jobs served by worker threads."""
+
+    def __init__(self, workers: int = 1, max_queued: int = 10, max_queued_per_user: int = 3) -> None:
+        """Create a queue (workers start on the first submit()).
+
+        Args:
+            workers: Number of jobs run concurrently.
+            max_queued: Maximum number of waiting jobs.
+            max_queued_per_user: Maximum number of waiting jobs per user.
+        """
+        self._workers = max(1, workers)
+        self._max_queued = max_queued
+        self._max_queued_per_user = max_queued_per_user
+        self._cond = threading.Condition()
+        self._pending: list[dict] = []
+        self._running: dict[str, dict] = {}       # project_id → job
+        self._running_per_user: dict[str, int] = {}
+        self._last_served: dict[str, float] = {}  # user → monotonic time of last start
+        self._seq = itertools.count()
+        self._threads: list[threading.Thread] = []
+
+    def submit(
+        self,
+        project_id: str,
+        user: str,
+        fn: Callable[..., None],
+        *args,
+        priority: int = PRIORITY_INTERACTIVE,
+        force: bool = False,
+        **kwargs,
+    ) -> int:
+        """Queue fn(*args, **kwargs) for a project.
+
+        Args:
+            project_id: Project the job works on (one job per project at a time).
+            user: Owner of the project (fairness key).
+            fn: Job function; exceptions are logged, not propagated.
+            priority: PRIORITY_INTERACTIVE or PRIORITY_BULK.
+            force: Skip admission control (jobs admitted before a restart).
+
+        Returns:
+            1-based position of the job in the queue.
+
+        Raises:
+            QueueFullError: If the queue (or the user's share of it) is full.
+            ValueError: If the project already has a queued or running job.
+        """
+        with self._cond:
+            if project_id in self._running or any(j["project_id"] == project_id for j in self._pending):
+                raise ValueError(f"Project {project_id} already has a generation job")
+            if not force:
+                if len(self._pending) >= self._max_queued:
+                    raise QueueFullError(
+                        "File d'attente des générations pleine : réessayez dans quelques minutes."
+                    )
+                if sum(1 for j in self._pending if j["user"] == user) >= self._max_queued_per_user:
+                    raise QueueFullError(
+                        "Vous avez déjà trop de générations en attente : patientez avant d'en lancer d'autres."
+                    )
+            self._pending.append({
+                "project_id": project_id,
+                "user": user,
+                "fn": fn,
+                "args": args,
+                "kwargs": kwargs,
+                "priority": priority,
+                "seq": next(self._seq),
+                "submitted_at": time.time(),
+                "cancel": threading.Event(),
+            })
+            self._ensure_workers()
+            self._cond.notify()
+            position = self._position(project_id)
+        logger.info(
+            "Job queued for project %s (user %s, priority %d, position %s)",
+            project_id, user, priority, position,
+        )
+        return position
+
+    def position(self, project_id: str) -> int | None:
+        """Return the 1-based queue position of a waiting job, or None (running or unknown)."""
+        with self._cond:
+            return self._position(project_id)
+
+    def cancel(self, project_id: str) -> str | None:
+        """Cancel the job of a project.
+
+        Args:
+            project_id: UUID of the project.
+
+        Returns:
+            "queued" if a waiting job was dropped, "running" if a running job was
+            asked to stop, None if the project has no job.
+        """
+        with self._cond:
+            for job in self._pending:
+                if job["project_id"] == project_id:
+                    self._pending.remove(job)
+                    logger.info("Queued job cancelled for project %s", project_id)
+                    return "queued"
+            job = self._running.get(project_id)
+            if job is None:
+                return None
+            job["cancel"].set()
+        logger.info("Cancellation requested for running job of project %s", project_id)
+        return "running"
+
+    def cancel_event(self, project_id: str) -> threading.Event | None:
+        """Return the cancel event of the running job of a project, or None."""
+        with self._cond:
+            job = self._running.get(project_id)
+            return job["cancel"] if job is not None else None
+
+    def stats(self) -> dict:
+        """Return the number of waiting and running jobs and the worker count."""
+        with self._cond:
+            return {"queued": len(self._pending), "running": len(self._running), "workers": self._workers}
+
+    # -- internals (called with self._cond held) ------------------------------
+
+    def _order_key(self, job: dict) -> tuple:
+        user = job["user"]
+        return (
+            job["priority"],
+            self._running_per_user.get(user, 0),
+            self._last_served.get(user, 0.0),
+            job["seq"],
+        )
+
+    def _position(self, project_id: str) -> int | None:
+        ordered = sorted(self._pending, key=self._order_key)
+        for idx, job in enumerate(ordered, start=1):
+            if job["project_id"] == project_id:
+                return idx
+        return None
+
+    def _ensure_workers(self) -> None:
+        while len(self._threads) < self._workers:
+            thread = threading.Thread(
+                target=self._worker, name=f"generation-worker-{len(self._threads) + 1}", daemon=True
+            )
+            self._threads.append(thread)
+            thread.start()
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                job = min(self._pending, key=self._order_key)
+                self._pending.remove(job)
+                user = job["user"]
+                self._running[job["project_id"]] = job
+                self._running_per_user[user] = self._running_per_user.get(user, 0) + 1
+                self._last_served[user] = time.monotonic()
+
+            logger.info(
+                "Job started for project %s after %.1fs in queue",
+                job["project_id"], time.time() - job["submitted_at"],
+            )
+            try:
+                job["fn"](*job["args"], **job["kwargs"])
+            except Exception:
+                logger.exception("Job failed for project %s", job["project_id"])
+            finally:
+                with self._cond:
+                    self._running.pop(job["project_id"], None)
+                    self._running_per_user[user] -= 1
+                    if not self._running_per_user[user]:
+                        del self._running_per_user[user]
+
+
+_queue: JobQueue | None = None
+_queue_lock = threading.Lock()
+
+
+def get_queue() -> JobQueue:
+    """Return the process-wide job queue (created from the generation config)."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            cfg = get_config().get("generation", {})
+            _queue = JobQueue(
+                workers=int(cfg.get("workers", 1)),
+                max_queued=int(cfg.get("max_queued", 10)),
+                max_queued_per_user=int(cfg.get("max_queued_per_user", 3)),
+            )
+        return _queue
+
+
+def _collect_metrics() -> list[tuple]:
+    if _queue is None:
+        return []
+    counts = _queue.stats()
+    return [
+        ("pas_generations_active", "gauge", "Generation jobs running.", [({}, counts["running"])]),
+        ("pas_generation_queue_depth", "gauge", "Generation jobs waiting for a worker.", [({}, counts["queued"])]),
+    ]
+
+
+metrics.register_collector(_collect_metrics)
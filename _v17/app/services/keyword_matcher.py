@@ -0,0 +1,194 @@
+"""PAS Assistant — Single-pass multi-keyword replacement.
+
+Anonymization replaces tens of keywords in large XML parts. One str.replace per
+keyword costs O(keywords × text) and lets a later keyword re-match inside the
+token written by an earlier one. KeywordMatcher compiles the whole mapping into
+one regular expression shaped as a trie of the keywords (each shared prefix
+appears once, so the regex engine follows a single branch per character instead
+of trying every keyword) and replaces every match in one scan:
+
+- leftmost-longest: at each position the longest keyword wins ("ACME Group"
+  before "ACME"), the semantics anonymize_xlsx got from sorting by length;
+- replacements are never rescanned, so a token can't be re-matched.
+
+stream() applies the same replacement to text arriving in chunks (a large XML
+part read from a zip) with bounded memory: the tail of each chunk that could
+hold the start of a match — max_len - 1 characters — is carried over to the
+next one, so no match is split and the result equals sub() on the whole text.
+
+sub_pieces() replaces keywords in text split across pieces (the runs of a
+Word paragraph): matches may span pieces, each replacement goes to the piece
+where its match starts and the rest of the match is removed from the others.
+"""
+
+import bisect
+import functools
+import html
+import itertools
+import re
+from typing import Callable, Iterable, Iterator
+
+
+def _trie_pattern(words: list[str]) -> str:
+    """Return a regex source matching any of words, longest alternative first."""
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}  # end of a word
+
+    def emit(node: dict) -> str:
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            # A word ends here: the greedy ? tries the longer words first
+            body = f"(?:{body})?"
+        return body
+
+    return emit(trie)
+
+
+def _stream_sub(
+    regex: re.Pattern, replace: Callable[[re.Match], str], max_len: int, chunks: Iterable[str],
+) -> Iterator[str]:
+    """regex.sub(replace, "".join(chunks)), chunk by chunk, for matches of at most max_len chars."""
+    carry = ""
+    for chunk in chunks:
+        buf = carry + chunk
+        # A match starting before cut ends inside buf: it is complete
+        cut = len(buf) - max_len + 1
+        if cut <= 0:
+            carry = buf
+            continue
+        out: list[str] = []
+        pos = 0
+        for match in regex.finditer(buf):
+            if match.start() >= cut:
+                break
+            out.append(buf[pos:match.start()])
+            out.append(replace(match))
+            pos = match.end()
+        keep = max(pos, cut)
+        out.append(buf[pos:keep])
+        carry = buf[keep:]
+        yield "".join(out)
+    if carry:
+        yield regex.sub(replace, carry)
+
+
+class RegexReplacer:
+    """Literal replacement of a regex whose matches are at most max_len characters long."""
+
+    def __init__(self, regex: re.Pattern, replacement: str, max_len: int) -> None:
+        self._regex = regex
+        self._replacement = replacement
+        self.max_len = max_len
+
+    def _replace(self, match: re.Match) -> str:
+        return self._replacement
+
+    def sub(self, text: str) -> str:
+        """Return text with every match replaced."""
+        return self._regex.sub(self._replace, text)
+
+    def stream(self, chunks: Iterable[str]) -> Iterator[str]:
+        """Same as sub() over the concatenated chunks, yielded chunk by chunk."""
+        return _stream_sub(self._regex, self._replace, self.max_len, chunks)
+
+
+class KeywordMatcher:
+    """Compiled {keyword: replacement} mapping, applied in a single pass."""
+
+    def __init__(self, mapping: dict[str, str], xml_escaped: bool = False) -> None:
+        """Compile a mapping.
+
+        Args:
+            mapping: {keyword: replacement}; empty keywords are ignored.
+            xml_escaped: Also match the XML-escaped form of each keyword ('&' →
+                '&amp;') and replace it with the escaped replacement, for raw XML.
+        """
+        replacements: dict[str, str] = {}
+        for keyword, replacement in mapping.items():
+            if not keyword:
+                continue
+            replacements[keyword] = replacement
+            if xml_escaped:
+                escaped = html.escape(keyword, quote=False)
+                if escaped != keyword:
+                    replacements[escaped] = html.escape(replacement, quote=False)
+        self._replacements = replacements
+        self.max_len = max((len(k) for k in replacements), default=0)
+        self._regex = re.compile(_trie_pattern(list(replacements))) if replacements else None
+
+    def __bool__(self) -> bool:
+        return self._regex is not None
+
+    def _replace(self, match: re.Match) -> str:
+        return self._replacements[match.group()]
+
+    def sub(self, text: str) -> str:
+        """Return text with every keyword replaced."""
+        if self._regex is None:
+            return text
+        return self._regex.sub(self._replace, text)
+
+    def stream(self, chunks: Iterable[str]) -> Iterator[str]:
+        """Same as sub() over the concatenated chunks, yielded chunk by chunk."""
+        if self._regex is None:
+            return iter(chunks)
+        return _stream_sub(self._regex, self._replace, self.max_len, chunks)
+
+    def subn(self, text: str) -> tuple[str, int]:
+        """Return (text with every keyword replaced, number of replacements)."""
+        if self._regex is None:
+            return text, 0
+        return self._regex.subn(self._replace, text)
+
+    def sub_pieces(self, pieces: list[str]) -> tuple[list[str], int]:
+        """Replace keywords in the concatenation of pieces, keeping the split.
+
+        Args:
+            pieces: Consecutive fragments of one text.
+
+        Returns:
+            (new pieces, number of replacements); the pieces are returned
+            unchanged when nothing matched.
+        """
+        text = "".join(pieces)
+        matches = list(self._regex.finditer(text)) if self._regex is not None else []
+        if not matches:
+            return pieces, 0
+
+        ends = list(itertools.accumulate(len(p) for p in pieces))
+        out: list[list[str]] = [[] for _ in pieces]
+
+        def copy(start: int, stop: int) -> None:
+            while start < stop:
+                k = bisect.bisect_right(ends, start)
+                cut = min(stop, ends[k])
+                out[k].append(text[start:cut])
+                start = cut
+
+        pos = 0
+        for match in matches:
+            copy(pos, match.start())
+            out[bisect.bisect_right(ends, match.start())].append(self._replace(match))
+            pos = match.end()
+        copy(pos, len(text))
+        return ["".join(parts) for parts in out], len(matches)
+
+
+@functools.lru_cache(maxsize=64)
+def _cached(items: tuple[tuple[str, str], ...], xml_escaped: bool) -> KeywordMatcher:
+    return KeywordMatcher(dict(items), xml_escaped)
+
+
+def compile_mapping(mapping: dict[str, str], xml_escaped: bool = False) -> KeywordMatcher:
+    """Return the matcher of a mapping, reusing the one compiled for an equal mapping.
+
+    For callers that apply the same mapping many times (one call per answer...).
+    """
+    return _cached(tuple(mapping.items()), xml_escaped)
@@ -0,0 +1,234 @@
+"""PAS Assistant — Record/replay transport for the Anthropic API ("cassettes").
+
+Plugged into the shared client (claude_client._build_client) as its HTTP
+transport, so that every Claude call of the process — structure detection,
+questionnaire answers, attention points, Files API upload of the policies,
+Message Batches — goes through it. Mode (claude.transport.mode):
+
+- live:   no cassette, requests go to the API (default);
+- record: requests go to the API and each request/response pair is saved;
+- replay: responses are served from the cassettes, without network access,
+          after their recorded duration (replay_latency: original) or at once
+          (replay_latency: zero).
+
+One cassette file per request key, <cassette_dir>/<key>.json. The key is a hash
+of the method, path and body (JSON canonicalised, multipart boundary removed),
+never of the headers (API key, retry counters). A key seen several times in a
+run (batch polling, retries) keeps one response per occurrence, served in the
+same order on replay; extra occurrences get the last one.
+
+Prompts carry the current date; in record and replay modes prompt_date()
+returns claude.transport.frozen_date instead, so that a cassette recorded one
+day still matches the requests of a later run.
+"""
+
+import base64
+import datetime
+import hashlib
+import importlib
+import json
+import logging
+import re
+import threading
+import time
+from pathlib import Path
+
+import anthropic
+
+from app.config import BASE_DIR, get_config
+
+logger = logging.getLogger(__name__)
+
+# HTTP library of the installed SDK: httpx, or httpx2 for recent anthropic releases
+_http = importlib.import_module(anthropic.DefaultHttpxClient.__mro__[1].__module__.partition(".")[0])
+
+MODES = ("live", "record", "replay")
+
+# Describe the stored (already decoded) body, not the original transfer
+_DROPPED_RESPONSE_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+_BOUNDARY_RE = re.compile(rb"boundary=([^;\s]+)")
+
+
+class CassetteMissError(RuntimeError):
+    """Raised in replay mode for a request that was never recorded."""
+
+
+def request_key(method: str, path: str, content_type: str, body: bytes) -> str:
+    """Return the cassette key of a request.
+
+    Args:
+        method: HTTP method.
+        path: Raw path and query string.
+        content_type: Content-Type header of the request.
+        body: Request body.
+
+    Returns:
+        Hex SHA-256 digest.
+    """
+    if "json" in content_type:
+        try:
+            body = json.dumps(json.loads(body), sort_keys=True, ensure_ascii=False).encode("utf-8")
+        except ValueError:
+            pass
+    elif "multipart" in content_type:
+        match = _BOUNDARY_RE.search(content_type.encode("latin-1"))
+        if match:
+            body = body.replace(match.group(1).strip(b'"'), b"BOUNDARY")
+    digest = hashlib.sha256()
+    for part in (method.upper().encode("ascii"), path.encode("utf-8"), body):
+        digest.update(part)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _encode_body(body: bytes) -> dict:
+    try:
+        return {"text": body.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"base64": base64.b64encode(body).decode("ascii")}
+
+
+def _decode_body(stored: dict) -> bytes:
+    if "base64" in stored:
+        return base64.b64decode(stored["base64"])
+    return stored.get("text", "").encode("utf-8")
+
+
+class CassetteTransport(_http.BaseTransport):
+    """HTTP transport recording API exchanges to, or replaying them from, cassettes."""
+
+    def __init__(self, mode: str, cassette_dir: Path, replay_latency: str = "original") -> None:
+        """Create the transport.
+
+        Args:
+            mode: "record" or "replay".
+            cassette_dir: Directory of the cassette files (created in record mode).
+            replay_latency: "original" (sleep the recorded duration) or "zero".
+
+        Raises:
+            ValueError: If mode is not record or replay.
+        """
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unsupported cassette mode: {mode}")
+        self._mode = mode
+        self._dir = Path(cassette_dir)
+        self._zero_latency = replay_latency == "zero"
+        self._lock = threading.Lock()
+        self._seen: dict[str, int] = {}        # key → occurrences in this run
+        self._loaded: dict[str, list] = {}     # replay: key → recorded interactions
+        self._live = _http.HTTPTransport(limits=anthropic.DEFAULT_CONNECTION_LIMITS) if mode == "record" else None
+        if mode == "record":
+            self._dir.mkdir(parents=True, exist_ok=True)
+
+    def handle_request(self, request):
+        body = request.read()
+        key = request_key(
+            request.method, request.url.raw_path.decode("ascii"), request.headers.get("content-type", ""), body,
+        )
+        with self._lock:
+            occurrence = self._seen.get(key, 0)
+            self._seen[key] = occurrence + 1
+        if self._mode == "record":
+            return self._record(request, key, occurrence, body)
+        return self._replay(request, key, occurrence)
+
+    def close(self) -> None:
+        if self._live is not None:
+            self._live.close()
+
+    # -- record ---------------------------------------------------------------
+
+    def _record(self, request, key: str, occurrence: int, body: bytes):
+        start = time.monotonic()
+        response = self._live.handle_request(request)
+        try:
+            content = response.read()
+        finally:
+            response.close()
+        elapsed = time.monotonic() - start
+        headers = [(k, v) for k, v in response.headers.items() if k.lower() not in _DROPPED_RESPONSE_HEADERS]
+
+        interaction = {
+            "status": response.status_code,
+            "headers": headers,
+            "body": _encode_body(content),
+            "elapsed_s": round(elapsed, 3),
+        }
+        path = self._dir / f"{key}.json"
+        with self._lock:
+            # First occurrence of the run: replaces a cassette from an older recording
+            interactions = [] if occurrence == 0 else self._read(path).get("interactions", [])
+            interactions.append(interaction)
+            cassette = {
+                "request": {
+                    "method": request.method,
+                    "path": request.url.path,
+                    "body_bytes": len(body),
+                },
+                "interactions": interactions,
+            }
+            tmp_path = path.with_suffix(".json.tmp")
+            tmp_path.write_text(json.dumps(cassette, ensure_ascii=False, indent=1), encoding="utf-8")
+            tmp_path.replace(path)
+        return _http.Response(response.status_code, headers=headers, content=content, request=request)
+
+    # -- replay ---------------------------------------------------------------
+
+    @staticmethod
+    def _read(path: Path) -> dict:
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _replay(self, request, key: str, occurrence: int):
+        with self._lock:
+            interactions = self._loaded.get(key)
+            if interactions is None:
+                interactions = self._read(self._dir / f"{key}.json").get("interactions", [])
+                self._loaded[key] = interactions
+        if not interactions:
+            logger.error("No cassette for %s %s (key %s)", request.method, request.url.path, key[:12])
+            raise CassetteMissError(f"Aucune cassette pour {request.method} {request.url.path} ({key[:12]}).")
+
+        interaction = interactions[min(occurrence, len(interactions) - 1)]
+        if not self._zero_latency:
+            time.sleep(interaction.get("elapsed_s", 0.0))
+        return _http.Response(
+            interaction["status"],
+            headers=[tuple(h) for h in interaction["headers"]],
+            content=_decode_body(interaction["body"]),
+            request=request,
+        )
+
+
+def transport_config() -> dict:
+    """Return claude.transport with its defaults (mode live)."""
+    cfg = dict(get_config().get("claude", {}).get("transport") or {})
+    cfg.setdefault("mode", "live")
+    cfg.setdefault("cassette_dir", "data/cassettes")
+    cfg.setdefault("replay_latency", "original")
+    cfg.setdefault("frozen_date", "2026-01-05")
+    if cfg["mode"] not in MODES:
+        raise ValueError(f"claude.transport.mode inconnu : {cfg['mode']}")
+    return cfg
+
+
+def prompt_date() -> datetime.date:
+    """Return the date written in prompts: today, or the frozen date with cassettes."""
+    cfg = transport_config()
+    if cfg["mode"] == "live":
+        return datetime.date.today()
+    return datetime.date.fromisoformat(str(cfg["frozen_date"]))
+
+
+def build_transport() -> CassetteTransport | None:
+    """Return the cassette transport configured for the process, or None in live mode."""
+    cfg = transport_config()
+    if cfg["mode"] == "live":
+        return None
+    cassette_dir = Path(cfg["cassette_dir"])
+    if not cassette_dir.is_absolute():
+        cassette_dir = BASE_DIR / cassette_dir
+    logger.info("Claude API transport: %s (%s)", cfg["mode"], cassette_dir)
+    return CassetteTransport(cfg["mode"], cassette_dir, cfg["replay_latency"])
@@ -0,0 +1,214 @@
+"""PAS Assistant — In-process metrics in the Prometheus text format.
+
+A minimal implementation (no prometheus_client dependency): counters and
+histograms are updated in place under a lock — a few additions per observation,
+cheap enough to stay on in production — and rendered on demand by GET
+/api/metrics. Values owned by other modules (queue depth, cache hit counters,
+rate limiter) are read at scrape time through register_collector().
+
+Metric names:
+    pas_operation_duration_seconds{operation}   histogram — xlsx/docx processing, structure detection
+    pas_claude_call_duration_seconds{call}      histogram — each Claude call (responses, attention...)
+    pas_claude_http_errors_total{status}        counter   — API responses with status >= 400
+    pas_claude_retries_total{reason}            counter   — calls retried after a 429/529
+    pas_generations_total{kind,outcome}         counter   — finished generations
+    pas_answer_cache_{hits,misses}_total        counter
+    pas_claude_throttled_total, pas_claude_throttle_wait_seconds_total  counters — rate limiter
+    pas_claude_pause_seconds                    gauge     — remaining 429/529 pause
+    pas_generations_active, pas_generation_queue_depth, process_resident_memory_bytes  gauges
+"""
+
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+# Seconds: from fast xlsx reads to multi-minute Claude calls
+_DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+_lock = threading.Lock()
+_metrics: dict[str, "_Metric"] = {}
+_collectors: list[Callable[[], list[tuple]]] = []
+
+
+def _label_str(labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in labels
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    def __init__(self, name: str, kind: str, help_text: str) -> None:
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonic counter with optional labels."""
+
+    def __init__(self, name: str, help_text: str) -> None:
+        super().__init__(name, "counter", help_text)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with _lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list[str]:
+        return [f"{self.name}{_label_str(k)} {_format_value(v)}" for k, v in sorted(self._values.items())]
+
+
+class Histogram(_Metric):
+    """Cumulative histogram (bucket counts, sum, count) with optional labels."""
+
+    def __init__(self, name: str, help_text: str, buckets: tuple[float, ...] = _DEFAULT_BUCKETS) -> None:
+        super().__init__(name, "histogram", help_text)
+        self._buckets = tuple(sorted(buckets))
+        self._values: dict[tuple, list] = {}  # labels → [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with _lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self._buckets) + [0.0, 0]
+            for i, bound in enumerate(self._buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = []
+        for key, state in sorted(self._values.items()):
+            for bound, n in zip(self._buckets, state):
+                lines.append(f"{self.name}_bucket{_label_str(key + (('le', _format_value(bound)),))} {n}")
+            lines.append(f"{self.name}_bucket{_label_str(key + (('le', '+Inf'),))} {state[-1]}")
+            lines.append(f"{self.name}_sum{_label_str(key)} {_format_value(round(state[-2], 6))}")
+            lines.append(f"{self.name}_count{_label_str(key)} {state[-1]}")
+        return lines
+
+
+def counter(name: str, help_text: str) -> Counter:
+    """Return the counter registered under name (created on first use)."""
+    with _lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = _metrics[name] = Counter(name, help_text)
+    return metric
+
+
+def histogram(name: str, help_text: str) -> Histogram:
+    """Return the histogram registered under name (created on first use)."""
+    with _lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = _metrics[name] = Histogram(name, help_text)
+    return metric
+
+
+OPERATION_SECONDS = histogram(
+    "pas_operation_duration_seconds", "Duration of document processing operations."
+)
+CLAUDE_CALL_SECONDS = histogram(
+    "pas_claude_call_duration_seconds", "Duration of Claude API calls, by call type."
+)
+CLAUDE_HTTP_ERRORS = counter(
+    "pas_claude_http_errors_total", "Claude API responses with an HTTP error status."
+)
+CLAUDE_RETRIES = counter(
+    "pas_claude_retries_total", "Claude API calls retried after a rate limit (429) or overload (529)."
+)
+GENERATIONS = counter(
+    "pas_generations_total", "Finished generation jobs, by kind and outcome."
+)
+
+
+@contextmanager
+def timed(operation: str) -> Iterator[None]:
+    """Observe the duration of a block in pas_operation_duration_seconds."""
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        OPERATION_SECONDS.observe(time.monotonic() - start, operation=operation)
+
+
+@contextmanager
+def timed_claude_call(call: str) -> Iterator[None]:
+    """Observe the duration of a block in pas_claude_call_duration_seconds."""
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        CLAUDE_CALL_SECONDS.observe(time.monotonic() - start, call=call)
+
+
+def timed_operation(operation: str) -> Callable:
+    """Decorator form of timed()."""
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(operation):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def register_collector(collect: Callable[[], list[tuple]]) -> None:
+    """Register a callable read at scrape time.
+
+    Args:
+        collect: Returns (name, type, help, [(labels dict, value), ...]) tuples.
+    """
+    with _lock:
+        _collectors.append(collect)
+
+
+def _resident_memory_bytes() -> int | None:
+    """Current RSS of the process (Linux /proc), or None elsewhere."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def render() -> str:
+    """Render every metric in the Prometheus text exposition format (0.0.4)."""
+    lines: list[str] = []
+    with _lock:
+        metrics = list(_metrics.values())
+        collectors = list(_collectors)
+        for metric in metrics:
+            body = metric.render()
+            if body:
+                lines += metric.header() + body
+
+    collected = [c for collect in collectors for c in collect()]
+    rss = _resident_memory_bytes()
+    if rss is not None:
+        collected.append(("process_resident_memory_bytes", "gauge", "Resident memory size in bytes.", [({}, rss)]))
+    for name, kind, help_text, samples in collected:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        lines += [
+            f"{name}{_label_str(tuple(sorted(labels.items())))} {_format_value(value)}"
+            for labels, value in samples
+        ]
+    return "\n".join(lines) + "\n"
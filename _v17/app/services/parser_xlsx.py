@@ -15,6 +15,7 @@ from openpyxl import load_workbook
 from openpyxl.utils import column_index_from_string
 from openpyxl.workbook.defined_name import DefinedName
 
+from app.services import metrics
 from app.services.anonymizer import safe_local_defined_names
 
 _XLSX_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
@@ -44,6 +45,7 @@ def _merged_header_rows(ws, col_r_idx: int) -> set[int]:
     return skip
 
 
+@metrics.timed_operation("read_questions")
 def read_questions(xlsx_path: Path, structure: dict) -> list[dict]:
     """Extract questions from an xlsx file using confirmed structure.
 
@@ -290,6 +292,7 @@ def _write_cell(ws, row: int, col: int, value) -> None:
     logger.warning("_write_cell: cell(%d,%d) is MergedCell but no range found — skipped", row, col)
 
 
+@metrics.timed_operation("write_responses")
 def write_responses(
     source_path: Path,
     dest_path: Path,
@@ -5,6 +5,7 @@ Handles reading and writing project.json for each project.
 
 import json
 import logging
+import threading
 from datetime import datetime, timezone
 from pathlib import Path
 
@@ -14,6 +15,10 @@ logger = logging.getLogger(__name__)
 
 PROJECTS_DIR = BASE_DIR / "data" / "projects"
 
+# Serializes read-modify-write cycles on project.json (generation threads
+# publish progress concurrently with request handlers).
+_update_lock = threading.Lock()
+
 
 def _project_dir(project_id: str) -> Path:
     return PROJECTS_DIR / project_id
@@ -48,6 +53,8 @@ def create_project(project_id: str, filename: str, user_email: str) -> dict:
         "anonymization": None,
         "verbosity_level": 2,
         "progress_step": None,
+        "progress_done": None,
+        "progress_total": None,
         "error_message": None,
     }
     save_project(project_id, data)
@@ -81,7 +88,10 @@ def save_project(project_id: str, data: dict) -> None:
         data: Full project dict to write.
     """
     path = _project_json_path(project_id)
-    path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    # Write-then-rename so that concurrent status polls never read a truncated file
+    tmp_path = path.with_suffix(".json.tmp")
+    tmp_path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp_path.replace(path)
 
 
 def update_project(project_id: str, **fields) -> dict:
@@ -94,10 +104,32 @@ def update_project(project_id: str, **fields) -> dict:
     Returns:
         The updated project dict.
     """
-    data = load_project(project_id)
-    data.update(fields)
-    data["updated_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
-    save_project(project_id, data)
+    with _update_lock:
+        data = load_project(project_id)
+        data.update(fields)
+        data["updated_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        save_project(project_id, data)
+    return data
+
+
+def update_project_if(project_id: str, expected_status: str, **fields) -> dict | None:
+    """Update fields only if the project still has expected_status (atomic check-and-set).
+
+    Args:
+        project_id: UUID of the project.
+        expected_status: Status the project must have for the update to apply.
+        **fields: Fields to update.
+
+    Returns:
+        The updated project dict, or None if the status had changed.
+    """
+    with _update_lock:
+        data = load_project(project_id)
+        if data.get("status") != expected_status:
+            return None
+        data.update(fields)
+        data["updated_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        save_project(project_id, data)
     return data
 
 
@@ -131,15 +163,60 @@ def list_projects(user_email: str) -> list[dict]:
     return projects
 
 
-def recover_stale_projects() -> None:
-    """At startup: move projects stuck in 'generating' to 'error'.
+def _checkpoint_path(project_id: str) -> Path:
+    return _project_dir(project_id) / "checkpoint.json"
+
+
+def load_checkpoint(project_id: str) -> dict | None:
+    """Return the generation checkpoint of a project, or None if there is none.
+
+    Args:
+        project_id: UUID of the project.
+    """
+    path = _checkpoint_path(project_id)
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def save_checkpoint(project_id: str, data: dict) -> None:
+    """Write checkpoint.json (full replacement, atomic).
+
+    Args:
+        project_id: UUID of the project.
+        data: Checkpoint dict to write.
+    """
+    path = _checkpoint_path(project_id)
+    tmp_path = path.with_suffix(".json.tmp")
+    tmp_path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp_path.replace(path)
+
+
+def clear_checkpoint(project_id: str) -> None:
+    """Delete checkpoint.json once a generation has completed."""
+    _checkpoint_path(project_id).unlink(missing_ok=True)
+
+
+def recover_stale_projects(resume: bool = True, max_resumes: int = 2) -> list[str]:
+    """At startup: find projects stuck in 'generating' after a server restart.
+
+    Projects with a checkpoint (a started job, or a queued one: see
+    web._enqueue_generation) are kept in 'generating' and returned so that the
+    caller can resume them; the others (or those already resumed max_resumes
+    times, e.g. a crash loop) are moved to 'error'.
 
-    Projects with status='generating' at startup were interrupted by a server
-    restart; they will never complete, so we mark them as errors.
+    Args:
+        resume: Whether interrupted generations may be resumed.
+        max_resumes: Maximum number of resumptions of the same generation.
+
+    Returns:
+        IDs of the projects to resume.
     """
     if not PROJECTS_DIR.exists():
-        return
+        return []
 
+    to_resume: list[str] = []
     for d in PROJECTS_DIR.iterdir():
         if not d.is_dir():
             continue
@@ -148,11 +225,27 @@ def recover_stale_projects() -> None:
             continue
         try:
             data = json.loads(path.read_text(encoding="utf-8"))
-            if data.get("status") == "generating":
+            if data.get("status") != "generating":
+                continue
+            checkpoint = load_checkpoint(d.name)
+            now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+            if resume and checkpoint and checkpoint.get("resume_count", 0) < max_resumes:
+                checkpoint["resume_count"] = checkpoint.get("resume_count", 0) + 1
+                save_checkpoint(d.name, checkpoint)
+                data["progress_step"] = "Reprise après redémarrage du serveur..."
+                data["updated_at"] = now
+                save_project(d.name, data)
+                to_resume.append(d.name)
+                logger.warning(
+                    "Stale project %s will resume from checkpoint (attempt %d)",
+                    d.name, checkpoint["resume_count"],
+                )
+            else:
                 data["status"] = "error"
                 data["error_message"] = "Génération interrompue par redémarrage du serveur."
-                data["updated_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
-                path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+                data["updated_at"] = now
+                save_project(d.name, data)
                 logger.warning("Recovered stale project %s → error", d.name)
         except (json.JSONDecodeError, OSError):
             logger.warning("Could not recover project %s", d.name)
+    return to_resume
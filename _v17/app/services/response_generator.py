@@ -3,28 +3,34 @@
 Orchestrates the full generation workflow:
   1. Load corpus references
   2. Read questions from anonymized xlsx
-  3. Call Claude to generate responses (JSON)
+  3. Call Claude to generate responses (JSON), in concurrent batches
   4. Write responses into output xlsx
   5. Call Claude to generate attention points (JSON)
   6. De-anonymize output xlsx and attention text
   7. Save attention.md
 """
 
-import datetime
 import hashlib
 import json
 import logging
 import os
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import Callable
 
 import anthropic
 from openpyxl import load_workbook
-from openpyxl.utils import column_index_from_string
 
 from app.config import BASE_DIR, get_config
-from app.services import project_manager
-from app.services.anonymizer import deanonymize_text, deanonymize_xlsx
+from app.services import (
+    answer_cache, claude_client, corpus_index, corpus_qa, job_queue, llm_transport, metrics, project_manager,
+    scope_classifier,
+)
+from app.services.timeline import Timeline, close_timeline, now_iso
+from app.services.anonymizer import anonymization_options, deanonymize_text, deanonymize_xlsx
 from app.services.parser_xlsx import read_questions, read_status_choices, write_responses
 
 logger = logging.getLogger(__name__)
@@ -56,6 +62,12 @@ PROMPTS_DIR = BASE_DIR / "data" / "config" / "prompts"
 
 _VERBOSITY_MAP = {"Concis": 1, "Standard": 2, "Détaillé": 3}
 
+# Output-size estimation used to split the questionnaire into batches.
+# French prose averages ~1.6 tokens per word; each answer also carries its JSON
+# envelope ({"question_id": ..., "response": ..., "status": ...}).
+_TOKENS_PER_WORD = 1.6
+_ANSWER_OVERHEAD_TOKENS = 40
+
 
 # ---------------------------------------------------------------------------
 # Internal helpers
@@ -164,137 +176,60 @@ def build_constraints_block(cadrage: dict, status_choices: list[str] | None = No
     Returns:
         Multi-line exclusion text, or None if no exclusions apply.
     """
-    # PAS niveau entreprise → no exclusions, everything is in scope
-    if cadrage.get("pas_niveau_entreprise") == "Oui":
+    # Same rules as the local out-of-scope classifier (none for an enterprise-level PAS)
+    rules = scope_classifier.exclusion_rules(cadrage)
+    if not rules:
         return None
 
+    status_instruction = _na_status_instruction(status_choices)
+    exclusions = [
+        f"{idx}. {rule['heading']}\n{rule['body']}\n   {status_instruction}"
+        for idx, rule in enumerate(rules, start=1)
+    ]
+    return "\n\n".join(exclusions)
+
+
+def _na_status_instruction(status_choices: list[str] | None) -> str:
+    """Return the status instruction for out-of-scope questions.
+
+    Args:
+        status_choices: List of allowed status values (from Excel dropdown), or None.
+    """
     na_value = _detect_na_value(status_choices)
 
     # Determine the status instruction based on available values
     if na_value:
-        status_instruction = f'→ Statut : utiliser exactement "{na_value}".'
-    elif status_choices:
+        return f'→ Statut : utiliser exactement "{na_value}".'
+    if status_choices:
         # There is a status column but no N/A value available
-        status_instruction = (
+        return (
             "→ Statut : laisser le champ status vide (null) — ne pas utiliser "
             "une valeur de non-conformité qui serait trompeuse."
         )
-    else:
-        # No status column at all
-        status_instruction = (
-            '→ Pas de colonne statut : commencer la réponse par "Sans objet — " '
-            "suivi d'une justification courte (1 phrase)."
-        )
-
-    exclusions: list[str] = []
-
-    # --- Type de prestation ---
-    type_prestation = cadrage.get("type_prestation_base", "")
-    if type_prestation == "Assistance Technique":
-        idx = len(exclusions) + 1
-        exclusions.append(
-            f"{idx}. TYPE DE PRESTATION (type_prestation_base = \"Assistance Technique\")\n"
-            "   Les intervenants FOURNISSEUR travaillent en régie sur le SI de CLIENT.\n"
-            "   Il n'existe pas de dispositif à engagement, de projet forfait, de livraison\n"
-            "   ou de recette. FOURNISSEUR ne déploie pas de solution logicielle propre.\n"
-            "   Questions hors périmètre : gestion de projet à engagement, jalons de livraison,\n"
-            "   recette fonctionnelle FOURNISSEUR, référentiels internes FOURNISSEUR liés à\n"
-            "   un périmètre forfait, politiques propres à un SI FOURNISSEUR déployé.\n"
-            f"   {status_instruction}"
-        )
-
-    # --- Hébergement et infrastructure ---
-    hebergement = cadrage.get("hebergement_donnees", "")
-    if hebergement == "SI CLIENT":
-        idx = len(exclusions) + 1
-        exclusions.append(
-            f"{idx}. HÉBERGEMENT ET INFRASTRUCTURE (hebergement_donnees = \"SI CLIENT\")\n"
-            "   CLIENT héberge et opère l'intégralité de l'infrastructure. FOURNISSEUR\n"
-            "   n'administre aucun serveur, aucun réseau d'infrastructure, aucun\n"
-            "   environnement d'hébergement.\n"
-            "   Questions hors périmètre : hébergement, serveurs, CMDB, inventaire des\n"
-            "   équipements, patchs système serveur, sauvegardes, logs d'infrastructure,\n"
-            "   cloisonnement réseau, firewalls, IDS/IPS/Anti-DDoS côté infrastructure,\n"
-            "   gestion des comptes administrateurs d'infrastructure, accès d'exploitation\n"
-            "   du service, environnements hors-prod côté hébergement, auditabilité du\n"
-            "   SI hébergé, tests d'intrusion sur le SI de FOURNISSEUR, échanges de fichiers\n"
-            "   via plateforme MFT de FOURNISSEUR, filtrage IP côté FOURNISSEUR.\n"
-            f"   {status_instruction}"
-        )
-    elif hebergement == "Cloud":
-        idx = len(exclusions) + 1
-        exclusions.append(
-            f"{idx}. HÉBERGEMENT CLOUD (hebergement_donnees = \"Cloud\")\n"
-            "   FOURNISSEUR héberge dans le cloud mais ne gère pas l'infrastructure\n"
-            "   physique. Les questions sur le datacenter physique (sécurité physique\n"
-            "   des salles serveurs, alimentation électrique, climatisation) sont hors\n"
-            "   périmètre FOURNISSEUR — elles relèvent du cloud provider.\n"
-            "   En revanche, la sécurité applicative, la configuration cloud, la gestion\n"
-            "   des accès et les politiques d'hébergement restent applicables.\n"
-            f"   {status_instruction}"
-        )
-
-    # --- Postes de travail ---
-    poste = cadrage.get("poste_travail", "")
-    if poste == "CLIENT":
-        idx = len(exclusions) + 1
-        exclusions.append(
-            f"{idx}. POSTES DE TRAVAIL (poste_travail = \"CLIENT\")\n"
-            "   Les postes de travail sont fournis et administrés par CLIENT.\n"
-            "   FOURNISSEUR n'est responsable d'aucune politique de sécurité poste.\n"
-            "   Questions hors périmètre : MDM, antivirus poste, chiffrement disque,\n"
-            "   politique de mots de passe poste, gestion des mises à jour poste,\n"
-            "   verrouillage automatique, protection des ordinateurs portables.\n"
-            f"   {status_instruction}"
-        )
-
-    # --- Sous-traitance RGPD ---
-    if cadrage.get("sous_traitance_rgpd") == "Non":
-        idx = len(exclusions) + 1
-        exclusions.append(
-            f"{idx}. SOUS-TRAITANCE RGPD (sous_traitance_rgpd = \"Non\")\n"
-            "   FOURNISSEUR n'a pas de sous-traitants RGPD pour cette prestation.\n"
-            "   Questions hors périmètre : gestion contractuelle des sous-traitants,\n"
-            "   audits des sous-traitants, clauses RGPD sous-traitants.\n"
-            f"   {status_instruction}"
-        )
-
-    # --- Développement logiciel ---
-    activites = cadrage.get("activites", "")
-    activites_list = activites if isinstance(activites, list) else [activites]
-    has_dev = any("développement" in str(a).lower() or "dev" in str(a).lower() for a in activites_list)
-    if not has_dev:
-        idx = len(exclusions) + 1
-        exclusions.append(
-            f"{idx}. DÉVELOPPEMENT LOGICIEL (activites ne comprend pas de développement)\n"
-            "   FOURNISSEUR ne réalise pas de développement logiciel dans le cadre\n"
-            "   de cette prestation.\n"
-            "   Questions hors périmètre : cycle de vie sécurisé du développement\n"
-            "   (SSDLC), revue de code, tests de sécurité applicatifs, gestion des\n"
-            "   dépendances logicielles, politique de développement sécurisé.\n"
-            f"   {status_instruction}"
-        )
-
-    # --- Locaux FOURNISSEUR ---
-    lieu_travail = cadrage.get("lieu_travail", [])
-    if isinstance(lieu_travail, str):
-        lieu_travail = [lieu_travail]
-    has_agence = any("agence" in str(l).lower() and "fournisseur" in str(l).lower() for l in lieu_travail)
-    if not has_agence:
-        idx = len(exclusions) + 1
-        exclusions.append(
-            f"{idx}. LOCAUX FOURNISSEUR (lieu_travail ne comprend pas \"Agence FOURNISSEUR\")\n"
-            "   FOURNISSEUR n'intervient pas depuis ses propres locaux pour cette prestation.\n"
-            "   Questions hors périmètre : sécurité physique des locaux FOURNISSEUR,\n"
-            "   badges d'accès aux locaux FOURNISSEUR, surveillance des locaux,\n"
-            "   destruction des supports en agence FOURNISSEUR.\n"
-            f"   {status_instruction}"
-        )
+    # No status column at all
+    return (
+        '→ Pas de colonne statut : commencer la réponse par "Sans objet — " '
+        "suivi d'une justification courte (1 phrase)."
+    )
 
-    if not exclusions:
-        return None
 
-    return "\n\n".join(exclusions)
+# Cadrage fields that reach the prompt (also the answer-cache key fields)
+_CADRAGE_LABELS = {
+    "pas_niveau_entreprise": "PAS niveau entreprise",
+    "type_prestation_base": "Type de prestation",
+    "type_prestation_detail": "Détail type de prestation",
+    "nb_etp": "Nombre d'ETP",
+    "activites": "Activités de la prestation",
+    "expertise_atlassian": "Expertise Atlassian",
+    "hebergement_donnees": "Hébergement des données",
+    "cloud_provider": "Fournisseur Cloud",
+    "sous_traitance_rgpd": "Sous-traitance RGPD",
+    "lieu_travail": "Lieu de travail",
+    "agences": "Agences concernées",
+    "poste_travail": "Type de poste de travail",
+    "connexion_distante": "Mode de connexion distante",
+    "secteur_client": "Secteur du CLIENT",
+}
 
 
 def _format_cadrage(cadrage: dict) -> str:
@@ -306,24 +241,8 @@ def _format_cadrage(cadrage: dict) -> str:
     Returns:
         Multi-line string with key: value pairs, excluding 'verbosity'.
     """
-    labels = {
-        "pas_niveau_entreprise": "PAS niveau entreprise",
-        "type_prestation_base": "Type de prestation",
-        "type_prestation_detail": "Détail type de prestation",
-        "nb_etp": "Nombre d'ETP",
-        "activites": "Activités de la prestation",
-        "expertise_atlassian": "Expertise Atlassian",
-        "hebergement_donnees": "Hébergement des données",
-        "cloud_provider": "Fournisseur Cloud",
-        "sous_traitance_rgpd": "Sous-traitance RGPD",
-        "lieu_travail": "Lieu de travail",
-        "agences": "Agences concernées",
-        "poste_travail": "Type de poste de travail",
-        "connexion_distante": "Mode de connexion distante",
-        "secteur_client": "Secteur du CLIENT",
-    }
     lines = []
-    for key, label in labels.items():
+    for key, label in _CADRAGE_LABELS.items():
         val = cadrage.get(key)
         if val is None or val == "":
             continue
@@ -334,7 +253,7 @@ def _format_cadrage(cadrage: dict) -> str:
 
 
 def _read_corpus_entry_xlsx(corpus_dir: Path, meta: dict) -> str:
-    """Extract Q&A content from a corpus xlsx file.
+    """Dump the non-empty cells of a corpus xlsx that has no confirmed structure.
 
     Args:
         corpus_dir: Path to the corpus entry directory.
@@ -359,100 +278,44 @@ def _read_corpus_entry_xlsx(corpus_dir: Path, meta: dict) -> str:
         ws = wb.active
 
     lines: list[str] = [f"=== {meta.get('filename', corpus_dir.name)} ==="]
-
-    if structure.get("col_question"):
-        first_data_row = int(structure.get("first_data_row") or 2)
-        col_q_idx = column_index_from_string(structure["col_question"].upper())
-        col_r_idx = (
-            column_index_from_string(structure["col_response"].upper())
-            if structure.get("col_response")
-            else None
-        )
-        col_id_idx = (
-            column_index_from_string(structure["col_id"].upper())
-            if structure.get("col_id")
-            else None
-        )
-
-        count = 0
-        for row_idx, row in enumerate(ws.iter_rows(values_only=True), start=1):
-            if row_idx < first_data_row:
-                continue
-            if count >= 150:
-                break
-
-            q_raw = row[col_q_idx - 1] if col_q_idx - 1 < len(row) else None
-            q_text = str(q_raw).strip() if q_raw is not None else ""
-            if not q_text:
-                continue
-
-            q_id = str(row_idx)
-            if col_id_idx is not None and col_id_idx - 1 < len(row):
-                id_raw = row[col_id_idx - 1]
-                if id_raw is not None:
-                    q_id = str(id_raw).strip()
-
-            r_text = ""
-            if col_r_idx is not None and col_r_idx - 1 < len(row):
-                r_raw = row[col_r_idx - 1]
-                r_text = str(r_raw).strip() if r_raw is not None else ""
-
-            line = f"ID: {q_id} | Question: {q_text}"
-            if r_text:
-                line += f" | Réponse: {r_text}"
-            lines.append(line)
+    count = 0
+    for row in ws.iter_rows(values_only=True):
+        if count >= 200:
+            break
+        row_text = " | ".join(str(c).strip() for c in row if c)
+        if row_text:
+            lines.append(row_text)
             count += 1
-    else:
-        # No confirmed structure — dump non-empty cells row by row
-        count = 0
-        for row in ws.iter_rows(values_only=True):
-            if count >= 200:
-                break
-            row_text = " | ".join(str(c).strip() for c in row if c)
-            if row_text:
-                lines.append(row_text)
-                count += 1
 
     wb.close()
     return "\n".join(lines)
 
 
-def _read_corpus_entry_docx(corpus_dir: Path, meta: dict) -> str:
-    """Extract text content from a corpus docx file.
+def _format_corpus_pairs(meta: dict, pairs: list[dict]) -> str:
+    """Format the Q&A artifact of a corpus entry for inclusion in the prompt.
 
     Args:
-        corpus_dir: Path to the corpus entry directory.
         meta: Metadata dict for this corpus entry.
+        pairs: Pairs from corpus_qa.load_qa_pairs().
 
     Returns:
-        Formatted text content of the corpus file.
+        Formatted text content (first 150 pairs of an xlsx, 50 000 chars of a docx).
     """
-    anon_path = corpus_dir / "anonymized.docx"
-    if not anon_path.exists():
-        return ""
-
-    from docx import Document as DocxDocument  # local import to avoid hard dep at module level
-
-    doc = DocxDocument(anon_path)
-    parts: list[str] = [f"=== {meta.get('filename', corpus_dir.name)} ==="]
-
-    # Paragraphs
-    for para in doc.paragraphs:
-        if para.text.strip():
-            parts.append(para.text.strip())
-
-    # Tables
-    for table in doc.tables:
-        for row in table.rows:
-            cells = [c.text.strip() for c in row.cells if c.text.strip()]
-            if cells:
-                parts.append(" | ".join(cells))
-
-    text = "\n".join(parts)
-    # Limit size
-    if len(text) > 50_000:
-        text = text[:50_000] + "\n[... tronqué]"
-    return text
+    lines: list[str] = [f"=== {meta.get('filename', '')} ==="]
+    if meta.get("format", "xlsx") == "docx":
+        for p in pairs:
+            lines.append(" | ".join(x for x in (p["question"], p.get("answer")) if x))
+        text = "\n".join(lines)
+        if len(text) > 50_000:
+            text = text[:50_000] + "\n[... tronqué]"
+        return text
+
+    for p in pairs[:150]:
+        line = f"ID: {p['id']} | Question: {p['question']}"
+        if p.get("answer"):
+            line += f" | Réponse: {p['answer']}"
+        lines.append(line)
+    return "\n".join(lines)
 
 
 def _read_contract_text(project_dir: Path) -> str | None:
@@ -494,6 +357,9 @@ def _read_contract_text(project_dir: Path) -> str | None:
 def _read_corpus_entry(corpus_id: str) -> str:
     """Read and format a single corpus entry for inclusion in Claude prompt.
 
+    Uses the entry's qa.jsonl artifact; only an xlsx without confirmed structure
+    (no Q&A pairs) is read from the workbook itself.
+
     Args:
         corpus_id: UUID of the corpus entry.
 
@@ -508,15 +374,17 @@ def _read_corpus_entry(corpus_id: str) -> str:
 
     meta = json.loads(meta_path.read_text(encoding="utf-8"))
     fmt = meta.get("format", "xlsx")
+    if fmt not in ("xlsx", "docx"):
+        logger.warning("Corpus entry %s has unsupported format: %s", corpus_id, fmt)
+        return ""
 
     try:
+        pairs = corpus_qa.load_qa_pairs(corpus_id)
+        if pairs:
+            return _format_corpus_pairs(meta, pairs)
         if fmt == "xlsx":
             return _read_corpus_entry_xlsx(corpus_dir, meta)
-        elif fmt == "docx":
-            return _read_corpus_entry_docx(corpus_dir, meta)
-        else:
-            logger.warning("Corpus entry %s has unsupported format: %s", corpus_id, fmt)
-            return ""
+        return ""
     except Exception:
         logger.exception("Failed to read corpus entry %s", corpus_id)
         return ""
@@ -530,9 +398,18 @@ def _build_user_prompt_responses(
     status_choices: list[str] | None = None,
     has_policies: bool = False,
     contract_text: str | None = None,
-) -> str:
+    prompt_cache: bool = True,
+    examples: str | None = None,
+) -> list[dict]:
     """Build the user message for Claude's response-generation call.
 
+    The message is split into two text blocks so that Anthropic prompt caching
+    can reuse the prefix across batches and regenerations: the sections that
+    only depend on the project (context, exclusions, contract, corpus, policies,
+    status values) come first and end with a cache_control breakpoint; the date
+    and the questions of this call come last, after the corpus examples retrieved
+    for these questions (when retrieval is enabled).
+
     Args:
         cadrage: Cadrage answers dict.
         corpus_contents: List of formatted corpus text strings.
@@ -540,17 +417,15 @@ def _build_user_prompt_responses(
         verbosity: Dict with label and max_words.
         status_choices: Optional list of allowed status values from the dropdown.
         has_policies: Whether POLITIQUES.md is attached as a document.
+        contract_text: Optional anonymized contract text.
+        prompt_cache: Whether to mark the stable block with cache_control.
+        examples: Optional corpus Q&A pairs retrieved for these questions.
 
     Returns:
-        Complete user prompt string.
+        List of two text content blocks (stable prefix, per-call suffix).
     """
     lines: list[str] = []
 
-    today = datetime.date.today().strftime("%d/%m/%Y")
-    lines.append("=== DATE DU JOUR ===")
-    lines.append(today)
-    lines.append("")
-
     lines.append("=== CONTEXTE DE LA PRESTATION ===")
     lines.append(_format_cadrage(cadrage))
     lines.append("")
@@ -576,9 +451,10 @@ def _build_user_prompt_responses(
         lines.append(contract_text)
         lines.append("")
 
-    if corpus_contents:
+    corpus_text = "\n\n".join(c for c in corpus_contents if c)
+    if corpus_text:
         lines.append("=== EXEMPLES DE QUESTIONNAIRES DÉJÀ REMPLIS ===")
-        lines.append("\n\n".join(c for c in corpus_contents if c))
+        lines.append(corpus_text)
         lines.append("")
 
     if has_policies:
@@ -610,6 +486,27 @@ def _build_user_prompt_responses(
             lines.append(f"- {choice}")
         lines.append("")
 
+    stable_block: dict = {"type": "text", "text": "\n".join(lines)}
+    if prompt_cache:
+        stable_block["cache_control"] = {"type": "ephemeral"}
+
+    lines = []
+
+    if examples:
+        # The heading appears once, in the block that carries examples
+        if not corpus_text:
+            lines.append("=== EXEMPLES DE QUESTIONNAIRES DÉJÀ REMPLIS ===")
+        lines.append(
+            "Questions et réponses passées les plus proches des questions à traiter ci-dessous."
+        )
+        lines.append(examples)
+        lines.append("")
+
+    today = llm_transport.prompt_date().strftime("%d/%m/%Y")
+    lines.append("=== DATE DU JOUR ===")
+    lines.append(today)
+    lines.append("")
+
     lines.append("=== QUESTIONNAIRE À REMPLIR ===")
     lines.append(
         f"Niveau de verbosité : {verbosity['label']} — "
@@ -622,7 +519,14 @@ def _build_user_prompt_responses(
         lines.append(f"Question: {q['question_text']}")
         lines.append("---")
 
-    return "\n".join(lines)
+    return [stable_block, {"type": "text", "text": "\n".join(lines)}]
+
+
+def _prompt_text(user_prompt: str | list[dict]) -> str:
+    """Return the plain text of a user prompt (string or content blocks)."""
+    if isinstance(user_prompt, str):
+        return user_prompt
+    return "\n".join(b["text"] for b in user_prompt if b.get("type") == "text")
 
 
 def _build_user_prompt_attention(
@@ -659,65 +563,130 @@ def _build_user_prompt_attention(
     return "\n".join(lines)
 
 
-def _call_claude_json(
+def _message_kwargs(
     system_prompt: str,
-    user_prompt: str,
+    user_prompt: str | list[dict],
     model: str,
     max_tokens: int,
-    client: anthropic.Anthropic | None = None,
     file_id: str | None = None,
+    prompt_cache: bool = False,
 ) -> dict:
-    """Call Claude and parse the JSON response.
+    """Build the keyword arguments of a Messages API call.
 
     Args:
         system_prompt: System prompt string.
-        user_prompt: User message string.
+        user_prompt: User message string, or list of content blocks.
         model: Claude model ID.
         max_tokens: Maximum tokens for the response.
-        client: Optional pre-built Anthropic client (created if None).
         file_id: Optional Files API file_id to attach as a document (POLITIQUES.md).
+            When set, the call must go through client.beta.messages.
+        prompt_cache: Whether to put a cache_control breakpoint on the system prompt.
 
     Returns:
-        Parsed JSON dict from Claude's response.
-
-    Raises:
-        RuntimeError: If the API key is missing or the response is invalid JSON.
+        Dict of kwargs for messages.create() / messages.stream().
     """
-    api_key = os.environ.get("ANTHROPIC_API_KEY", "")
-    if not api_key or api_key.startswith("sk-ant-..."):
-        raise RuntimeError("ANTHROPIC_API_KEY non configurée.")
+    system: str | list[dict] = system_prompt
+    if prompt_cache:
+        system = [
+            {"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}
+        ]
 
-    if client is None:
-        client = anthropic.Anthropic(api_key=api_key)
+    if isinstance(user_prompt, str):
+        user_blocks: list[dict] = [{"type": "text", "text": user_prompt}]
+    else:
+        user_blocks = list(user_prompt)
 
     if file_id:
-        # Use beta.messages to support document attachments via Files API
+        # Use beta.messages to support document attachments via Files API.
+        # The document goes first so that it belongs to the cached prefix.
         user_content = [
             {
                 "type": "document",
                 "source": {"type": "file", "file_id": file_id},
                 "title": "Politiques de sécurité FOURNISSEUR",
             },
-            {"type": "text", "text": user_prompt},
+            *user_blocks,
         ]
-        response = client.beta.messages.create(
-            model=model,
-            max_tokens=max_tokens,
-            system=system_prompt,
-            messages=[{"role": "user", "content": user_content}],
-            betas=["files-api-2025-04-14"],
-        )
-    else:
-        response = client.messages.create(
-            model=model,
-            max_tokens=max_tokens,
-            system=system_prompt,
-            messages=[{"role": "user", "content": user_prompt}],
-        )
+        return {
+            "model": model,
+            "max_tokens": max_tokens,
+            "system": system,
+            "messages": [{"role": "user", "content": user_content}],
+            "betas": ["files-api-2025-04-14"],
+        }
+    return {
+        "model": model,
+        "max_tokens": max_tokens,
+        "system": system,
+        "messages": [
+            {"role": "user", "content": user_prompt if isinstance(user_prompt, str) else user_blocks}
+        ],
+    }
+
+
+def _record_usage(usage, usage_log: list[dict] | None) -> None:
+    """Log the token usage of a Claude call and append it to usage_log.
+
+    Args:
+        usage: The `usage` object of an Anthropic Message (may be None).
+        usage_log: Optional list collecting one dict per call.
+    """
+    if usage is None:
+        return
+    entry = {
+        "input_tokens": getattr(usage, "input_tokens", 0) or 0,
+        "output_tokens": getattr(usage, "output_tokens", 0) or 0,
+        "cache_creation_input_tokens": getattr(usage, "cache_creation_input_tokens", 0) or 0,
+        "cache_read_input_tokens": getattr(usage, "cache_read_input_tokens", 0) or 0,
+    }
+    logger.info(
+        "Claude usage — input=%d output=%d cache_write=%d cache_read=%d",
+        entry["input_tokens"],
+        entry["output_tokens"],
+        entry["cache_creation_input_tokens"],
+        entry["cache_read_input_tokens"],
+    )
+    if usage_log is not None:
+        usage_log.append(entry)
+
+
+def _log_calls(
+    usage_log: list[dict],
+    label: str,
+    call_usage: list[dict],
+    started: float,
+    started_at: str,
+    call_type: str | None = None,
+) -> None:
+    """Append the usage of one call to usage_log, labelled and timed.
+
+    Args:
+        usage_log: Usage log of the run (timeline calls).
+        label: Call label ("responses 2/5", "attention"...).
+        call_usage: Usage entries recorded by the call.
+        started: time.monotonic() when the call started.
+        started_at: ISO timestamp when the call started.
+        call_type: Label of the call duration metric ("responses", "attention"),
+            or None not to observe it.
+    """
+    duration = round(time.monotonic() - started, 3)
+    if call_type is not None:
+        metrics.CLAUDE_CALL_SECONDS.observe(duration, call=call_type)
+    usage_log.extend(
+        {"call": label, "started_at": started_at, "duration_s": duration, **u} for u in call_usage
+    )
 
-    raw = response.content[0].text.strip()
 
-    # Strip markdown code block if present
+def _summarize_usage(usage_log: list[dict]) -> dict:
+    """Return {"calls": [...], "total": {...}} for storage in project.json."""
+    keys = ("input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")
+    total = {k: sum(u.get(k, 0) for u in usage_log) for k in keys}
+    return {"calls": usage_log, "total": total}
+
+
+def _parse_json_text(raw: str) -> dict:
+    """Parse Claude's text output as JSON, stripping a markdown code block if present."""
+    raw = raw.strip()
     if raw.startswith("```"):
         parts = raw.split("```")
         raw = parts[1] if len(parts) > 1 else raw
@@ -728,6 +697,305 @@ def _call_claude_json(
     return json.loads(raw)
 
 
+class _TruncatedResponse(RuntimeError):
+    """Claude stopped at max_tokens before closing its JSON output.
+
+    Attributes:
+        items: Complete objects of the expected array salvaged from the partial output.
+    """
+
+    def __init__(self, items: list[dict]) -> None:
+        super().__init__("Réponse de Claude tronquée (limite max_tokens atteinte).")
+        self.items = items
+
+
+def _salvage_array(raw: str, array_key: str | None) -> list[dict]:
+    """Return the complete objects of array_key found in a truncated JSON output."""
+    if array_key is None:
+        return []
+    parser = _JsonArrayStreamParser(array_key)
+    parser.feed(raw)
+    return parser.items
+
+
+def _require_client(client: anthropic.Anthropic | None) -> anthropic.Anthropic:
+    """Return client, or the shared rate-limited client.
+
+    Raises:
+        RuntimeError: If the API key is missing.
+    """
+    return client if client is not None else claude_client.get_client()
+
+
+def _call_claude_json(
+    system_prompt: str,
+    user_prompt: str | list[dict],
+    model: str,
+    max_tokens: int,
+    client: anthropic.Anthropic | None = None,
+    file_id: str | None = None,
+    prompt_cache: bool = False,
+    usage_log: list[dict] | None = None,
+    array_key: str | None = None,
+    cancel: threading.Event | None = None,
+) -> dict:
+    """Call Claude and parse the JSON response.
+
+    Args:
+        system_prompt: System prompt string.
+        user_prompt: User message string, or list of content blocks.
+        model: Claude model ID.
+        max_tokens: Maximum tokens for the response.
+        client: Optional pre-built Anthropic client (created if None).
+        file_id: Optional Files API file_id to attach as a document (POLITIQUES.md).
+        prompt_cache: Whether to mark the system prompt with cache_control.
+        usage_log: Optional list receiving the token usage of the call.
+        array_key: Key of the top-level array to salvage if the output is truncated.
+        cancel: Optional event; once set, rate limiter waits and retries stop (a
+            call already sent finishes first).
+
+    Returns:
+        Parsed JSON dict from Claude's response.
+
+    Raises:
+        RuntimeError: If the API key is missing or the response is invalid JSON.
+        job_queue.JobCancelledError: If cancel was set before the call was sent.
+        _TruncatedResponse: If Claude stopped at max_tokens.
+    """
+    client = _require_client(client)
+    kwargs = _message_kwargs(system_prompt, user_prompt, model, max_tokens, file_id, prompt_cache)
+    api = client.beta.messages if file_id else client.messages
+    with claude_client.cancel_scope(cancel):
+        response = api.create(**kwargs)
+    return _message_json(response, usage_log, array_key)
+
+
+def _message_json(message, usage_log: list[dict] | None, array_key: str | None = None) -> dict:
+    """Record the usage of a complete Message and parse its text as JSON.
+
+    Args:
+        message: Anthropic Message (from messages.create or a Message Batch result).
+        usage_log: Optional list receiving the token usage of the call.
+        array_key: Key of the top-level array to salvage if the output is truncated.
+
+    Returns:
+        Parsed JSON dict.
+
+    Raises:
+        _TruncatedResponse: If Claude stopped at max_tokens.
+    """
+    _record_usage(message.usage, usage_log)
+
+    raw = "".join(block.text for block in message.content if block.type == "text")
+    if message.stop_reason == "max_tokens":
+        items = _salvage_array(raw, array_key)
+        logger.warning("Claude output truncated at max_tokens — %d object(s) salvaged", len(items))
+        raise _TruncatedResponse(items)
+    return _parse_json_text(raw)
+
+
+def _run_message_batch(
+    client: anthropic.Anthropic,
+    requests: list[tuple[str, dict]],
+    poll_seconds: float,
+    batch_id: str | None = None,
+    on_created: Callable[[str], None] | None = None,
+    cancel: threading.Event | None = None,
+) -> dict:
+    """Submit requests through the Message Batches API and wait for their results.
+
+    Args:
+        client: Authenticated Anthropic client.
+        requests: (custom_id, kwargs from _message_kwargs()) pairs.
+        poll_seconds: Delay between two status polls.
+        batch_id: ID of an already submitted batch to wait for (resumed
+            generation); requests are not submitted again.
+        on_created: Optional callback receiving the ID of the new batch, so that
+            it can be checkpointed before polling starts.
+        cancel: Optional event; once set, the batch is cancelled on the API side
+            (rate limiter waits and retries of the batch calls stop too).
+
+    Returns:
+        {custom_id: Message} for every request that succeeded.
+
+    Raises:
+        job_queue.JobCancelledError: If cancel was set while waiting.
+    """
+    betas = sorted({b for _, kwargs in requests for b in kwargs.get("betas", [])})
+    api = client.beta.messages if betas else client.messages
+    extra = {"betas": betas} if betas else {}
+    with claude_client.cancel_scope(cancel):
+        if batch_id is None:
+            batch = api.batches.create(
+                requests=[
+                    {"custom_id": custom_id, "params": {k: v for k, v in kwargs.items() if k != "betas"}}
+                    for custom_id, kwargs in requests
+                ],
+                **extra,
+            )
+            batch_id = batch.id
+            logger.info("Submitted message batch %s (%d requests)", batch_id, len(requests))
+            if on_created is not None:
+                on_created(batch_id)
+
+        while True:
+            batch = api.batches.retrieve(batch_id, **extra)
+            if batch.processing_status == "ended":
+                break
+            if cancel is not None and cancel.wait(poll_seconds):
+                try:
+                    # Outside the cancel scope, which would stop this call too
+                    with claude_client.cancel_scope(None):
+                        api.batches.cancel(batch_id, **extra)
+                    logger.info("Message batch %s cancelled", batch_id)
+                except anthropic.APIError as exc:
+                    logger.warning("Could not cancel message batch %s: %s", batch_id, exc)
+                raise job_queue.JobCancelledError(batch_id)
+            if cancel is None:
+                time.sleep(poll_seconds)
+        logger.info("Message batch %s ended: %s", batch_id, batch.request_counts)
+
+        messages = {}
+        for entry in api.batches.results(batch_id, **extra):
+            if entry.result.type == "succeeded":
+                messages[entry.custom_id] = entry.result.message
+            else:
+                logger.warning("Message batch %s: request %s %s", batch_id, entry.custom_id, entry.result.type)
+        return messages
+
+
+class _JsonArrayStreamParser:
+    """Incrementally extract the objects of a JSON array from streamed text.
+
+    Claude answers with {"<key>": [{...}, {...}, ...]}. Each feed() call scans
+    the new text and returns the array objects whose closing brace has arrived,
+    so they can be used before the whole response is complete. Only the object
+    currently being received is kept in memory.
+    """
+
+    def __init__(self, key: str) -> None:
+        self._key_re = re.compile(r'"' + re.escape(key) + r'"\s*:\s*\[')
+        self._buf = ""
+        self._pos = 0
+        self._in_array = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._obj_start = -1
+        self.items: list[dict] = []
+
+    def feed(self, text: str) -> list[dict]:
+        """Consume a text delta and return the objects completed by it."""
+        self._buf += text
+        if not self._in_array:
+            m = self._key_re.search(self._buf)
+            if m is None:
+                return []
+            self._in_array = True
+            self._pos = m.end()
+
+        found: list[dict] = []
+        buf = self._buf
+        i = self._pos
+        while i < len(buf) and not self._done:
+            c = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+            elif c == '"':
+                self._in_string = True
+            elif c == "{":
+                if self._depth == 0:
+                    self._obj_start = i
+                self._depth += 1
+            elif c == "}" and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        obj = json.loads(buf[self._obj_start:i + 1])
+                    except ValueError:
+                        logger.warning("Skipping malformed streamed object: %.80s", buf[self._obj_start:i + 1])
+                        obj = None
+                    if isinstance(obj, dict):
+                        found.append(obj)
+                    self._obj_start = -1
+            elif c == "]" and self._depth == 0:
+                self._done = True
+            i += 1
+
+        # Drop everything before the object being received
+        keep_from = self._obj_start if self._obj_start >= 0 else i
+        self._buf = buf[keep_from:]
+        self._pos = i - keep_from
+        if self._obj_start >= 0:
+            self._obj_start = 0
+
+        self.items.extend(found)
+        return found
+
+
+def _stream_claude_json(
+    system_prompt: str,
+    user_prompt: str | list[dict],
+    model: str,
+    max_tokens: int,
+    client: anthropic.Anthropic | None = None,
+    file_id: str | None = None,
+    prompt_cache: bool = False,
+    usage_log: list[dict] | None = None,
+    array_key: str = "responses",
+    on_item: Callable[[dict], None] | None = None,
+    cancel: threading.Event | None = None,
+) -> dict:
+    """Call Claude with message streaming and parse the JSON response.
+
+    Objects of the `array_key` array are handed to on_item as soon as they are
+    complete in the stream, before the rest of the response has arrived.
+
+    Args:
+        system_prompt: System prompt string.
+        user_prompt: User message string, or list of content blocks.
+        model: Claude model ID.
+        max_tokens: Maximum tokens for the response.
+        client: Optional pre-built Anthropic client (created if None).
+        file_id: Optional Files API file_id to attach as a document (POLITIQUES.md).
+        prompt_cache: Whether to mark the system prompt with cache_control.
+        usage_log: Optional list receiving the token usage of the call.
+        array_key: Key of the top-level array to parse incrementally.
+        on_item: Optional callback invoked with each completed array object.
+        cancel: Optional event; once set, the stream is closed between two chunks
+            (or before it starts, during a rate limiter wait or a retry).
+
+    Returns:
+        Parsed JSON dict from Claude's full response.
+
+    Raises:
+        RuntimeError: If the API key is missing.
+        job_queue.JobCancelledError: If cancel was set during the stream.
+        json.JSONDecodeError: If the full response is not valid JSON.
+        _TruncatedResponse: If Claude stopped at max_tokens.
+    """
+    client = _require_client(client)
+    kwargs = _message_kwargs(system_prompt, user_prompt, model, max_tokens, file_id, prompt_cache)
+    api = client.beta.messages if file_id else client.messages
+    parser = _JsonArrayStreamParser(array_key)
+    with claude_client.cancel_scope(cancel), api.stream(**kwargs) as stream:
+        for text in stream.text_stream:
+            if cancel is not None and cancel.is_set():
+                # Leaving the block closes the connection: Claude stops generating
+                raise job_queue.JobCancelledError("stream")
+            for item in parser.feed(text):
+                if on_item is not None:
+                    on_item(item)
+        message = stream.get_final_message()
+    return _message_json(message, usage_log, array_key)
+
+
 def _format_attention_markdown(
     attention_points: list[dict],
     mapping: dict[str, str],
@@ -757,12 +1025,316 @@ def _format_attention_markdown(
     return "\n".join(lines)
 
 
+# ---------------------------------------------------------------------------
+# Chunked generation
+# ---------------------------------------------------------------------------
+
+
+def _estimate_output_tokens(question: dict, verbosity: dict) -> int:
+    """Estimate how many output tokens Claude needs to answer one question.
+
+    Args:
+        question: {"question_id", "question_text"} dict.
+        verbosity: Dict with max_words.
+
+    Returns:
+        Estimated token count for the answer and its JSON envelope.
+    """
+    id_tokens = len(str(question["question_id"])) // 3 + 1
+    return int(verbosity["max_words"] * _TOKENS_PER_WORD) + _ANSWER_OVERHEAD_TOKENS + id_tokens
+
+
+def _split_into_batches(
+    questions: list[dict],
+    verbosity: dict,
+    batch_output_tokens: int,
+) -> list[list[dict]]:
+    """Split questions into consecutive batches bounded by estimated output tokens.
+
+    Args:
+        questions: Questions in questionnaire order.
+        verbosity: Dict with max_words.
+        batch_output_tokens: Output token budget per batch.
+
+    Returns:
+        List of non-empty batches, preserving question order.
+    """
+    batches: list[list[dict]] = []
+    current: list[dict] = []
+    current_tokens = 0
+    for q in questions:
+        cost = _estimate_output_tokens(q, verbosity)
+        if current and current_tokens + cost > batch_output_tokens:
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(q)
+        current_tokens += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _run_batches(
+    batches: list[list[dict]],
+    generate_batch: Callable[[int, list[dict]], list[dict]],
+    max_concurrency: int,
+    on_batch_done: Callable[[int], None] | None = None,
+    warmup_first: bool = False,
+) -> list[list[dict]]:
+    """Run generate_batch over every batch with at most max_concurrency in flight.
+
+    Args:
+        batches: Question batches.
+        generate_batch: Callable(batch_index, batch) returning the batch responses.
+        max_concurrency: Maximum number of concurrent Claude calls.
+        on_batch_done: Optional callback receiving the number of finished batches.
+        warmup_first: Run the first batch alone before the others, so that its
+            prompt cache entry exists when the remaining batches start.
+
+    Returns:
+        Responses of each batch, in batch order.
+
+    Raises:
+        The first exception raised by a batch (pending batches are cancelled).
+    """
+    results: list[list[dict]] = [[] for _ in batches]
+    done = 0
+    start = 0
+    if warmup_first and len(batches) > 1:
+        results[0] = generate_batch(0, batches[0])
+        done = start = 1
+        if on_batch_done is not None:
+            on_batch_done(done)
+
+    workers = max(1, min(max_concurrency, len(batches) - start))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="claude-batch") as pool:
+        futures = {
+            pool.submit(generate_batch, i, batches[i]): i for i in range(start, len(batches))
+        }
+        try:
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                done += 1
+                if on_batch_done is not None:
+                    on_batch_done(done)
+        except Exception:
+            for f in futures:
+                f.cancel()
+            raise
+    return results
+
+
+class _AnswerRecorder:
+    """Persist answers as soon as they arrive and publish progress on the project.
+
+    Every new answer is appended to responses_partial.jsonl (so a partial answer
+    set survives a dropped connection) and counted in project.json as
+    progress_done / progress_total. Safe to call from concurrent batch threads.
+    """
+
+    def __init__(
+        self,
+        project_id: str,
+        path: Path,
+        questions: list[dict],
+        min_interval: float = 1.0,
+    ) -> None:
+        self._project_id = project_id
+        self._path = path
+        self._expected = {q["question_id"] for q in questions}
+        self._seen: set[str] = set()
+        self._min_interval = min_interval
+        self._last_publish = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def done(self) -> int:
+        """Number of distinct questions answered so far."""
+        return len(self._seen)
+
+    def preload(self, responses: list[dict]) -> None:
+        """Count answers already in the partial file (resumed generation) without rewriting them."""
+        with self._lock:
+            for r in responses:
+                qid = str(r.get("question_id", "")).strip()
+                if qid in self._expected:
+                    self._seen.add(qid)
+
+    def record(self, responses: list[dict]) -> None:
+        """Append new answers to the partial file and refresh progress (throttled)."""
+        with self._lock:
+            new = []
+            for r in responses:
+                qid = str(r.get("question_id", "")).strip()
+                if qid in self._expected and qid not in self._seen:
+                    self._seen.add(qid)
+                    new.append(r)
+            if not new:
+                return
+            with open(self._path, "a", encoding="utf-8") as f:
+                for r in new:
+                    f.write(json.dumps(r, ensure_ascii=False) + "\n")
+
+            now = time.monotonic()
+            if now - self._last_publish >= self._min_interval or self.done == len(self._expected):
+                self._publish()
+                self._last_publish = now
+
+    def flush(self) -> None:
+        """Publish the current progress unconditionally."""
+        with self._lock:
+            self._publish()
+
+    def _publish(self) -> None:
+        total = len(self._expected)
+        project_manager.update_project(
+            self._project_id,
+            progress_done=self.done,
+            progress_total=total,
+            progress_step=f"Génération des réponses ({self.done}/{total} questions)...",
+        )
+
+
+def _merge_batch_responses(questions: list[dict], batch_results: list[list[dict]]) -> list[dict]:
+    """Merge per-batch responses by question_id, in questionnaire order.
+
+    Args:
+        questions: All questions sent to Claude.
+        batch_results: Responses returned for each batch.
+
+    Returns:
+        One response per answered question_id. Responses whose id does not match
+        any question are kept at the end (write_responses ignores them).
+    """
+    by_id: dict[str, dict] = {}
+    for batch_responses in batch_results:
+        for r in batch_responses:
+            qid = str(r.get("question_id", "")).strip()
+            if qid and qid not in by_id:
+                by_id[qid] = {**r, "question_id": qid}
+
+    merged: list[dict] = []
+    for q in questions:
+        r = by_id.pop(q["question_id"], None)
+        if r is not None:
+            merged.append(r)
+
+    missing = len({q["question_id"] for q in questions}) - len(merged)
+    if missing:
+        logger.warning("Claude did not answer %d question(s)", missing)
+    if by_id:
+        logger.warning("Claude returned %d unknown question_id(s): %s", len(by_id), list(by_id)[:10])
+        merged.extend(by_id.values())
+    return merged
+
+
+def _answer_cache_context(
+    cadrage: dict,
+    corpus_ids: list[str],
+    model: str,
+    verbosity: dict,
+    status_choices: list[str] | None,
+    project_dir: Path,
+    system_prompt: str,
+    retrieval: dict | None = None,
+) -> str:
+    """Return the answer-cache context fingerprint of a generation."""
+    corpus = [
+        (
+            cid,
+            answer_cache.file_fingerprint(
+                CORPUS_DIR / cid / "anonymized.xlsx",
+                CORPUS_DIR / cid / "anonymized.docx",
+                CORPUS_DIR / cid / "structure.json",
+            ),
+        )
+        for cid in corpus_ids
+    ]
+    return answer_cache.context_fingerprint(
+        cadrage={k: cadrage.get(k) for k in _CADRAGE_LABELS},
+        corpus=corpus,
+        policies_hash=answer_cache.file_fingerprint(POLICIES_DIR / "politiques.md"),
+        model=model,
+        verbosity_level=verbosity["level"],
+        status_choices=status_choices,
+        contract_hash=answer_cache.file_fingerprint(project_dir / "contract_anonymized.docx"),
+        system_prompt=system_prompt,
+        retrieval=retrieval,
+    )
+
+
+def _classify_out_of_scope(
+    questions: list[dict],
+    cadrage: dict,
+    status_choices: list[str] | None,
+    threshold: float,
+    min_hits: int,
+) -> tuple[list[dict], list[dict]]:
+    """Answer the questions that clearly fall under an exclusion rule of the cadrage.
+
+    Args:
+        questions: Questions to classify.
+        cadrage: Cadrage answers dict.
+        status_choices: Allowed status values, or None.
+        threshold: Minimum lexicon score of a rule (see scope_classifier).
+        min_hits: Minimum number of distinct lexicon entries of a rule.
+
+    Returns:
+        (local answers, questions left for Claude).
+    """
+    rules = scope_classifier.exclusion_rules(cadrage)
+    if not rules:
+        return [], questions
+
+    classifier = scope_classifier.ScopeClassifier(rules, threshold, min_hits)
+    na_value = _detect_na_value(status_choices)
+    answered: list[dict] = []
+    remaining: list[dict] = []
+    for q in questions:
+        rule = classifier.classify(q["question_text"])
+        if rule is None:
+            remaining.append(q)
+            continue
+        answered.append({
+            "question_id": q["question_id"],
+            "response": f"Sans objet — {rule['justification']}",
+            # Same status policy as the prompt: the N/A value, or empty
+            "status": na_value,
+        })
+        logger.debug("Question %s out of scope (%s)", q["question_id"], rule["key"])
+    return answered, remaining
+
+
+def _lookup_cached_answers(
+    questions: list[dict],
+    context_fp: str,
+) -> tuple[list[dict], list[dict]]:
+    """Split questions into cached answers and questions left for Claude.
+
+    Args:
+        questions: Questions in questionnaire order.
+        context_fp: Fingerprint from _answer_cache_context().
+
+    Returns:
+        (cached responses with question_id attached, questions to generate).
+    """
+    cached: list[dict] = []
+    misses: list[dict] = []
+    for q in questions:
+        entry = answer_cache.get(answer_cache.answer_key(context_fp, q["question_text"]))
+        if entry is None:
+            misses.append(q)
+        else:
+            cached.append({"question_id": q["question_id"], **entry})
+    return cached, misses
+
+
 # ---------------------------------------------------------------------------
 # Main generation pipeline
 # ---------------------------------------------------------------------------
 
 
-def run_generation(project_id: str) -> None:
+def run_generation(project_id: str, resume: bool = False, mode: str = "interactive") -> None:
     """Entry point for the background generation task.
 
     Wraps _do_generation with error handling: on any exception, the project
@@ -770,11 +1342,19 @@ def run_generation(project_id: str) -> None:
 
     Args:
         project_id: UUID of the project to generate.
+        resume: Continue from checkpoint.json instead of starting over.
+        mode: "interactive" (direct calls) or "batch" (Message Batches API).
     """
     try:
-        _do_generation(project_id)
+        _do_generation(project_id, resume=resume, mode=mode)
+        metrics.GENERATIONS.inc(kind="generation", outcome="completed")
+    except job_queue.JobCancelledError:
+        metrics.GENERATIONS.inc(kind="generation", outcome="cancelled")
+        _mark_cancelled(project_id)
     except Exception as exc:
         logger.exception("Generation failed for project %s", project_id)
+        metrics.GENERATIONS.inc(kind="generation", outcome="error")
+        close_timeline(project_id, "error")
         try:
             project_manager.update_project(
                 project_id,
@@ -785,14 +1365,182 @@ def run_generation(project_id: str) -> None:
             pass
 
 
-def _do_generation(project_id: str) -> None:
-    """Full generation pipeline.
+def run_regeneration(
+    project_id: str,
+    question_ids: list[str],
+    failed_only: bool = False,
+    resume: bool = False,
+) -> None:
+    """Entry point for the background selective-regeneration task.
+
+    Wraps _do_regeneration with the same error handling as run_generation.
+
+    Args:
+        project_id: UUID of the project.
+        question_ids: Questions to regenerate.
+        failed_only: Also regenerate every question whose answer is missing or empty.
+        resume: Continue from checkpoint.json instead of starting over.
+    """
+    try:
+        _do_regeneration(project_id, question_ids, failed_only, resume=resume)
+        metrics.GENERATIONS.inc(kind="regeneration", outcome="completed")
+    except job_queue.JobCancelledError:
+        metrics.GENERATIONS.inc(kind="regeneration", outcome="cancelled")
+        _mark_cancelled(project_id)
+    except Exception as exc:
+        logger.exception("Regeneration failed for project %s", project_id)
+        metrics.GENERATIONS.inc(kind="regeneration", outcome="error")
+        close_timeline(project_id, "error")
+        try:
+            project_manager.update_project(
+                project_id,
+                status="error",
+                error_message=str(exc),
+            )
+        except Exception:
+            pass
+
+
+def _mark_cancelled(project_id: str) -> None:
+    """Record a cancelled job: status 'cancelled', no checkpoint to resume from."""
+    logger.info("Generation cancelled for project %s", project_id)
+    close_timeline(project_id, "cancelled")
+    project_manager.update_project(
+        project_id,
+        status="cancelled",
+        progress_step="Annulé.",
+        error_message=None,
+    )
+    project_manager.clear_checkpoint(project_id)
+
+
+def _check_cancelled(ctx: dict) -> None:
+    """Cancellation point: raise JobCancelledError once the job has been cancelled."""
+    if ctx["cancel"].is_set():
+        raise job_queue.JobCancelledError(ctx["project_id"])
+
+
+def resume_generation(project_id: str) -> None:
+    """Resume a generation interrupted by a server restart, from its checkpoint.
+
+    A job that was still queued (checkpoint written at submission, never
+    started) is run from the beginning.
+
+    Args:
+        project_id: UUID of the project (status 'generating', with a checkpoint).
+    """
+    checkpoint = project_manager.load_checkpoint(project_id) or {}
+    resume = not checkpoint.get("queued")
+    logger.info(
+        "%s %s for project %s after stage %s",
+        "Resuming" if resume else "Restarting queued", checkpoint.get("kind", "generation"),
+        project_id, checkpoint.get("done"),
+    )
+    if checkpoint.get("kind") == "regeneration":
+        run_regeneration(
+            project_id,
+            checkpoint.get("question_ids", []),
+            bool(checkpoint.get("failed_only")),
+            resume=resume,
+        )
+    else:
+        run_generation(project_id, resume=resume, mode=checkpoint.get("mode", "interactive"))
+
+
+# Pipeline stages recorded in checkpoint.json ("done" = last completed stage)
+_STAGES = ("responses", "output", "attention", "deanonymized")
+
+
+def _start_checkpoint(project_id: str, resume: bool, **fields) -> dict:
+    """Return the checkpoint to continue from, or a fresh one (saved to disk)."""
+    checkpoint = project_manager.load_checkpoint(project_id) if resume else None
+    if checkpoint is None:
+        checkpoint = {"done": None, "resume_count": 0, **fields}
+        project_manager.save_checkpoint(project_id, checkpoint)
+    return checkpoint
+
+
+def _stage_done(checkpoint: dict, stage: str) -> bool:
+    done = checkpoint.get("done")
+    return done is not None and _STAGES.index(done) >= _STAGES.index(stage)
+
+
+def _mark_stage(project_id: str, checkpoint: dict, stage: str, **fields) -> None:
+    checkpoint.update(fields, done=stage)
+    project_manager.save_checkpoint(project_id, checkpoint)
+
+
+def _read_partial_answers(path: Path) -> list[dict]:
+    """Return the answers persisted in responses_partial.jsonl (torn last line ignored)."""
+    if not path.exists():
+        return []
+    answers = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        try:
+            answers.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    return answers
+
+
+def load_saved_responses(project_id: str) -> list[dict] | None:
+    """Return the per-question results of the last generation (responses.json).
 
     Args:
         project_id: UUID of the project.
 
+    Returns:
+        One {"question_id", "question_text", "response", "status"} dict per
+        question, in questionnaire order, or None if no generation completed yet.
+    """
+    path = PROJECTS_DIR / project_id / "responses.json"
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def has_full_generation(project_id: str) -> bool:
+    """Return True if the last full generation completed (responses, output and attention points).
+
+    Regeneration patches answers into these artifacts and keeps the attention
+    points, so it needs all three.
+    """
+    project_dir = PROJECTS_DIR / project_id
+    return all((project_dir / name).exists() for name in ("responses.json", "output.xlsx", "attention.md"))
+
+
+def _save_responses(ctx: dict, responses: list[dict]) -> None:
+    """Write responses.json: one entry per question, empty response if unanswered."""
+    by_id = {r["question_id"]: r for r in responses}
+    entries = []
+    for q in ctx["questions"]:
+        r = by_id.get(q["question_id"], {})
+        entries.append({
+            "question_id": q["question_id"],
+            "question_text": q["question_text"],
+            "response": r.get("response") or "",
+            "status": r.get("status"),
+        })
+    (ctx["project_dir"] / "responses.json").write_text(
+        json.dumps(entries, ensure_ascii=False, indent=2), encoding="utf-8"
+    )
+
+
+def _prepare_generation(project_id: str, timeline: Timeline, mode: str = "interactive") -> dict:
+    """Load everything a generation needs (steps 1 to 4 of the pipeline).
+
+    Args:
+        project_id: UUID of the project.
+        timeline: Timeline of the run (stages are timed, its calls are the usage log).
+        mode: "interactive" (direct calls) or "batch" (Message Batches API).
+
+    Returns:
+        Generation context dict (project data, config, Claude client, references,
+        questions and status choices).
+
     Raises:
-        Various exceptions on failure (caught by run_generation).
+        RuntimeError: If a prerequisite (cadrage, structure, anonymized file,
+            questions) is missing.
     """
     project_dir = PROJECTS_DIR / project_id
 
@@ -836,30 +1584,44 @@ def _do_generation(project_id: str) -> None:
         project_id, model, verbosity["label"], max_tokens,
     )
 
-    # Build Anthropic client once (reused for Files API + generation calls)
-    api_key = os.environ.get("ANTHROPIC_API_KEY", "")
-    if not api_key or api_key.startswith("sk-ant-..."):
-        raise RuntimeError("ANTHROPIC_API_KEY non configurée.")
-    claude_client = anthropic.Anthropic(api_key=api_key)
+    # Shared client: connection pool and rate limiter common to all generations
+    client = claude_client.get_client()
 
     # Upload / retrieve cached POLITIQUES.md file_id
-    policies_file_id = _get_policies_file_id(claude_client)
+    with timeline.stage("policies_upload"):
+        policies_file_id = _get_policies_file_id(client)
 
     # -------------------------------------------------------------------------
     # Step 3 — Load corpus content
     # -------------------------------------------------------------------------
-    corpus_ids_to_use = selected_corpus[:max_files]
+    retrieval_config = config.get("reference", {}).get("retrieval", {})
+    corpus_index_obj: corpus_index.BM25Index | None = None
     corpus_contents: list[str] = []
-    for cid in corpus_ids_to_use:
-        content = _read_corpus_entry(cid)
-        if content:
-            corpus_contents.append(content)
-    logger.info("Loaded %d corpus entries", len(corpus_contents))
+    with timeline.stage("corpus_load"):
+        if retrieval_config.get("enabled", True):
+            # Per-question retrieval: the prompt size no longer depends on the corpus size
+            if retrieval_config.get("scope", "selected") == "all" and CORPUS_DIR.exists():
+                corpus_ids_to_use = sorted(d.name for d in CORPUS_DIR.iterdir() if d.is_dir())
+            else:
+                corpus_ids_to_use = list(selected_corpus)
+            corpus_index_obj = corpus_index.get_index(corpus_ids_to_use)
+            logger.info(
+                "Corpus retrieval over %d entries (%d Q&A pairs)",
+                len(corpus_ids_to_use), len(corpus_index_obj),
+            )
+        else:
+            corpus_ids_to_use = selected_corpus[:max_files]
+            for cid in corpus_ids_to_use:
+                content = _read_corpus_entry(cid)
+                if content:
+                    corpus_contents.append(content)
+            logger.info("Loaded %d corpus entries", len(corpus_contents))
 
     # -------------------------------------------------------------------------
     # Step 3b — Load contract text (optional)
     # -------------------------------------------------------------------------
-    contract_text = _read_contract_text(project_dir)
+    with timeline.stage("contract_load"):
+        contract_text = _read_contract_text(project_dir)
     if contract_text:
         logger.info(
             "Contract text available for project %s (%d chars)", project_id, len(contract_text)
@@ -876,53 +1638,325 @@ def _do_generation(project_id: str) -> None:
     if not anonymized_path.exists():
         raise RuntimeError("Fichier anonymisé introuvable.")
 
-    questions = read_questions(anonymized_path, structure)
+    with timeline.stage("questions_read"):
+        questions = read_questions(anonymized_path, structure)
+        # Read status dropdown choices if a status column is defined
+        status_choices = read_status_choices(anonymized_path, structure)
     if not questions:
         raise RuntimeError("Aucune question extraite du questionnaire.")
 
     logger.info("Extracted %d questions from project %s", len(questions), project_id)
 
-    # Read status dropdown choices if a status column is defined
-    status_choices = read_status_choices(anonymized_path, structure)
     if status_choices:
         logger.info("Status choices for project %s: %s", project_id, status_choices)
     else:
         logger.info("No status choices found for project %s (col_status=%s)", project_id, structure.get("col_status"))
 
-    # -------------------------------------------------------------------------
-    # Step 5 — Generate responses via Claude
-    # -------------------------------------------------------------------------
-    project_manager.update_project(
-        project_id, progress_step="Génération des réponses (appel Claude)..."
-    )
+    return {
+        "project_id": project_id,
+        "project_dir": project_dir,
+        "cadrage": cadrage,
+        "structure": structure,
+        "config": config,
+        "model": model,
+        "max_tokens": max_tokens,
+        "verbosity": verbosity,
+        "client": client,
+        # Set by POST /cancel (never set outside the job queue)
+        "cancel": job_queue.get_queue().cancel_event(project_id) or threading.Event(),
+        "policies_file_id": policies_file_id,
+        "corpus_ids": corpus_ids_to_use,
+        "corpus_contents": corpus_contents,
+        "corpus_index": corpus_index_obj,
+        "retrieval": retrieval_config if corpus_index_obj is not None else None,
+        "contract_text": contract_text,
+        "anonymized_path": anonymized_path,
+        "questions": questions,
+        "status_choices": status_choices,
+        "prompt_cache": bool(config.get("claude", {}).get("prompt_caching", True)),
+        "usage_log": timeline.calls,
+        "timeline": timeline,
+        "mode": mode,
+    }
+
+
+def _generate_answers(
+    ctx: dict,
+    questions: list[dict],
+    use_answer_cache: bool = True,
+    debug_title: str = "responses",
+    debug_mode: str = "w",
+    resume: bool = False,
+    local_scope: bool = True,
+) -> list[dict]:
+    """Generate answers for the given questions (step 5 of the pipeline).
+
+    Clearly out-of-scope questions are answered locally and cache hits are
+    served from the answer cache; the remaining questions are
+    split into batches and sent to Claude concurrently. New answers are stored
+    in the cache, even when use_answer_cache is False (forced regeneration).
+
+    Args:
+        ctx: Context from _prepare_generation().
+        questions: Questions to answer (all of them, or a subset).
+        use_answer_cache: Whether to look answers up in the cache first.
+        debug_title: Section label written in prompt_debug.txt.
+        debug_mode: "w" to overwrite prompt_debug.txt, "a" to append to it.
+        resume: Keep the answers already in responses_partial.jsonl and only
+            generate the missing ones.
+        local_scope: Answer clearly out-of-scope questions locally (scope classifier).
+
+    Returns:
+        Answers merged by question_id in questionnaire order, with the French
+        article correction applied.
+
+    Raises:
+        RuntimeError: If no answer at all was obtained.
+    """
+    project_id = ctx["project_id"]
+    project_dir = ctx["project_dir"]
+    config = ctx["config"]
+    cadrage = ctx["cadrage"]
+    verbosity = ctx["verbosity"]
+    status_choices = ctx["status_choices"]
+    model = ctx["model"]
+    max_tokens = ctx["max_tokens"]
+    client = ctx["client"]
+    policies_file_id = ctx["policies_file_id"]
+    prompt_cache = ctx["prompt_cache"]
+    usage_log = ctx["usage_log"]
 
     system_response = _load_prompt("system_response.txt")
-    user_prompt_resp = _build_user_prompt_responses(
-        cadrage, corpus_contents, questions, verbosity, status_choices,
-        has_policies=policies_file_id is not None,
-        contract_text=contract_text,
-    )
+
+    # Answers persisted before a restart are kept as they are
+    partial_path = project_dir / "responses_partial.jsonl"
+    resumed_responses: list[dict] = []
+    to_generate = questions
+    if resume:
+        expected = {q["question_id"] for q in questions}
+        resumed_responses = [
+            r for r in _read_partial_answers(partial_path)
+            if str(r.get("question_id", "")).strip() in expected
+        ]
+        resumed_ids = {str(r.get("question_id", "")).strip() for r in resumed_responses}
+        to_generate = [q for q in questions if q["question_id"] not in resumed_ids]
+        logger.info(
+            "Resuming project %s: %d answer(s) already generated, %d left",
+            project_id, len(resumed_ids), len(to_generate),
+        )
+    else:
+        partial_path.unlink(missing_ok=True)
+
+    # Clearly out-of-scope questions are answered locally from the exclusion rules
+    scoped_responses: list[dict] = []
+    scope_config = config.get("scope_classifier", {})
+    if local_scope and scope_config.get("enabled", False):
+        scoped_responses, to_generate = _classify_out_of_scope(
+            to_generate, cadrage, status_choices,
+            float(scope_config.get("threshold", 4.0)), int(scope_config.get("min_hits", 2)),
+        )
+        if scoped_responses:
+            logger.info(
+                "Scope classifier for project %s: %d question(s) answered locally",
+                project_id, len(scoped_responses),
+            )
+        project_manager.update_project(
+            project_id, scope_classifier={"answered": len(scoped_responses)}
+        )
+
+    # Serve unchanged questions from the answer cache; only misses go to Claude
+    cache_config = config.get("answer_cache", {})
+    cache_enabled = bool(cache_config.get("enabled", True))
+    cached_responses: list[dict] = []
+    if cache_enabled:
+        context_fp = _answer_cache_context(
+            cadrage, ctx["corpus_ids"], model, verbosity, status_choices,
+            project_dir, system_response, retrieval=ctx.get("retrieval"),
+        )
+    if cache_enabled and use_answer_cache:
+        cached_responses, to_generate = _lookup_cached_answers(to_generate, context_fp)
+        logger.info(
+            "Answer cache for project %s: %d hit(s), %d miss(es)",
+            project_id, len(cached_responses), len(to_generate),
+        )
+        project_manager.update_project(
+            project_id,
+            answer_cache={"hits": len(cached_responses), "misses": len(to_generate)},
+        )
+
+    gen_config = config.get("generation", {})
+    if not to_generate:
+        batches = []
+    elif gen_config.get("chunking", True):
+        batches = _split_into_batches(
+            to_generate, verbosity, int(gen_config.get("batch_output_tokens", 6000))
+        )
+    else:
+        batches = [to_generate]
+    max_concurrency = int(gen_config.get("max_concurrency", 3))
+
+    def _prompt_for(batch: list[dict]) -> list[dict]:
+        return _build_user_prompt_responses(
+            cadrage, ctx["corpus_contents"], batch, verbosity, status_choices,
+            has_policies=policies_file_id is not None,
+            contract_text=ctx["contract_text"],
+            prompt_cache=prompt_cache,
+            examples=_retrieve_examples(ctx, batch),
+        )
+
+    user_prompts_resp = [_prompt_for(batch) for batch in batches]
 
     logger.info(
-        "Calling Claude for responses — prompt length: ~%d chars, policies_file_id=%s",
-        len(system_response) + len(user_prompt_resp),
+        "Calling Claude for responses — %d batch(es), concurrency=%d, "
+        "prompt length: ~%d chars, policies_file_id=%s, prompt_cache=%s",
+        len(batches),
+        max_concurrency,
+        len(system_response) + max((len(_prompt_text(p)) for p in user_prompts_resp), default=0),
         policies_file_id,
+        prompt_cache,
     )
 
-    # Save prompt to disk for later download
+    # Save prompt to disk for later download (the stable prefix is shared by all batches)
     prompt_debug_path = project_dir / "prompt_debug.txt"
-    with open(prompt_debug_path, "w", encoding="utf-8") as _f:
-        _f.write("=== SYSTEM (responses) ===\n\n")
+    with open(prompt_debug_path, debug_mode, encoding="utf-8") as _f:
+        if debug_mode == "a":
+            _f.write("\n\n")
+        _f.write(f"=== SYSTEM ({debug_title}) ===\n\n")
         _f.write(system_response)
-        _f.write("\n\n=== USER (responses) ===\n\n")
-        _f.write(user_prompt_resp)
+        if user_prompts_resp:
+            _f.write(f"\n\n=== USER ({debug_title}, partie commune) ===\n\n")
+            _f.write(user_prompts_resp[0][0]["text"])
+        else:
+            _f.write(f"\n\n=== USER ({debug_title}) ===\n\n(toutes les réponses servies par le cache)")
+        for i, user_prompt_resp in enumerate(user_prompts_resp, 1):
+            _f.write(f"\n\n=== USER ({debug_title}, lot {i}/{len(batches)}) ===\n\n")
+            _f.write(user_prompt_resp[1]["text"])
+
+    # Answers are persisted as they arrive so that a dropped connection keeps them
+    streaming = bool(gen_config.get("streaming", True))
+    recorder = _AnswerRecorder(project_id, partial_path, questions)
+    recorder.preload(resumed_responses)
+    recorder.record(scoped_responses)
+    recorder.record(cached_responses)
+    recorder.flush()
+
+    max_continuations = int(gen_config.get("max_continuations", 2))
+
+    def _ask(user_prompt: list[dict], label: str) -> tuple[list[dict], bool]:
+        """One Claude call; returns (responses, truncated)."""
+        # Cancellation point between batches and continuations
+        _check_cancelled(ctx)
+        call_usage: list[dict] = []
+        started, started_at = time.monotonic(), now_iso()
+        try:
+            if streaming:
+                result = _stream_claude_json(
+                    system_response, user_prompt, model, max_tokens,
+                    client=client, file_id=policies_file_id,
+                    prompt_cache=prompt_cache, usage_log=call_usage,
+                    on_item=lambda item: recorder.record([item]),
+                    cancel=ctx["cancel"],
+                )
+            else:
+                result = _call_claude_json(
+                    system_response, user_prompt, model, max_tokens,
+                    client=client, file_id=policies_file_id,
+                    prompt_cache=prompt_cache, usage_log=call_usage,
+                    array_key="responses", cancel=ctx["cancel"],
+                )
+            items, truncated = result.get("responses", []), False
+        except _TruncatedResponse as exc:
+            items, truncated = exc.items, True
+        finally:
+            _log_calls(usage_log, label, call_usage, started, started_at, "responses")
+        recorder.record(items)
+        return items, truncated
+
+    def _answer_batch(
+        batch: list[dict],
+        label: str,
+        user_prompt: list[dict] | None = None,
+    ) -> list[dict]:
+        batch_responses, truncated = _ask(user_prompt or _prompt_for(batch), label)
+
+        # Truncated at max_tokens: keep the salvaged answers, ask again for the others
+        for attempt in range(1, max_continuations + 1):
+            if not truncated:
+                break
+            answered = {str(r.get("question_id", "")).strip() for r in batch_responses}
+            missing = [q for q in batch if q["question_id"] not in answered]
+            if not missing:
+                break
+            logger.warning(
+                "%s truncated — continuation %d for %d question(s)", label, attempt, len(missing),
+            )
+            more, truncated = _ask(_prompt_for(missing), f"{label} (suite {attempt})")
+            if not more:
+                break
+            batch_responses = batch_responses + more
+        if truncated:
+            logger.warning(
+                "%s still truncated after %d continuation(s) — unanswered questions left empty",
+                label, max_continuations,
+            )
+        return batch_responses
 
-    result_responses = _call_claude_json(
-        system_response, user_prompt_resp, model, max_tokens,
-        client=claude_client, file_id=policies_file_id,
-    )
+    def _generate_batch(batch_idx: int, batch: list[dict]) -> list[dict]:
+        batch_responses = _answer_batch(
+            batch, f"responses {batch_idx + 1}/{len(batches)}", user_prompts_resp[batch_idx]
+        )
+        logger.info(
+            "Batch %d/%d: %d questions, %d responses",
+            batch_idx + 1, len(batches), len(batch), len(batch_responses),
+        )
+        return batch_responses
+
+    if ctx.get("mode") == "batch" and batches:
+        batch_results = _generate_via_message_batch(ctx, system_response, user_prompts_resp, recorder)
+
+        # Requests the batch did not fully answer (errors, truncation) go through direct calls
+        answered = {
+            str(r.get("question_id", "")).strip() for results in batch_results for r in results
+        }
+        leftover = [q for q in to_generate if q["question_id"] not in answered]
+        if leftover:
+            logger.warning(
+                "Message batch left %d question(s) unanswered — answering them directly",
+                len(leftover),
+            )
+            leftover_batches = _split_into_batches(
+                leftover, verbosity, int(gen_config.get("batch_output_tokens", 6000))
+            )
+            batch_results += _run_batches(
+                leftover_batches,
+                lambda i, batch: _answer_batch(batch, f"responses hors lot {i + 1}/{len(leftover_batches)}"),
+                max_concurrency,
+            )
+    else:
+        # Let the first batch write the prompt cache before the others read it
+        warmup = prompt_cache and bool(gen_config.get("cache_warmup", True))
+        batch_results = _run_batches(batches, _generate_batch, max_concurrency, warmup_first=warmup)
+    recorder.flush()
+    project_manager.update_project(project_id, claude_usage=_summarize_usage(usage_log))
+
+    if cache_enabled:
+        keys = {
+            q["question_id"]: answer_cache.answer_key(context_fp, q["question_text"])
+            for q in to_generate
+        }
+        for batch_responses in batch_results:
+            for r in batch_responses:
+                key = keys.get(str(r.get("question_id", "")).strip())
+                if key and r.get("response"):
+                    answer_cache.put(key, r)
+        answer_cache.evict(
+            int(cache_config.get("max_entries", 50_000)),
+            int(cache_config.get("max_mb", 200)) * 1024 * 1024,
+        )
 
-    responses: list[dict] = result_responses.get("responses", [])
+    responses = _merge_batch_responses(
+        questions, [resumed_responses, scoped_responses, cached_responses, *batch_results]
+    )
     if not responses:
         raise RuntimeError("Claude n'a retourné aucune réponse.")
 
@@ -933,73 +1967,286 @@ def _do_generation(project_id: str) -> None:
         if "response" in r:
             r["response"] = fix_french_token_articles(r["response"])
 
+    return responses
+
+
+def _message_batch_id(ctx: dict, name: str) -> str | None:
+    """Return the checkpointed ID of the Message Batch submitted for name, if any."""
+    return (ctx.get("checkpoint") or {}).get("message_batches", {}).get(name)
+
+
+def _checkpoint_message_batch(ctx: dict, name: str, batch_id: str) -> None:
+    """Record a submitted Message Batch ID so that a resumed generation polls it again."""
+    checkpoint = ctx.get("checkpoint")
+    if checkpoint is None:
+        return
+    checkpoint.setdefault("message_batches", {})[name] = batch_id
+    project_manager.save_checkpoint(ctx["project_id"], checkpoint)
+
+
+def _generate_via_message_batch(
+    ctx: dict,
+    system_response: str,
+    user_prompts: list[list[dict]],
+    recorder: _AnswerRecorder,
+) -> list[list[dict]]:
+    """Answer every question batch through a single Message Batch (batch mode).
+
+    Args:
+        ctx: Context from _prepare_generation().
+        system_response: Response-generation system prompt.
+        user_prompts: One user prompt per question batch.
+        recorder: Recorder receiving the answers.
+
+    Returns:
+        Responses of each question batch, in batch order (empty for failed requests).
+    """
+    project_id = ctx["project_id"]
+    poll_seconds = float(ctx["config"].get("generation", {}).get("batch_poll_seconds", 30))
+    project_manager.update_project(
+        project_id, progress_step="Traitement par lot Anthropic en cours (différé)..."
+    )
+
+    requests = [
+        (
+            f"responses-{i}",
+            _message_kwargs(
+                system_response, prompt, ctx["model"], ctx["max_tokens"],
+                ctx["policies_file_id"], ctx["prompt_cache"],
+            ),
+        )
+        for i, prompt in enumerate(user_prompts)
+    ]
+    started, started_at = time.monotonic(), now_iso()
+    messages = _run_message_batch(
+        ctx["client"], requests, poll_seconds,
+        batch_id=_message_batch_id(ctx, "responses"),
+        on_created=lambda batch_id: _checkpoint_message_batch(ctx, "responses", batch_id),
+        cancel=ctx["cancel"],
+    )
+    metrics.CLAUDE_CALL_SECONDS.observe(time.monotonic() - started, call="responses_batch")
+
+    results: list[list[dict]] = []
+    for i in range(len(user_prompts)):
+        message = messages.get(f"responses-{i}")
+        items: list[dict] = []
+        call_usage: list[dict] = []
+        if message is not None:
+            try:
+                items = _message_json(message, call_usage, "responses").get("responses", [])
+            except _TruncatedResponse as exc:
+                items = exc.items
+            except json.JSONDecodeError:
+                logger.warning("Message batch request responses-%d returned invalid JSON", i)
+        # Batch requests are timed as a whole (submission to results)
+        _log_calls(ctx["usage_log"], f"responses {i + 1}/{len(user_prompts)} (lot)", call_usage, started, started_at)
+        recorder.record(items)
+        results.append(items)
+    return results
+
+
+def _retrieve_examples(ctx: dict, questions: list[dict]) -> str | None:
+    """Return the corpus examples retrieved for a batch, or None without retrieval."""
+    index = ctx.get("corpus_index")
+    if index is None or not len(index):
+        return None
+    retrieval = ctx["retrieval"]
+    pairs = corpus_index.retrieve_examples(
+        index,
+        questions,
+        top_k=int(retrieval.get("top_k", 3)),
+        min_score=float(retrieval.get("min_score", 1.0)),
+        max_examples=int(retrieval.get("max_examples_per_batch", 60)),
+    )
+    return corpus_index.format_examples(pairs) or None
+
+
+def _load_anon_mapping(ctx: dict) -> dict[str, str]:
+    """Return the anonymization mapping {original: token} of the project."""
+    map_path = ctx["project_dir"] / "anonymized_map.json"
+    if not map_path.exists():
+        raise RuntimeError("Table de correspondance anonymization introuvable.")
+    return json.loads(map_path.read_text(encoding="utf-8"))
+
+
+def _deanonymize_output(ctx: dict) -> dict[str, str]:
+    """De-anonymize output_anon.xlsx into output.xlsx.
+
+    output_anon.xlsx is kept: the caller removes it once the "deanonymized"
+    stage is checkpointed, so that a resume before that point still finds it.
+
+    Args:
+        ctx: Context from _prepare_generation().
+
+    Returns:
+        The anonymization mapping {original: token}.
+    """
+    project_dir = ctx["project_dir"]
+    anon_mapping = _load_anon_mapping(ctx)
+
+    output_anon_path = project_dir / "output_anon.xlsx"
+    output_path = project_dir / "output.xlsx"
+    deanonymize_xlsx(output_anon_path, output_path, anon_mapping, **anonymization_options(get_config()))
+    return anon_mapping
+
+
+def _saved_answers(saved: list[dict]) -> list[dict]:
+    """Keep the responses.json entries that hold an answer."""
+    return [e for e in saved if (e.get("response") or "").strip()]
+
+
+def _do_generation(project_id: str, resume: bool = False, mode: str = "interactive") -> None:
+    """Full generation pipeline.
+
+    Progress is checkpointed in checkpoint.json after each stage (answers are
+    persisted one by one in responses_partial.jsonl), so that a generation
+    interrupted by a restart resumes where it stopped.
+
+    In batch mode, the responses and attention requests go through the Message
+    Batches API (cheaper, for non-interactive runs); the submitted batch IDs are
+    checkpointed so that a resumed generation polls them instead of resubmitting.
+
+    Args:
+        project_id: UUID of the project.
+        resume: Continue from checkpoint.json instead of starting over.
+        mode: "interactive" (direct calls) or "batch" (Message Batches API).
+
+    Raises:
+        Various exceptions on failure (caught by run_generation).
+    """
+    checkpoint = _start_checkpoint(project_id, resume, kind="generation", mode=mode)
+    timeline = Timeline(project_id, "generation", resume=resume)
+    ctx = _prepare_generation(project_id, timeline, mode=checkpoint.get("mode", mode))
+    ctx["checkpoint"] = checkpoint
+    project_dir = ctx["project_dir"]
+    if not resume:
+        # Written again at the end: until then the project has no complete generation
+        (project_dir / "attention.md").unlink(missing_ok=True)
+    questions = ctx["questions"]
+    usage_log = ctx["usage_log"]
+
+    # -------------------------------------------------------------------------
+    # Step 5 — Generate responses via Claude
+    # -------------------------------------------------------------------------
+    _check_cancelled(ctx)
+    if _stage_done(checkpoint, "responses"):
+        responses = _saved_answers(load_saved_responses(project_id) or [])
+    else:
+        project_manager.update_project(
+            project_id, progress_step="Génération des réponses (appel Claude)..."
+        )
+        with timeline.stage("claude_responses"):
+            responses = _generate_answers(ctx, questions, resume=resume)
+            _save_responses(ctx, responses)
+        _mark_stage(project_id, checkpoint, "responses")
+
     # -------------------------------------------------------------------------
     # Step 6 — Write responses into output_anon.xlsx
     # -------------------------------------------------------------------------
-    project_manager.update_project(project_id, progress_step="Écriture des réponses...")
+    _check_cancelled(ctx)
+    if not _stage_done(checkpoint, "output"):
+        project_manager.update_project(project_id, progress_step="Écriture des réponses...")
 
-    output_anon_path = project_dir / "output_anon.xlsx"
-    write_responses(anonymized_path, output_anon_path, structure, responses)
+        output_anon_path = project_dir / "output_anon.xlsx"
+        with timeline.stage("xlsx_write"):
+            write_responses(ctx["anonymized_path"], output_anon_path, ctx["structure"], responses)
+        _mark_stage(project_id, checkpoint, "output")
 
     # -------------------------------------------------------------------------
     # Step 7 — Generate attention points via Claude
     # -------------------------------------------------------------------------
-    project_manager.update_project(
-        project_id, progress_step="Génération des points d'attention..."
-    )
-
-    system_attention = _load_prompt("system_attention.txt")
-    user_prompt_attn = _build_user_prompt_attention(cadrage, questions, responses)
+    _check_cancelled(ctx)
+    if _stage_done(checkpoint, "attention"):
+        attention_points: list[dict] = checkpoint.get("attention_points", [])
+    else:
+        project_manager.update_project(
+            project_id, progress_step="Génération des points d'attention..."
+        )
 
-    logger.info(
-        "Calling Claude for attention points — prompt length: ~%d chars",
-        len(system_attention) + len(user_prompt_attn),
-    )
+        system_attention = _load_prompt("system_attention.txt")
+        user_prompt_attn = _build_user_prompt_attention(ctx["cadrage"], questions, responses)
 
-    # Append attention prompt to the same debug file
-    with open(prompt_debug_path, "a", encoding="utf-8") as _f:
-        _f.write("\n\n=== SYSTEM (attention) ===\n\n")
-        _f.write(system_attention)
-        _f.write("\n\n=== USER (attention) ===\n\n")
-        _f.write(user_prompt_attn)
+        logger.info(
+            "Calling Claude for attention points — prompt length: ~%d chars",
+            len(system_attention) + len(user_prompt_attn),
+        )
 
-    result_attention = _call_claude_json(
-        system_attention, user_prompt_attn, model, max_tokens,
-        client=claude_client,
-    )
+        # Append attention prompt to the same debug file
+        with open(project_dir / "prompt_debug.txt", "a", encoding="utf-8") as _f:
+            _f.write("\n\n=== SYSTEM (attention) ===\n\n")
+            _f.write(system_attention)
+            _f.write("\n\n=== USER (attention) ===\n\n")
+            _f.write(user_prompt_attn)
+
+        attention_usage: list[dict] = []
+        started, started_at = time.monotonic(), now_iso()
+        with timeline.stage("claude_attention"):
+            try:
+                if ctx["mode"] == "batch":
+                    messages = _run_message_batch(
+                        ctx["client"],
+                        [("attention", _message_kwargs(
+                            system_attention, user_prompt_attn, ctx["model"], ctx["max_tokens"],
+                            prompt_cache=ctx["prompt_cache"],
+                        ))],
+                        float(ctx["config"].get("generation", {}).get("batch_poll_seconds", 30)),
+                        batch_id=_message_batch_id(ctx, "attention"),
+                        on_created=lambda batch_id: _checkpoint_message_batch(ctx, "attention", batch_id),
+                        cancel=ctx["cancel"],
+                    )
+                    if "attention" not in messages:
+                        raise RuntimeError("Le traitement par lot des points d'attention a échoué.")
+                    result_attention = _message_json(
+                        messages["attention"], attention_usage, "attention_points"
+                    )
+                else:
+                    result_attention = _call_claude_json(
+                        system_attention, user_prompt_attn, ctx["model"], ctx["max_tokens"],
+                        client=ctx["client"], prompt_cache=ctx["prompt_cache"], usage_log=attention_usage,
+                        array_key="attention_points", cancel=ctx["cancel"],
+                    )
+            except _TruncatedResponse as exc:
+                # Keep the complete attention points rather than failing the project
+                result_attention = {"attention_points": exc.items}
+            _log_calls(
+                usage_log, "attention", attention_usage, started, started_at,
+                "attention_batch" if ctx["mode"] == "batch" else "attention",
+            )
+        project_manager.update_project(project_id, claude_usage=_summarize_usage(usage_log))
 
-    attention_points: list[dict] = result_attention.get("attention_points", [])
-    logger.info("Claude returned %d attention points", len(attention_points))
+        attention_points = result_attention.get("attention_points", [])
+        logger.info("Claude returned %d attention points", len(attention_points))
 
-    # Apply French article correction on attention points before de-anonymization (traitement B)
-    for p in attention_points:
-        for field in ("description", "recommendation"):
-            if field in p:
-                p[field] = fix_french_token_articles(p[field])
+        # Apply French article correction on attention points before de-anonymization (traitement B)
+        for p in attention_points:
+            for field in ("description", "recommendation"):
+                if field in p:
+                    p[field] = fix_french_token_articles(p[field])
+        _mark_stage(project_id, checkpoint, "attention", attention_points=attention_points)
 
     # -------------------------------------------------------------------------
     # Step 8 — De-anonymize output.xlsx
     # -------------------------------------------------------------------------
-    project_manager.update_project(project_id, progress_step="Dé-anonymisation...")
-
-    map_path = project_dir / "anonymized_map.json"
-    if not map_path.exists():
-        raise RuntimeError("Table de correspondance anonymization introuvable.")
-    anon_mapping: dict[str, str] = json.loads(map_path.read_text(encoding="utf-8"))
-
-    output_path = project_dir / "output.xlsx"
-    deanonymize_xlsx(output_anon_path, output_path, anon_mapping)
+    _check_cancelled(ctx)
+    if _stage_done(checkpoint, "deanonymized"):
+        anon_mapping = _load_anon_mapping(ctx)
+    else:
+        project_manager.update_project(project_id, progress_step="Dé-anonymisation...")
 
-    # Clean up intermediate file
-    output_anon_path.unlink(missing_ok=True)
+        with timeline.stage("deanonymization"):
+            anon_mapping = _deanonymize_output(ctx)
+        _mark_stage(project_id, checkpoint, "deanonymized")
+    # Intermediate file, no longer needed once the stage is checkpointed
+    (project_dir / "output_anon.xlsx").unlink(missing_ok=True)
 
     # -------------------------------------------------------------------------
     # Step 9 — Format and save attention.md
     # -------------------------------------------------------------------------
     project_manager.update_project(project_id, progress_step="Finalisation...")
 
-    attention_md = _format_attention_markdown(attention_points, anon_mapping)
-    (project_dir / "attention.md").write_text(attention_md, encoding="utf-8")
+    with timeline.stage("finalization"):
+        attention_md = _format_attention_markdown(attention_points, anon_mapping)
+        (project_dir / "attention.md").write_text(attention_md, encoding="utf-8")
 
     # -------------------------------------------------------------------------
     # Step 10 — Mark completed
@@ -1010,4 +2257,98 @@ def _do_generation(project_id: str) -> None:
         progress_step="Terminé.",
         error_message=None,
     )
+    project_manager.clear_checkpoint(project_id)
+    timeline.finish()
     logger.info("Generation completed successfully for project %s", project_id)
+
+
+def _do_regeneration(
+    project_id: str,
+    question_ids: list[str],
+    failed_only: bool,
+    resume: bool = False,
+) -> None:
+    """Regenerate a subset of answers and patch them into the existing output.
+
+    Only the selected questions are sent to Claude (bypassing the answer cache);
+    the other answers come from responses.json. The attention points of the last
+    full generation are kept as they are. Checkpointed like _do_generation.
+
+    Args:
+        project_id: UUID of the project.
+        question_ids: Questions to regenerate.
+        failed_only: Also regenerate every question whose answer is missing or empty.
+        resume: Continue from checkpoint.json instead of starting over.
+
+    Raises:
+        RuntimeError: If no full generation completed or nothing to regenerate.
+    """
+    saved = load_saved_responses(project_id)
+    if saved is None or not has_full_generation(project_id):
+        raise RuntimeError("Aucune génération complète : lancez d'abord une génération complète.")
+
+    checkpoint = _start_checkpoint(
+        project_id, resume,
+        kind="regeneration", question_ids=question_ids, failed_only=failed_only,
+    )
+    timeline = Timeline(project_id, "regeneration", resume=resume)
+    ctx = _prepare_generation(project_id, timeline)
+    questions = ctx["questions"]
+
+    _check_cancelled(ctx)
+    if _stage_done(checkpoint, "responses"):
+        responses = _saved_answers(saved)
+    else:
+        wanted = {str(qid).strip() for qid in question_ids}
+        if failed_only:
+            answered = {e["question_id"] for e in _saved_answers(saved)}
+            wanted |= {q["question_id"] for q in questions if q["question_id"] not in answered}
+        targets = [q for q in questions if q["question_id"] in wanted]
+        if not targets:
+            raise RuntimeError("Aucune question à régénérer.")
+
+        logger.info("Regenerating %d question(s) for project %s", len(targets), project_id)
+        project_manager.update_project(
+            project_id, progress_step=f"Régénération de {len(targets)} réponse(s)..."
+        )
+
+        with timeline.stage("claude_responses"):
+            new_responses = _generate_answers(
+                ctx, targets, use_answer_cache=False, local_scope=False,
+                debug_title="régénération", debug_mode="a", resume=resume,
+            )
+
+            # Patch the new answers over the saved ones
+            by_id = {e["question_id"]: e for e in _saved_answers(saved)}
+            for r in new_responses:
+                by_id[r["question_id"]] = r
+            responses = [by_id[q["question_id"]] for q in questions if q["question_id"] in by_id]
+            _save_responses(ctx, responses)
+        _mark_stage(project_id, checkpoint, "responses")
+
+    _check_cancelled(ctx)
+    if not _stage_done(checkpoint, "output"):
+        project_manager.update_project(project_id, progress_step="Écriture des réponses...")
+        output_anon_path = ctx["project_dir"] / "output_anon.xlsx"
+        with timeline.stage("xlsx_write"):
+            write_responses(ctx["anonymized_path"], output_anon_path, ctx["structure"], responses)
+        _mark_stage(project_id, checkpoint, "output")
+
+    _check_cancelled(ctx)
+    if not _stage_done(checkpoint, "deanonymized"):
+        project_manager.update_project(project_id, progress_step="Dé-anonymisation...")
+        with timeline.stage("deanonymization"):
+            _deanonymize_output(ctx)
+        _mark_stage(project_id, checkpoint, "deanonymized")
+    # Intermediate file, no longer needed once the stage is checkpointed
+    (ctx["project_dir"] / "output_anon.xlsx").unlink(missing_ok=True)
+
+    project_manager.update_project(
+        project_id,
+        status="completed",
+        progress_step="Terminé.",
+        error_message=None,
+    )
+    project_manager.clear_checkpoint(project_id)
+    timeline.finish()
+    logger.info("Regeneration completed for project %s", project_id)
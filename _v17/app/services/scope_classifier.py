@@ -0,0 +1,262 @@
+"""PAS Assistant — Out-of-scope rules and local question pre-classification.
+
+The cadrage excludes whole domains from the engagement (hosting on the CLIENT
+IS, CLIENT workstations, no GDPR subcontracting, no development, no FOURNISSEUR
+premises...). exclusion_rules() is the single definition of those domains: the
+prompt's exclusion block (build_constraints_block) is rendered from it, and
+classify() matches questions against each rule's lexicon so that clearly
+out-of-scope questions are answered locally instead of by Claude.
+
+Lexicon weights: 3 = term specific to the domain, 2 = strong hint, 1 = weak
+hint. A question is out of scope when an active rule matches at least min_hits
+distinct lexicon entries and its score reaches the configured threshold: a
+single term ("firewall", "badge") is never enough, since in-scope questions
+mention them too. In-scope terms (governance, awareness, incidents...) lower
+every score so that ambiguous questions still go to Claude.
+"""
+
+import logging
+
+from app.services.corpus_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Terms that make a question relevant whatever the exclusions (negative weights)
+_IN_SCOPE_TERMS = {
+    "sensibilisation": -2,
+    "formation": -2,
+    "incident": -2,
+    "pssi": -2,
+    "charte": -1,
+    "politique de securite": -1,
+    "personnel FOURNISSEUR": -1,
+}
+
+
+def exclusion_rules(cadrage: dict) -> list[dict]:
+    """Return the exclusion rules that apply to a cadrage, in prompt order.
+
+    Args:
+        cadrage: Cadrage answers dict.
+
+    Returns:
+        List of {"key", "heading", "body", "justification", "lexicon"} dicts;
+        empty for an enterprise-level PAS (everything is in scope).
+    """
+    if cadrage.get("pas_niveau_entreprise") == "Oui":
+        return []
+
+    rules: list[dict] = []
+
+    # --- Type de prestation ---
+    if cadrage.get("type_prestation_base", "") == "Assistance Technique":
+        rules.append({
+            "key": "assistance_technique",
+            "heading": "TYPE DE PRESTATION (type_prestation_base = \"Assistance Technique\")",
+            "body": (
+                "   Les intervenants FOURNISSEUR travaillent en régie sur le SI de CLIENT.\n"
+                "   Il n'existe pas de dispositif à engagement, de projet forfait, de livraison\n"
+                "   ou de recette. FOURNISSEUR ne déploie pas de solution logicielle propre.\n"
+                "   Questions hors périmètre : gestion de projet à engagement, jalons de livraison,\n"
+                "   recette fonctionnelle FOURNISSEUR, référentiels internes FOURNISSEUR liés à\n"
+                "   un périmètre forfait, politiques propres à un SI FOURNISSEUR déployé."
+            ),
+            "justification": (
+                "prestation en assistance technique, sans engagement de résultat, "
+                "livraison ni recette FOURNISSEUR."
+            ),
+            "lexicon": {
+                "forfait": 3, "jalon": 3, "recette": 2, "livraison": 1, "livrable": 1,
+                "engagement de resultat": 3, "gestion de projet": 2,
+            },
+        })
+
+    # --- Hébergement et infrastructure ---
+    hebergement = cadrage.get("hebergement_donnees", "")
+    if hebergement == "SI CLIENT":
+        rules.append({
+            "key": "hebergement_si_client",
+            "heading": "HÉBERGEMENT ET INFRASTRUCTURE (hebergement_donnees = \"SI CLIENT\")",
+            "body": (
+                "   CLIENT héberge et opère l'intégralité de l'infrastructure. FOURNISSEUR\n"
+                "   n'administre aucun serveur, aucun réseau d'infrastructure, aucun\n"
+                "   environnement d'hébergement.\n"
+                "   Questions hors périmètre : hébergement, serveurs, CMDB, inventaire des\n"
+                "   équipements, patchs système serveur, sauvegardes, logs d'infrastructure,\n"
+                "   cloisonnement réseau, firewalls, IDS/IPS/Anti-DDoS côté infrastructure,\n"
+                "   gestion des comptes administrateurs d'infrastructure, accès d'exploitation\n"
+                "   du service, environnements hors-prod côté hébergement, auditabilité du\n"
+                "   SI hébergé, tests d'intrusion sur le SI de FOURNISSEUR, échanges de fichiers\n"
+                "   via plateforme MFT de FOURNISSEUR, filtrage IP côté FOURNISSEUR."
+            ),
+            "justification": (
+                "l'infrastructure et l'hébergement sont opérés par CLIENT, "
+                "FOURNISSEUR n'administre aucun serveur ni réseau."
+            ),
+            "lexicon": {
+                "hebergement": 2, "heberge": 2, "serveur": 2, "datacenter": 3, "cmdb": 3,
+                "inventaire": 1, "patch": 2, "correctif": 1, "sauvegarde": 2, "backup": 2,
+                "restauration": 2, "log": 1, "journalisation": 1, "cloisonnement": 3,
+                "firewall": 3, "pare feu": 3, "ids": 3, "ips": 3, "ddos": 3, "mft": 3,
+                "filtrage ip": 3, "test intrusion": 2, "pentest": 2, "hors production": 2,
+                "infrastructure": 2, "exploitation": 1, "compte administrateur": 1,
+            },
+        })
+    elif hebergement == "Cloud":
+        rules.append({
+            "key": "hebergement_cloud",
+            "heading": "HÉBERGEMENT CLOUD (hebergement_donnees = \"Cloud\")",
+            "body": (
+                "   FOURNISSEUR héberge dans le cloud mais ne gère pas l'infrastructure\n"
+                "   physique. Les questions sur le datacenter physique (sécurité physique\n"
+                "   des salles serveurs, alimentation électrique, climatisation) sont hors\n"
+                "   périmètre FOURNISSEUR — elles relèvent du cloud provider.\n"
+                "   En revanche, la sécurité applicative, la configuration cloud, la gestion\n"
+                "   des accès et les politiques d'hébergement restent applicables."
+            ),
+            "justification": (
+                "l'infrastructure physique du datacenter relève du fournisseur cloud."
+            ),
+            "lexicon": {
+                "datacenter": 3, "salle serveur": 3, "climatisation": 3,
+                "alimentation electrique": 3, "onduleur": 3, "groupe electrogene": 3,
+                "incendie": 2,
+            },
+        })
+
+    # --- Postes de travail ---
+    if cadrage.get("poste_travail", "") == "CLIENT":
+        rules.append({
+            "key": "poste_client",
+            "heading": "POSTES DE TRAVAIL (poste_travail = \"CLIENT\")",
+            "body": (
+                "   Les postes de travail sont fournis et administrés par CLIENT.\n"
+                "   FOURNISSEUR n'est responsable d'aucune politique de sécurité poste.\n"
+                "   Questions hors périmètre : MDM, antivirus poste, chiffrement disque,\n"
+                "   politique de mots de passe poste, gestion des mises à jour poste,\n"
+                "   verrouillage automatique, protection des ordinateurs portables."
+            ),
+            "justification": "les postes de travail sont fournis et administrés par CLIENT.",
+            "lexicon": {
+                "poste de travail": 3, "poste": 1, "mdm": 3, "antivirus": 3, "edr": 2,
+                "chiffrement disque": 3, "disque dur": 2, "verrouillage automatique": 3,
+                "ordinateur portable": 3, "laptop": 3, "portable": 1, "usb": 2,
+            },
+        })
+
+    # --- Sous-traitance RGPD ---
+    if cadrage.get("sous_traitance_rgpd") == "Non":
+        rules.append({
+            "key": "sous_traitance_rgpd",
+            "heading": "SOUS-TRAITANCE RGPD (sous_traitance_rgpd = \"Non\")",
+            "body": (
+                "   FOURNISSEUR n'a pas de sous-traitants RGPD pour cette prestation.\n"
+                "   Questions hors périmètre : gestion contractuelle des sous-traitants,\n"
+                "   audits des sous-traitants, clauses RGPD sous-traitants."
+            ),
+            "justification": "FOURNISSEUR n'a pas recours à des sous-traitants RGPD pour cette prestation.",
+            "lexicon": {"sous traitant": 3, "sous traitance": 3, "ulterieur": 1},
+        })
+
+    # --- Développement logiciel ---
+    activites = cadrage.get("activites", "")
+    activites_list = activites if isinstance(activites, list) else [activites]
+    has_dev = any("développement" in str(a).lower() or "dev" in str(a).lower() for a in activites_list)
+    if not has_dev:
+        rules.append({
+            "key": "developpement",
+            "heading": "DÉVELOPPEMENT LOGICIEL (activites ne comprend pas de développement)",
+            "body": (
+                "   FOURNISSEUR ne réalise pas de développement logiciel dans le cadre\n"
+                "   de cette prestation.\n"
+                "   Questions hors périmètre : cycle de vie sécurisé du développement\n"
+                "   (SSDLC), revue de code, tests de sécurité applicatifs, gestion des\n"
+                "   dépendances logicielles, politique de développement sécurisé."
+            ),
+            "justification": "FOURNISSEUR ne réalise pas de développement logiciel dans le cadre de cette prestation.",
+            "lexicon": {
+                "developpement": 2, "ssdlc": 3, "sdlc": 3, "revue de code": 3, "code source": 3,
+                "owasp": 3, "sast": 3, "dast": 3, "dependance": 2, "devsecops": 3,
+                "securite applicative": 2,
+            },
+        })
+
+    # --- Locaux FOURNISSEUR ---
+    lieu_travail = cadrage.get("lieu_travail", [])
+    if isinstance(lieu_travail, str):
+        lieu_travail = [lieu_travail]
+    has_agence = any("agence" in str(l).lower() and "fournisseur" in str(l).lower() for l in lieu_travail)
+    if not has_agence:
+        rules.append({
+            "key": "locaux_fournisseur",
+            "heading": "LOCAUX FOURNISSEUR (lieu_travail ne comprend pas \"Agence FOURNISSEUR\")",
+            "body": (
+                "   FOURNISSEUR n'intervient pas depuis ses propres locaux pour cette prestation.\n"
+                "   Questions hors périmètre : sécurité physique des locaux FOURNISSEUR,\n"
+                "   badges d'accès aux locaux FOURNISSEUR, surveillance des locaux,\n"
+                "   destruction des supports en agence FOURNISSEUR."
+            ),
+            "justification": "FOURNISSEUR n'intervient pas depuis ses propres locaux pour cette prestation.",
+            "lexicon": {
+                "locaux": 2, "batiment": 2, "badge": 3, "videosurveillance": 3,
+                "securite physique": 3, "acces physique": 3, "gardiennage": 3,
+                "destruction des supports": 2, "agence": 1,
+            },
+        })
+
+    return rules
+
+
+def _compile(lexicon: dict[str, float]) -> list[tuple[tuple[str, ...], float]]:
+    """Tokenize lexicon entries like questions are (accents, stopwords, plurals)."""
+    compiled = []
+    for term, weight in lexicon.items():
+        tokens = tuple(tokenize(term))
+        if tokens:
+            compiled.append((tokens, weight))
+    return compiled
+
+
+def _score(tokens: list[str], compiled: list[tuple[tuple[str, ...], float]]) -> tuple[float, int]:
+    """Return (sum of weights, number) of the lexicon entries found in tokens (each counted once)."""
+    score = 0.0
+    hits = 0
+    for phrase, weight in compiled:
+        n = len(phrase)
+        if any(tuple(tokens[i:i + n]) == phrase for i in range(len(tokens) - n + 1)):
+            score += weight
+            hits += 1
+    return score, hits
+
+
+class ScopeClassifier:
+    """Match questions against the exclusion rules of one cadrage."""
+
+    def __init__(self, rules: list[dict], threshold: float = 4.0, min_hits: int = 2) -> None:
+        self._rules = [(rule, _compile(rule["lexicon"])) for rule in rules]
+        self._in_scope = _compile(_IN_SCOPE_TERMS)
+        self._threshold = threshold
+        self._min_hits = min_hits
+
+    def classify(self, question_text: str) -> dict | None:
+        """Return the exclusion rule a question clearly falls under, or None.
+
+        Args:
+            question_text: Questionnaire question.
+
+        Returns:
+            The best-scoring rule with at least min_hits lexicon entries and a
+            score at or above the threshold, or None if the question is in
+            scope or ambiguous.
+        """
+        tokens = tokenize(question_text)
+        penalty, _ = _score(tokens, self._in_scope)
+        best, best_score = None, 0.0
+        for rule, compiled in self._rules:
+            score, hits = _score(tokens, compiled)
+            score += penalty
+            if hits >= self._min_hits and score > best_score:
+                best, best_score = rule, score
+        if best is not None and best_score >= self._threshold:
+            return best
+        return None
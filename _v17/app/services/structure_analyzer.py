@@ -11,10 +11,10 @@ import os
 import string
 from pathlib import Path
 
-import anthropic
 from openpyxl import load_workbook
 
 from app.config import BASE_DIR
+from app.services import claude_client, metrics
 
 logger = logging.getLogger(__name__)
 
@@ -94,6 +94,7 @@ def _format_preview(sheets: dict[str, list[list[str]]]) -> str:
     return "\n".join(lines)
 
 
+@metrics.timed_operation("detect_xlsx_structure")
 def detect_xlsx_structure(xlsx_path: Path) -> dict:
     """Call Claude to detect the questionnaire structure in an anonymized xlsx.
 
@@ -107,9 +108,7 @@ def detect_xlsx_structure(xlsx_path: Path) -> dict:
     Raises:
         RuntimeError: If ANTHROPIC_API_KEY is not set or Claude returns invalid JSON.
     """
-    api_key = os.environ.get("ANTHROPIC_API_KEY", "")
-    if not api_key or api_key.startswith("sk-ant-..."):
-        raise RuntimeError("ANTHROPIC_API_KEY non configurée.")
+    client = claude_client.get_client()
 
     sheets = _extract_preview(xlsx_path)
     preview = _format_preview(sheets)
@@ -123,13 +122,13 @@ def detect_xlsx_structure(xlsx_path: Path) -> dict:
     user = _load_prompt("system_structure.txt").replace("{preview}", preview)
 
     model = os.environ.get("CLAUDE_MODEL", "claude-sonnet-4-6")
-    client = anthropic.Anthropic(api_key=api_key)
-    response = client.messages.create(
-        model=model,
-        max_tokens=512,
-        system=system,
-        messages=[{"role": "user", "content": user}],
-    )
+    with metrics.timed_claude_call("structure"):
+        response = client.messages.create(
+            model=model,
+            max_tokens=512,
+            system=system,
+            messages=[{"role": "user", "content": user}],
+        )
 
     raw = response.content[0].text.strip()
     # Strip markdown code block if present
@@ -0,0 +1,148 @@
+"""PAS Assistant — Per-generation timeline (timeline.json).
+
+Records how long each pipeline stage took and the token usage of every Claude
+call of a generation, in data/projects/<id>/timeline.json:
+
+    {
+      "project_id": str, "kind": "generation" | "regeneration",
+      "started_at": iso, "finished_at": iso | null, "status": str,
+      "resumed_at": [iso, ...],
+      "stages": [{"stage", "started_at", "ended_at", "duration_s", "status"}, ...],
+      "calls": [{"call", "started_at", "duration_s", "input_tokens", "output_tokens",
+                 "cache_creation_input_tokens", "cache_read_input_tokens"}, ...]
+    }
+
+The file is rewritten after every stage, so it can be read during a run. A
+generation resumed after a restart appends to the timeline of the interrupted run.
+"""
+
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator
+
+from app.config import BASE_DIR
+from app.services.job_queue import JobCancelledError
+
+logger = logging.getLogger(__name__)
+
+PROJECTS_DIR = BASE_DIR / "data" / "projects"
+
+
+def now_iso() -> str:
+    """Current UTC time, ISO 8601 with milliseconds."""
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+
+
+def _timeline_path(project_id: str) -> Path:
+    return PROJECTS_DIR / project_id / "timeline.json"
+
+
+def load_timeline(project_id: str) -> dict | None:
+    """Return the timeline of the last generation of a project, or None."""
+    path = _timeline_path(project_id)
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _write_timeline(project_id: str, data: dict) -> None:
+    """Write timeline.json (write-then-rename, readable while the run goes on)."""
+    path = _timeline_path(project_id)
+    tmp_path = path.with_suffix(".json.tmp")
+    try:
+        tmp_path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp_path.replace(path)
+    except OSError as exc:
+        # Diagnostics only: never fail a generation because of the timeline
+        logger.warning("Could not write timeline for project %s: %s", project_id, exc)
+
+
+def close_timeline(project_id: str, status: str) -> None:
+    """Close the timeline of a run that ended outside a stage (error, cancellation).
+
+    Args:
+        project_id: UUID of the project.
+        status: Final status ("error", "cancelled").
+    """
+    data = load_timeline(project_id)
+    if data is None or data.get("status") != "running":
+        return
+    data.update(finished_at=now_iso(), status=status)
+    _write_timeline(project_id, data)
+
+
+class Timeline:
+    """Stage timings and Claude calls of one generation run."""
+
+    def __init__(self, project_id: str, kind: str, resume: bool = False) -> None:
+        """Start a timeline (or continue the saved one when resuming).
+
+        Args:
+            project_id: UUID of the project.
+            kind: "generation" or "regeneration".
+            resume: Append to the saved timeline instead of starting a new one.
+        """
+        self._project_id = project_id
+        # Usage log of the run (one dict per Claude call), filled by the pipeline
+        self.calls: list[dict] = []
+        self._lock = threading.Lock()
+        saved = load_timeline(project_id) if resume else None
+        if saved is not None:
+            self._data = saved
+            self._data.setdefault("resumed_at", []).append(now_iso())
+            self._data.update(finished_at=None, status="running")
+            # Calls of the interrupted run come first
+            self.calls.extend(saved.get("calls", []))
+        else:
+            self._data = {
+                "project_id": project_id,
+                "kind": kind,
+                "started_at": now_iso(),
+                "finished_at": None,
+                "status": "running",
+                "resumed_at": [],
+                "stages": [],
+            }
+        self.save()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time a pipeline stage; failures and cancellations are recorded too."""
+        entry = {"stage": name, "started_at": now_iso(), "ended_at": None, "duration_s": None, "status": "running"}
+        with self._lock:
+            self._data["stages"].append(entry)
+        start = time.monotonic()
+        status = "ok"
+        try:
+            yield
+        except BaseException as exc:
+            status = "cancelled" if isinstance(exc, JobCancelledError) else "error"
+            raise
+        finally:
+            with self._lock:
+                entry.update(
+                    ended_at=now_iso(),
+                    duration_s=round(time.monotonic() - start, 3),
+                    status=status,
+                )
+                if status != "ok":
+                    self._data.update(finished_at=entry["ended_at"], status=status)
+            self.save()
+
+    def finish(self, status: str = "completed") -> None:
+        """Close the timeline with its final status."""
+        with self._lock:
+            self._data.update(finished_at=now_iso(), status=status)
+        self.save()
+
+    def save(self) -> None:
+        """Write the current state to timeline.json."""
+        with self._lock:
+            data = {**self._data, "calls": list(self.calls)}
+        _write_timeline(self._project_id, data)
@@ -0,0 +1,155 @@
+"""PAS Assistant — Rewrite of OOXML zip packages (xlsx, docx).
+
+zipfile can only copy an entry by decompressing it (read) and compressing it
+again (writestr). ZipRewriter also copies an entry as-is: its compressed bytes
+are moved from the source to the destination with a new local header, without
+going through zlib. Anonymization changes a few XML parts and copies the rest
+(styles, themes, images, embedded objects), so most of the package is copied raw
+and only the changed parts are recompressed.
+
+Usage:
+    with ZipRewriter(source_path, dest_path) as rw:
+        for info in rw.infolist():
+            if info.filename == "docProps/app.xml":
+                rw.write(info, CLEAN_APP_XML)
+            else:
+                rw.copy(info)
+
+The destination is written to a temporary file and moved into place when the
+block exits without error (dest_path may be source_path).
+"""
+
+import shutil
+import struct
+import zipfile
+from pathlib import Path
+
+# Local file header: signature, versions, flags, method, time, date, crc, sizes, name/extra lengths
+_LOCAL_HEADER = struct.Struct("<4s5HL2L2H")
+_LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+_COPY_CHUNK = 1024 * 1024
+
+_FLAG_ENCRYPTED = 0x01
+_FLAG_DATA_DESCRIPTOR = 0x08
+
+
+class ZipRewriter:
+    """Copy a zip package entry by entry, replacing some entries."""
+
+    def __init__(self, source_path: Path, dest_path: Path, compression: int = zipfile.ZIP_DEFLATED) -> None:
+        """Prepare the rewrite (files are opened by the with statement).
+
+        Args:
+            source_path: Package to read.
+            dest_path: Package to write (may be source_path).
+            compression: Compression of the entries written with write().
+        """
+        self._source_path = Path(source_path)
+        self._dest_path = Path(dest_path)
+        self._tmp_path = self._dest_path.with_suffix(".tmp" + self._dest_path.suffix)
+        self._compression = compression
+        self._zin: zipfile.ZipFile | None = None
+        self._zout: zipfile.ZipFile | None = None
+        self._raw = None
+
+    def __enter__(self) -> "ZipRewriter":
+        try:
+            self._zin = zipfile.ZipFile(self._source_path, "r")
+            self._raw = open(self._source_path, "rb")
+            self._zout = zipfile.ZipFile(self._tmp_path, "w", self._compression)
+        except Exception:
+            self._close()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._close()
+        if exc_type is None:
+            shutil.move(str(self._tmp_path), str(self._dest_path))
+        else:
+            self._tmp_path.unlink(missing_ok=True)
+
+    def _close(self) -> None:
+        for handle in (self._zout, self._zin, self._raw):
+            if handle is not None:
+                handle.close()
+
+    def infolist(self) -> list[zipfile.ZipInfo]:
+        """Entries of the source package, in their original order."""
+        return self._zin.infolist()
+
+    def read(self, name: str) -> bytes:
+        """Return the decompressed content of a source entry."""
+        return self._zin.read(name)
+
+    def open(self, name: str):
+        """Return a binary stream of the decompressed content of a source entry."""
+        return self._zin.open(name)
+
+    def open_write(self, info: zipfile.ZipInfo):
+        """Return a binary stream writing an entry with new content, chunk by chunk.
+
+        Args:
+            info: Source entry (name, date and attributes are kept).
+        """
+        # The new content may outgrow the original: zip64 sizes if it comes close
+        return self._zout.open(self._new_info(info), "w", force_zip64=info.file_size * 2 > zipfile.ZIP64_LIMIT)
+
+    def write(self, info: zipfile.ZipInfo, data: bytes | str) -> None:
+        """Write an entry with new content (compressed with the rewriter's compression).
+
+        Args:
+            info: Source entry (name, date and attributes are kept).
+            data: New content.
+        """
+        self._zout.writestr(self._new_info(info), data)
+
+    def copy(self, info: zipfile.ZipInfo) -> None:
+        """Copy a source entry unchanged, without decompressing it.
+
+        Args:
+            info: Source entry.
+        """
+        if info.flag_bits & _FLAG_ENCRYPTED:
+            # Never the case in OOXML packages; keep zipfile's own path anyway
+            self._zout.writestr(info, self._zin.read(info.filename))
+            return
+
+        self._raw.seek(info.header_offset)
+        fields = _LOCAL_HEADER.unpack(self._raw.read(_LOCAL_HEADER.size))
+        if fields[0] != _LOCAL_HEADER_SIGNATURE:
+            raise zipfile.BadZipFile(f"Bad local header for {info.filename}")
+        name_len, extra_len = fields[-2:]
+        self._raw.seek(info.header_offset + _LOCAL_HEADER.size + name_len + extra_len)
+
+        out = self._new_info(info, info.compress_type)
+        out.CRC = info.CRC
+        out.compress_size = info.compress_size
+        out.file_size = info.file_size
+        # Sizes and CRC go in the local header: no data descriptor after the data
+        out.flag_bits = info.flag_bits & ~_FLAG_DATA_DESCRIPTOR
+        zout = self._zout
+        fp = zout.fp
+        out.header_offset = fp.tell()
+        fp.write(out.FileHeader())
+        remaining = info.compress_size
+        while remaining:
+            chunk = self._raw.read(min(_COPY_CHUNK, remaining))
+            if not chunk:
+                raise zipfile.BadZipFile(f"Truncated data for {info.filename}")
+            fp.write(chunk)
+            remaining -= len(chunk)
+        # Register the entry for the central directory written by close() (private
+        # ZipFile state, covered by bench/zip_rewrite_check.py)
+        zout.filelist.append(out)
+        zout.NameToInfo[out.filename] = out
+        zout.start_dir = fp.tell()
+        zout._didModify = True
+
+    def _new_info(self, info: zipfile.ZipInfo, compress_type: int | None = None) -> zipfile.ZipInfo:
+        out = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+        out.compress_type = self._compression if compress_type is None else compress_type
+        out.external_attr = info.external_attr
+        out.create_system = info.create_system
+        out.comment = info.comment
+        return out
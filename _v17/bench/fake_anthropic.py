@@ -0,0 +1,312 @@
+"""PAS Assistant — Local stub of the Anthropic API, for tests and benchmarks.
+
+Implements the endpoints used by the generation pipeline, without network
+access or API cost:
+
+    POST /v1/files                          Files API upload (POLITIQUES.md)
+    POST /v1/messages                       Messages API (plain and streamed)
+    POST /v1/messages/batches               Message Batches: create
+    GET  /v1/messages/batches/{id}          Message Batches: retrieve
+    POST /v1/messages/batches/{id}/cancel   Message Batches: cancel
+    GET  /v1/messages/batches/{id}/results  Message Batches: results (.jsonl)
+
+Answers are fabricated from the prompt: one {"question_id", "response"} object
+per "ID:" line of the questionnaire section, or a single attention point for the
+attention call. A batch is reported as ended --batch-delay seconds after its
+creation.
+
+Usage (from _vXX/):
+    python bench/fake_anthropic.py --port 8765
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8765 ANTHROPIC_API_KEY=sk-stub \\
+        PAS_BASE_DIR=. uvicorn app.main:app
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_QUESTIONNAIRE_MARKER = "=== QUESTIONNAIRE À REMPLIR ==="
+_ID_RE = re.compile(r"^ID: (.+)$", re.MULTILINE)
+
+_batches: dict[str, dict] = {}
+_batches_lock = threading.Lock()
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _iso(dt: datetime | None) -> str | None:
+    return dt.isoformat().replace("+00:00", "Z") if dt else None
+
+
+def _user_text(params: dict) -> str:
+    """Concatenate the text blocks of the last user message."""
+    content = params["messages"][-1]["content"]
+    if isinstance(content, str):
+        return content
+    return "\n".join(b.get("text", "") for b in content if b.get("type") == "text")
+
+
+def _answer_text(params: dict, answer_words: int) -> str:
+    """Fabricate the JSON answer Claude would give to a pipeline prompt."""
+    text = _user_text(params)
+    if _QUESTIONNAIRE_MARKER in text:
+        section = text.split(_QUESTIONNAIRE_MARKER, 1)[1]
+        filler = " ".join(["conforme"] * max(1, answer_words - 4))
+        responses = [
+            {"question_id": qid.strip(), "response": f"Réponse simulée : {filler}.", "status": None}
+            for qid in _ID_RE.findall(section)
+        ]
+        return json.dumps({"responses": responses}, ensure_ascii=False)
+    return json.dumps(
+        {
+            "attention_points": [
+                {
+                    "category": "Simulation",
+                    "title": "Point d'attention simulé",
+                    "description": "Généré par le serveur factice.",
+                    "recommendation": "Aucune.",
+                }
+            ]
+        },
+        ensure_ascii=False,
+    )
+
+
+def _message(params: dict, answer_words: int) -> dict:
+    """Build a complete Message object, truncated at max_tokens like the real API."""
+    text = _answer_text(params, answer_words)
+    max_chars = int(params.get("max_tokens", 4096)) * 4
+    stop_reason = "end_turn"
+    if len(text) > max_chars:
+        text, stop_reason = text[:max_chars], "max_tokens"
+    input_chars = len(json.dumps(params.get("system", ""))) + len(_user_text(params))
+    return {
+        "id": f"msg_stub_{uuid.uuid4().hex[:24]}",
+        "type": "message",
+        "role": "assistant",
+        "model": params.get("model", "stub"),
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": stop_reason,
+        "stop_sequence": None,
+        "usage": {
+            "input_tokens": input_chars // 4,
+            "output_tokens": len(text) // 4,
+            "cache_creation_input_tokens": 0,
+            "cache_read_input_tokens": 0,
+        },
+    }
+
+
+def _batch_object(batch: dict, base_url: str) -> dict:
+    ended = _now() >= batch["ends_at"]
+    canceled = batch.get("canceled", False)
+    n = len(batch["requests"])
+    return {
+        "id": batch["id"],
+        "type": "message_batch",
+        "processing_status": "ended" if ended else "in_progress",
+        "request_counts": {
+            "processing": 0 if ended else n,
+            "succeeded": n if ended and not canceled else 0,
+            "errored": 0,
+            "canceled": n if canceled else 0,
+            "expired": 0,
+        },
+        "created_at": _iso(batch["created_at"]),
+        "expires_at": _iso(batch["created_at"] + timedelta(hours=24)),
+        "ended_at": _iso(batch["ends_at"]) if ended else None,
+        "archived_at": None,
+        "cancel_initiated_at": None,
+        "results_url": f"{base_url}/v1/messages/batches/{batch['id']}/results" if ended else None,
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "FakeAnthropic/1.0"
+
+    def log_message(self, fmt, *args):  # quiet by default
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    @property
+    def _base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send_json(self, obj: dict, status: int = 200) -> None:
+        body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _not_found(self) -> None:
+        self._send_json(
+            {"type": "error", "error": {"type": "not_found_error", "message": self.path}}, 404
+        )
+
+    def do_POST(self) -> None:
+        path = self.path.split("?", 1)[0]
+        body = self._read_body()
+        if path == "/v1/files":
+            self._send_json({
+                "id": f"file_stub_{uuid.uuid4().hex[:24]}",
+                "type": "file",
+                "filename": "politiques.md",
+                "mime_type": "text/plain",
+                "size_bytes": len(body),
+                "created_at": _iso(_now()),
+                "downloadable": False,
+            })
+        elif path == "/v1/messages":
+            params = json.loads(body)
+            time.sleep(self.server.latency)
+            message = _message(params, self.server.answer_words)
+            if params.get("stream"):
+                self._stream(message)
+            else:
+                self._send_json(message)
+        elif m := re.fullmatch(r"/v1/messages/batches/([^/]+)/cancel", path):
+            with _batches_lock:
+                batch = _batches.get(m.group(1))
+                if batch is not None:
+                    batch["canceled"] = True
+                    batch["ends_at"] = min(batch["ends_at"], _now())
+            if batch is None:
+                self._not_found()
+            else:
+                self._send_json(_batch_object(batch, self._base_url))
+        elif path == "/v1/messages/batches":
+            params = json.loads(body)
+            created = _now()
+            batch = {
+                "id": f"msgbatch_stub_{uuid.uuid4().hex[:24]}",
+                "requests": params["requests"],
+                "created_at": created,
+                "ends_at": created + timedelta(seconds=self.server.batch_delay),
+            }
+            with _batches_lock:
+                _batches[batch["id"]] = batch
+            self._send_json(_batch_object(batch, self._base_url))
+        else:
+            self._not_found()
+
+    def do_GET(self) -> None:
+        path = self.path.split("?", 1)[0]
+        m = re.fullmatch(r"/v1/messages/batches/([^/]+)(/results)?", path)
+        if not m:
+            self._not_found()
+            return
+        with _batches_lock:
+            batch = _batches.get(m.group(1))
+        if batch is None:
+            self._not_found()
+            return
+        if not m.group(2):
+            self._send_json(_batch_object(batch, self._base_url))
+            return
+
+        lines = [
+            json.dumps({
+                "custom_id": req["custom_id"],
+                "result": (
+                    {"type": "canceled"} if batch.get("canceled")
+                    else {"type": "succeeded", "message": _message(req["params"], self.server.answer_words)}
+                ),
+            }, ensure_ascii=False)
+            for req in batch["requests"]
+        ]
+        body = ("\n".join(lines) + "\n").encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/binary")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, message: dict) -> None:
+        """Send message as Server-Sent Events, in small text deltas."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        def event(name: str, data: dict) -> None:
+            self.wfile.write(f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8"))
+
+        text = message["content"][0]["text"]
+        start = {**message, "content": [], "stop_reason": None,
+                 "usage": {**message["usage"], "output_tokens": 0}}
+        event("message_start", {"type": "message_start", "message": start})
+        event("content_block_start", {"type": "content_block_start", "index": 0,
+                                      "content_block": {"type": "text", "text": ""}})
+        for i in range(0, len(text), 64):
+            event("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                          "delta": {"type": "text_delta", "text": text[i:i + 64]}})
+            self.wfile.flush()
+        event("content_block_stop", {"type": "content_block_stop", "index": 0})
+        event("message_delta", {"type": "message_delta",
+                                "delta": {"stop_reason": message["stop_reason"], "stop_sequence": None},
+                                "usage": {"output_tokens": message["usage"]["output_tokens"]}})
+        event("message_stop", {"type": "message_stop"})
+        self.wfile.flush()
+
+
+def serve(
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    latency: float = 0.0,
+    batch_delay: float = 2.0,
+    answer_words: int = 30,
+    verbose: bool = False,
+) -> ThreadingHTTPServer:
+    """Create the stub server (call serve_forever() on the result).
+
+    Args:
+        host: Interface to bind.
+        port: TCP port (0 for any free port).
+        latency: Seconds to wait before answering a Messages API call.
+        batch_delay: Seconds before a Message Batch is reported as ended.
+        answer_words: Approximate length of each fabricated answer.
+        verbose: Log every request.
+    """
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.batch_delay = batch_delay
+    server.answer_words = answer_words
+    server.verbose = verbose
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local stub of the Anthropic API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per Messages call")
+    parser.add_argument("--batch-delay", type=float, default=2.0, help="seconds before a batch ends")
+    parser.add_argument("--answer-words", type=int, default=30)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, args.latency, args.batch_delay, args.answer_words, args.verbose)
+    print(f"Fake Anthropic API listening on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""PAS Assistant — End-to-end pipeline benchmark against the local API stub.
+
+Runs the whole wizard path through the HTTP API, for synthetic questionnaires
+of several sizes:
+
+    upload → anonymize → structure → cadrage → corpus selection → generate → download
+
+Questionnaires and the corpus entry come from bench/synthetic.py (merged
+section rows, status list validations, shadowed defined names). The Anthropic
+API is replaced by bench/fake_anthropic.py (configurable latency
+and answer length), so a run costs nothing and only measures the application.
+Each size runs in a fresh subprocess with its own temporary PAS_BASE_DIR, so that
+peak memory figures are not polluted by the previous size.
+
+Reported as JSON, per size: total wall time, peak RSS, duration and peak RSS of
+each wizard step (corpus_setup covers the upload and preparation of the corpus
+entry) and the stages of the generation read from timeline.json.
+
+Usage (from _vXX/):
+    python bench/pipeline_bench.py                          # 50, 500 and 5 000 questions
+    python bench/pipeline_bench.py --sizes 50 500 --latency 0.5 --output baseline.json
+    python bench/pipeline_bench.py --mode batch --batch-delay 5
+    python bench/pipeline_bench.py --sizes 500 --cassettes /tmp/cassettes --cassette-mode record
+    python bench/pipeline_bench.py --sizes 500 --cassettes /tmp/cassettes --cassette-mode replay --replay-latency zero
+"""
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import yaml
+
+_BENCH_DIR = Path(__file__).resolve().parent
+_APP_DIR = _BENCH_DIR.parent
+
+_CADRAGE = {
+    "pas_niveau_entreprise": "Non",
+    "type_prestation_base": "Dispositif à engagement",
+    "type_prestation_detail": "CDS",
+    "hebergement_donnees": "FOURNISSEUR",
+    "poste_travail": "FOURNISSEUR",
+    "activites": ["Développement"],
+    "lieu_travail": ["Agence FOURNISSEUR"],
+    "sous_traitance_rgpd": "Oui",
+}
+_POLICIES = "# Politiques de sécurité\n\nExigences applicables à toutes les prestations.\n".encode("utf-8")
+_XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+
+def _reset_peak_rss() -> None:
+    """Reset the peak RSS of the process (Linux only, best-effort)."""
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_bytes() -> int:
+    """Peak RSS since the last reset (VmHWM), else since the process started."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class _Steps:
+    """Wall time and peak RSS of each wizard step."""
+
+    def __init__(self) -> None:
+        self.steps: list[dict] = []
+        self.peak_rss = 0
+
+    def run(self, name: str, fn, *args, **kwargs):
+        _reset_peak_rss()
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        peak = _peak_rss_bytes()
+        self.peak_rss = max(self.peak_rss, peak)
+        self.steps.append({"step": name, "duration_s": round(time.perf_counter() - start, 3), "peak_rss_bytes": peak})
+        return result
+
+
+def _check(response, step: str):
+    if response.status_code >= 400:
+        raise RuntimeError(f"{step}: HTTP {response.status_code} {response.text[:300]}")
+    return response
+
+
+# ---------------------------------------------------------------------------
+# One size (child process)
+# ---------------------------------------------------------------------------
+
+
+def _prepare_base_dir(base_dir: Path, args: argparse.Namespace) -> None:
+    """Copy data/config into base_dir, with the rate limit and transport of the run."""
+    config_dir = base_dir / "data" / "config"
+    shutil.copytree(_APP_DIR / "data" / "config", config_dir)
+    app_yaml = config_dir / "app.yaml"
+    config = yaml.safe_load(app_yaml.read_text(encoding="utf-8")) or {}
+    claude = config.setdefault("claude", {})
+    claude.setdefault("rate_limit", {})["requests_per_minute"] = args.requests_per_minute
+    if args.cassette_mode:
+        claude["transport"] = {
+            "mode": args.cassette_mode,
+            # One subdirectory per size: the questionnaire differs
+            "cassette_dir": str(args.cassettes / f"{args.single}q-{args.mode}"),
+            "replay_latency": args.replay_latency,
+        }
+    app_yaml.write_text(yaml.safe_dump(config, allow_unicode=True, sort_keys=False), encoding="utf-8")
+
+
+def _run_single(args: argparse.Namespace) -> dict:
+    """Run the wizard once (args.single questions) in this process and return its measurements.
+
+    Expects ANTHROPIC_BASE_URL to point at a running stub, unless cassettes are replayed.
+    """
+    questions, corpus_questions, mode, timeout = args.single, args.corpus_questions, args.mode, args.timeout
+    base_dir = Path(tempfile.mkdtemp(prefix="pas-bench-"))
+    try:
+        _prepare_base_dir(base_dir, args)
+        os.environ.update(PAS_BASE_DIR=str(base_dir), DEV_AUTH_BYPASS="true", SESSION_HTTPS_ONLY="false")
+        os.environ.setdefault("ANTHROPIC_API_KEY", "sk-bench")
+        sys.path[:0] = [str(_APP_DIR), str(_BENCH_DIR)]
+
+        from fastapi.testclient import TestClient
+
+        import synthetic
+        from app.main import app
+
+        inputs_dir = base_dir / "bench-inputs"
+        info = synthetic.build_questionnaire(inputs_dir / "questionnaire.xlsx", questions)
+        structure = info["sheets"][0]["structure"]
+        synthetic.build_questionnaire(inputs_dir / "corpus.xlsx", corpus_questions, answered=True, seed=1)
+        questionnaire = (inputs_dir / "questionnaire.xlsx").read_bytes()
+        corpus_file = (inputs_dir / "corpus.xlsx").read_bytes()
+        keywords = {"keywords": [{"original": synthetic.CLIENT, "replacement": synthetic.CLIENT_ALIAS}]}
+        steps = _Steps()
+        started = time.perf_counter()
+
+        with TestClient(app) as client:
+            _check(client.post("/api/policies", files={"file": ("POLITIQUES.md", _POLICIES)}), "policies")
+
+            def corpus_setup() -> str:
+                cid = _check(client.post(
+                    "/api/corpus", files={"file": ("corpus.xlsx", corpus_file, _XLSX_MIME)},
+                ), "corpus upload").json()["corpus_id"]
+                _check(client.post(f"/api/corpus/{cid}/anonymize", json=keywords), "corpus anonymize")
+                _check(client.post(f"/api/corpus/{cid}/structure", json=structure), "corpus structure")
+                _check(client.post(f"/api/corpus/{cid}/metadata", json={"answers": _CADRAGE}), "corpus metadata")
+                return cid
+
+            corpus_id = steps.run("corpus_setup", corpus_setup)
+            project_id = steps.run("upload", lambda: _check(client.post(
+                "/api/projects", files={"file": ("questionnaire.xlsx", questionnaire, _XLSX_MIME)},
+            ), "upload").json()["project_id"])
+            api = f"/api/projects/{project_id}"
+            steps.run("anonymize", lambda: _check(client.post(f"{api}/anonymize", json=keywords), "anonymize"))
+            steps.run("structure", lambda: _check(client.post(f"{api}/structure", json=structure), "structure"))
+            steps.run("cadrage", lambda: _check(client.post(f"{api}/cadrage", json={"answers": _CADRAGE}), "cadrage"))
+
+            def corpus_selection() -> None:
+                _check(client.get(f"{api}/corpus-selection"), "corpus scoring")
+                _check(client.post(
+                    f"{api}/corpus-selection", json={"selected_corpus_ids": [corpus_id]},
+                ), "corpus selection")
+
+            steps.run("corpus_selection", corpus_selection)
+
+            def generate() -> dict:
+                _check(client.post(f"{api}/generate", json={"mode": mode}), "generate")
+                deadline = time.monotonic() + timeout
+                while time.monotonic() < deadline:
+                    status = _check(client.get(f"{api}/status"), "status").json()
+                    if status["status"] in ("completed", "error", "cancelled"):
+                        return status
+                    time.sleep(0.2)
+                raise RuntimeError(f"generate: not finished after {timeout:.0f}s")
+
+            status = steps.run("generate", generate)
+            if status["status"] != "completed":
+                raise RuntimeError(f"generate: {status['status']} — {status.get('error_message')}")
+            output = steps.run("download", lambda: _check(client.get(f"{api}/output"), "download").content)
+            timeline = _check(client.get(f"{api}/timeline"), "timeline").json()
+
+        return {
+            "questions": questions,
+            "corpus_questions": corpus_questions,
+            "mode": mode,
+            "wall_s": round(time.perf_counter() - started, 3),
+            "peak_rss_bytes": steps.peak_rss,
+            "output_bytes": len(output),
+            "steps": steps.steps,
+            "generation_stages": [
+                {"stage": s["stage"], "duration_s": s["duration_s"], "status": s["status"]}
+                for s in timeline.get("stages", [])
+            ],
+            "claude_calls": len(timeline.get("calls", [])),
+        }
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="End-to-end benchmark of the PAS pipeline.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000], help="questions per run")
+    parser.add_argument("--corpus-questions", type=int, default=200, help="answered questions in the corpus entry")
+    parser.add_argument("--mode", choices=("interactive", "batch"), default="interactive")
+    parser.add_argument("--latency", type=float, default=0.0, help="stub seconds per Messages call")
+    parser.add_argument("--batch-delay", type=float, default=1.0, help="stub seconds before a batch ends")
+    parser.add_argument("--answer-words", type=int, default=30, help="stub words per answer")
+    parser.add_argument(
+        "--requests-per-minute", type=float, default=0,
+        help="client rate limit during the run (0 = unlimited, the stub sends no rate limit headers)",
+    )
+    parser.add_argument("--cassettes", type=Path, help="cassette directory (see app/services/llm_transport.py)")
+    parser.add_argument(
+        "--cassette-mode", choices=("record", "replay"),
+        help="record the API exchanges into --cassettes, or replay them without the stub",
+    )
+    parser.add_argument("--replay-latency", choices=("original", "zero"), default="original")
+    parser.add_argument("--timeout", type=float, default=1800, help="seconds allowed per generation")
+    parser.add_argument("--output", type=Path, help="write the JSON report here instead of stdout")
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)  # child process: one size
+    args = parser.parse_args()
+    if args.cassette_mode and not args.cassettes:
+        parser.error("--cassette-mode requires --cassettes")
+
+    if args.single is not None:
+        print(json.dumps(_run_single(args)))
+        return
+
+    server = None
+    if args.cassette_mode == "replay":
+        # Offline: nothing listens on the discard port
+        base_url = "http://127.0.0.1:9"
+    else:
+        sys.path.insert(0, str(_BENCH_DIR))
+        import fake_anthropic
+
+        server = fake_anthropic.serve(
+            port=0, latency=args.latency, batch_delay=args.batch_delay, answer_words=args.answer_words,
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    env = {**os.environ, "ANTHROPIC_BASE_URL": base_url, "ANTHROPIC_API_KEY": "sk-bench"}
+    child_args = list(sys.argv[1:])
+    if args.cassettes:
+        # The child runs from _APP_DIR
+        child_args += ["--cassettes", str(args.cassettes.resolve())]
+
+    runs = []
+    for size in args.sizes:
+        print(f"Running {size} questions...", file=sys.stderr)
+        proc = subprocess.run(
+            [sys.executable, __file__, *child_args, "--single", str(size)],
+            env=env, cwd=_APP_DIR, stdout=subprocess.PIPE, text=True,
+        )
+        if proc.returncode != 0:
+            runs.append({"questions": size, "error": f"exit status {proc.returncode}"})
+            continue
+        run = json.loads(proc.stdout.strip().splitlines()[-1])
+        print(f"  {run['wall_s']:.1f}s, peak RSS {run['peak_rss_bytes'] / 2**20:.0f} MiB", file=sys.stderr)
+        runs.append(run)
+    if server is not None:
+        server.shutdown()
+
+    report = {
+        "config": {
+            "mode": args.mode,
+            "corpus_questions": args.corpus_questions,
+            "latency": args.latency,
+            "batch_delay": args.batch_delay,
+            "answer_words": args.answer_words,
+            "requests_per_minute": args.requests_per_minute,
+            "cassette_mode": args.cassette_mode or "live",
+            "replay_latency": args.replay_latency if args.cassette_mode == "replay" else None,
+            "python": sys.version.split()[0],
+        },
+        "runs": runs,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""PAS Assistant — Synthetic questionnaires and corpus entries.
+
+Real PAS files are confidential; this module fabricates workbooks with the
+same traps, for benchmarks and stress tests of the parser, writer and
+anonymizer:
+
+- several questionnaire sheets, each with a merged title row, a header row and
+  numbered sections whose header rows are merged across the response column
+  (skipped by parser_xlsx._merged_header_rows);
+- a status column restricted by a list data validation, as an inline list, a
+  range of the "Listes" sheet or a sheet-local named range — one kind per sheet,
+  in turn (the three cases of parser_xlsx.read_status_choices);
+- the named range shadowed by a workbook-level #REF! entry of the same name,
+  plus a broken external name and print areas (anonymizer.safe_local_defined_names);
+- the client name in questions, answers, sheet titles and document properties.
+
+Output is deterministic for a given seed.
+
+Usage (from _vXX/):
+    python bench/synthetic.py questionnaire /tmp/pas.xlsx --questions 5000 --sheets 4
+    python bench/synthetic.py corpus /tmp/corpus --entries 20 --questions 300
+"""
+
+import argparse
+import json
+import random
+import uuid
+from pathlib import Path
+
+from openpyxl import Workbook
+from openpyxl.styles import Alignment, Font
+from openpyxl.workbook.defined_name import DefinedName
+from openpyxl.worksheet.datavalidation import DataValidation
+
+CLIENT = "ACME Industries"
+CLIENT_ALIAS = "CLIENT"
+STATUS_CHOICES = ["Conforme", "Partiellement conforme", "Non conforme", "Non applicable"]
+VALIDATION_KINDS = ("inline", "range", "named")
+
+_LISTS_SHEET = "Listes"
+_NAMED_RANGE = "Cotation"
+_HEADER_ROW = 3
+_COLUMNS = ("A", "B", "C", "D")  # ID, question, response, status
+
+_SECTIONS = (
+    ("Organisation de la sécurité", ("le RSSI", "la politique de sécurité", "le comité sécurité")),
+    ("Gestion des accès", ("les comptes à privilèges", "l'authentification forte", "la revue des habilitations")),
+    ("Protection des données", ("le chiffrement au repos", "le chiffrement en transit", "la purge des données")),
+    ("Exploitation", ("la gestion des correctifs", "la sauvegarde", "la supervision")),
+    ("Gestion des incidents", ("la détection des incidents", "la notification des violations", "les exercices de crise")),
+    ("Continuité d'activité", ("le plan de continuité", "le plan de reprise", "les tests de bascule")),
+    ("Ressources humaines", ("la sensibilisation", "les clauses de confidentialité", "le départ des collaborateurs")),
+    ("Postes de travail", ("l'antivirus", "le durcissement des postes", "le chiffrement des disques")),
+)
+_QUESTION_TEMPLATES = (
+    "Décrivez comment le titulaire assure {topic} pour le compte de {client}.",
+    "Le titulaire dispose-t-il d'une procédure formalisée couvrant {topic} ?",
+    "Précisez la fréquence de revue de {topic} et les livrables remis à {client}.",
+    "Quelles mesures techniques et organisationnelles encadrent {topic} sur le périmètre de la prestation ?",
+    "{client} exige que {topic} soit auditable. Indiquez les preuves que le titulaire peut fournir, "
+    "les outils utilisés et les responsables désignés.",
+)
+_ANSWER_TEMPLATES = (
+    "Oui. {topic} fait l'objet d'une procédure revue annuellement et partagée avec {client}.",
+    "Le titulaire s'appuie sur sa politique de sécurité groupe ; {topic} est contrôlé par le RSSI.",
+    "Partiellement : {topic} est couvert pour les environnements de production uniquement.",
+    "Non applicable sur ce périmètre, {topic} relevant du SI de {client}.",
+)
+
+
+def _sheet_names(sheets: int) -> list[str]:
+    return [f"Domaine {i}" for i in range(1, sheets + 1)]
+
+
+def _split(total: int, parts: int) -> list[int]:
+    """Split total into parts near-equal integers."""
+    return [total // parts + (1 if i < total % parts else 0) for i in range(parts)]
+
+
+def _fill_sheet(
+    ws,
+    questions: int,
+    sheet_no: int,
+    rng: random.Random,
+    client: str,
+    answered: bool,
+    section_size: int,
+) -> dict:
+    """Write the title, header, sections and questions of one questionnaire sheet."""
+    ws["A1"] = f"Plan d'Assurance Sécurité — {client} — {ws.title}"
+    ws["A1"].font = Font(bold=True, size=14)
+    ws.merge_cells("A1:D1")
+    for col, label in zip(_COLUMNS, ("ID", "Exigence", "Réponse du titulaire", "Conformité")):
+        ws[f"{col}{_HEADER_ROW}"] = label
+        ws[f"{col}{_HEADER_ROW}"].font = Font(bold=True)
+    ws.column_dimensions["B"].width = 80
+    ws.column_dimensions["C"].width = 80
+    ws.column_dimensions["D"].width = 24
+
+    row = _HEADER_ROW + 1
+    section_rows: list[int] = []
+    written = 0
+    section_no = 0
+    while written < questions:
+        section_no += 1
+        title, topics = _SECTIONS[(sheet_no + section_no) % len(_SECTIONS)]
+        ws[f"A{row}"] = f"{section_no}. {title}"
+        ws[f"A{row}"].font = Font(bold=True)
+        # Section label merged across the response column
+        ws.merge_cells(f"A{row}:D{row}")
+        section_rows.append(row)
+        row += 1
+        for q_no in range(1, min(section_size, questions - written) + 1):
+            topic = rng.choice(topics)
+            ws[f"A{row}"] = f"{sheet_no}.{section_no}.{q_no}"
+            ws[f"B{row}"] = rng.choice(_QUESTION_TEMPLATES).format(topic=topic, client=client)
+            ws[f"B{row}"].alignment = Alignment(wrap_text=True, vertical="top")
+            if answered:
+                ws[f"C{row}"] = rng.choice(_ANSWER_TEMPLATES).format(topic=topic, client=client)
+                ws[f"D{row}"] = rng.choice(STATUS_CHOICES)
+            row += 1
+            written += 1
+        # Occasional spacer row between sections
+        if rng.random() < 0.3:
+            row += 1
+
+    return {"section_rows": section_rows, "last_row": row - 1}
+
+
+def build_questionnaire(
+    path: Path,
+    questions: int = 500,
+    sheets: int = 1,
+    answered: bool = False,
+    client: str = CLIENT,
+    section_size: int = 12,
+    seed: int = 0,
+) -> dict:
+    """Write a synthetic PAS questionnaire.
+
+    Args:
+        path: Destination .xlsx file.
+        questions: Total number of questions, spread over the sheets.
+        sheets: Number of questionnaire sheets ("Domaine 1", "Domaine 2"...).
+        answered: Fill the response and status columns (corpus entries).
+        client: Client name written in questions, answers, titles and properties.
+        section_size: Questions per section.
+        seed: Random seed (same seed, same workbook).
+
+    Returns:
+        {"path", "questions", "status_choices", "sheets": [{"name", "questions",
+        "validation", "section_rows", "structure"}]} — structure is the dict
+        expected by read_questions() / POST /structure for that sheet.
+    """
+    rng = random.Random(seed)
+    wb = Workbook()
+    wb.properties.creator = f"Direction des achats {client}"
+    wb.properties.lastModifiedBy = f"Acheteur {client}"
+    wb.properties.title = f"PAS {client}"
+
+    lists = wb.active
+    lists.title = _LISTS_SHEET
+    lists["A1"] = "Conformité"
+    for i, choice in enumerate(STATUS_CHOICES, start=2):
+        lists[f"A{i}"] = choice
+    choices_ref = f"'{_LISTS_SHEET}'!$A$2:$A${len(STATUS_CHOICES) + 1}"
+
+    # Shadowing traps: a broken workbook-level entry named like the local named
+    # ranges below, and a reference to an external workbook
+    wb.defined_names[_NAMED_RANGE] = DefinedName(_NAMED_RANGE, attr_text="#REF!")
+    wb.defined_names["Ancienne_cotation"] = DefinedName("Ancienne_cotation", attr_text="[1]Cotation!$A$1:$A$4")
+
+    sheet_infos = []
+    for sheet_no, (name, count) in enumerate(zip(_sheet_names(sheets), _split(questions, sheets)), start=1):
+        ws = wb.create_sheet(name)
+        layout = _fill_sheet(ws, count, sheet_no, rng, client, answered, section_size)
+        first, last = _HEADER_ROW + 1, max(layout["last_row"], _HEADER_ROW + 1)
+
+        kind = VALIDATION_KINDS[(sheet_no - 1) % len(VALIDATION_KINDS)]
+        if kind == "inline":
+            formula = '"' + ",".join(STATUS_CHOICES) + '"'
+        elif kind == "range":
+            formula = choices_ref
+        else:
+            formula = _NAMED_RANGE
+            ws.defined_names[_NAMED_RANGE] = DefinedName(_NAMED_RANGE, attr_text=choices_ref)
+        dv = DataValidation(type="list", formula1=formula, allow_blank=True)
+        dv.add(f"D{first}:D{last}")
+        ws.add_data_validation(dv)
+        ws.print_area = f"A1:D{last}"
+
+        sheet_infos.append({
+            "name": name,
+            "questions": count,
+            "validation": kind,
+            "section_rows": layout["section_rows"],
+            "structure": {
+                "selected_sheet": name,
+                "header_row": _HEADER_ROW,
+                "first_data_row": first,
+                "col_id": "A",
+                "col_question": "B",
+                "col_response": "C",
+                "col_status": "D",
+            },
+        })
+
+    # Questionnaire sheets first, lists last (as in most client files)
+    wb.move_sheet(lists, offset=len(wb.sheetnames) - 1)
+    wb.active = 0
+    path.parent.mkdir(parents=True, exist_ok=True)
+    wb.save(path)
+    return {"path": path, "questions": questions, "status_choices": list(STATUS_CHOICES), "sheets": sheet_infos}
+
+
+# ---------------------------------------------------------------------------
+# Corpus entries
+# ---------------------------------------------------------------------------
+
+_PROFILES = (
+    {"type_prestation": "AT", "hebergement_donnees": "SI CLIENT", "poste_travail": "CLIENT",
+     "lieu_travail": ["Site CLIENT"], "sous_traitance_rgpd": False},
+    {"type_prestation": "CDS", "hebergement_donnees": "FOURNISSEUR", "poste_travail": "FOURNISSEUR",
+     "lieu_travail": ["Agence FOURNISSEUR", "Télétravail"], "sous_traitance_rgpd": True},
+    {"type_prestation": "CDR", "hebergement_donnees": "Cloud", "poste_travail": "FOURNISSEUR",
+     "lieu_travail": ["Agence FOURNISSEUR"], "sous_traitance_rgpd": True, "cloud_provider": "OVHcloud"},
+    {"type_prestation": "CDC", "hebergement_donnees": "SI CLIENT", "poste_travail": "CLIENT",
+     "lieu_travail": ["Site CLIENT", "Télétravail"], "sous_traitance_rgpd": False},
+)
+
+
+def write_corpus_entry(
+    corpus_dir: Path,
+    questions: int = 300,
+    client: str = CLIENT,
+    alias: str = CLIENT_ALIAS,
+    seed: int = 0,
+) -> str:
+    """Write one answered, already anonymized corpus entry (data/corpus layout).
+
+    Writes original.xlsx, anonymized.xlsx (same content, client replaced by
+    alias), anonymized_map.json, structure.json and metadata.json. The caller
+    builds the Q/A artifact (corpus_qa.build_qa_artifact) if it needs one.
+
+    Args:
+        corpus_dir: Corpus root (data/corpus).
+        questions: Number of answered questions.
+        client: Client name in the original file.
+        alias: Replacement of the client name in the anonymized file.
+        seed: Random seed; also selects the cadrage profile of the entry.
+
+    Returns:
+        corpus_id of the new entry.
+    """
+    rng = random.Random(seed)
+    corpus_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+    entry_dir = corpus_dir / corpus_id
+    entry_dir.mkdir(parents=True, exist_ok=True)
+
+    build_questionnaire(entry_dir / "original.xlsx", questions, answered=True, client=client, seed=seed)
+    info = build_questionnaire(entry_dir / "anonymized.xlsx", questions, answered=True, client=alias, seed=seed)
+    (entry_dir / "anonymized_map.json").write_text(
+        json.dumps({client: alias}, ensure_ascii=False, indent=2), encoding="utf-8"
+    )
+    (entry_dir / "structure.json").write_text(
+        json.dumps(info["sheets"][0]["structure"], ensure_ascii=False, indent=2), encoding="utf-8"
+    )
+
+    profile = _PROFILES[seed % len(_PROFILES)]
+    meta = {
+        "filename": f"PAS_{client.replace(' ', '_')}_{seed}.xlsx",
+        "format": "xlsx",
+        "pas_niveau_entreprise": False,
+        "activites": rng.choice(["Développement", "Tests et recette", "Analyse métier", "Infogérance"]),
+        "secteur_client": rng.choice(["Public", "Privé"]),
+        "date_remplissage": f"{2020 + seed % 5}-{1 + seed % 12:02d}-15",
+        "tags_supplementaires": [],
+        "nb_etp": 1 + rng.randrange(30),
+        "expertise_atlassian": rng.random() < 0.2,
+        "cloud_provider": "",
+        "agences": "",
+        "connexion_distante": "",
+        **profile,
+    }
+    (entry_dir / "metadata.json").write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+    return corpus_id
+
+
+def write_corpus(corpus_dir: Path, entries: int = 10, questions: int = 300, seed: int = 0) -> list[str]:
+    """Write several corpus entries with varied cadrage profiles.
+
+    Returns:
+        The corpus_ids, in creation order.
+    """
+    return [write_corpus_entry(corpus_dir, questions, seed=seed + i) for i in range(entries)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate synthetic PAS questionnaires and corpus entries.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    q = sub.add_parser("questionnaire", help="write one questionnaire")
+    q.add_argument("path", type=Path)
+    q.add_argument("--questions", type=int, default=500)
+    q.add_argument("--sheets", type=int, default=1)
+    q.add_argument("--answered", action="store_true")
+    q.add_argument("--seed", type=int, default=0)
+
+    c = sub.add_parser("corpus", help="write corpus entries into a data/corpus directory")
+    c.add_argument("corpus_dir", type=Path)
+    c.add_argument("--entries", type=int, default=10)
+    c.add_argument("--questions", type=int, default=300)
+    c.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+    if args.command == "questionnaire":
+        info = build_questionnaire(args.path, args.questions, args.sheets, args.answered, seed=args.seed)
+        print(json.dumps({**info, "path": str(info["path"])}, ensure_ascii=False, indent=2))
+    else:
+        for corpus_id in write_corpus(args.corpus_dir, args.entries, args.questions, args.seed):
+            print(corpus_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""PAS Assistant — Regression check of the raw entry copy of ZipRewriter.
+
+ZipRewriter.copy() writes an entry's local header and compressed bytes itself,
+then registers the entry in the destination ZipFile's private state (filelist,
+NameToInfo, start_dir, _didModify) so that ZipFile.close() writes the central
+directory. This check catches a Python upgrade that changes that state.
+
+A multi-entry package is built with the entry shapes seen in the wild:
+deflated and stored entries, an entry with zip64 extra fields, and entries
+followed by a data descriptor (written to an unseekable stream, as by
+streaming zip writers). It is rewritten twice, once copying every entry and
+once alternating copy(), write() and open_write(). Each output must pass
+testzip(), have local headers consistent with the central directory, and
+hold the same entries, in the same order, with byte-identical contents. It is
+also rewritten in place (dest_path == source_path).
+
+Usage (from _vXX/):
+    python bench/zip_rewrite_check.py
+"""
+
+import io
+import random
+import struct
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+
+_BENCH_DIR = Path(__file__).resolve().parent
+_APP_DIR = _BENCH_DIR.parent
+sys.path.insert(0, str(_APP_DIR))
+
+from app.services.zip_rewrite import (  # noqa: E402
+    _FLAG_DATA_DESCRIPTOR, _LOCAL_HEADER, _LOCAL_HEADER_SIGNATURE, ZipRewriter,
+)
+
+_ZIP64_EXTRA_ID = 0x0001
+_DESCRIPTOR_SIGNATURE = b"PK\x07\x08"
+
+
+class _Unseekable(io.RawIOBase):
+    """Write-only stream without seek(): zipfile falls back to data descriptors."""
+
+    def __init__(self) -> None:
+        self.buffer = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.buffer += data
+        return len(data)
+
+
+def _contents() -> dict[str, bytes]:
+    """Entry contents: compressible XML, incompressible binary, empty entry."""
+    rng = random.Random(22)
+    rows = "".join(f'<row r="{i}"><c r="A{i}" t="s"><v>{i}</v></c></row>' for i in range(1, 5000))
+    return {
+        "[Content_Types].xml": b'<?xml version="1.0"?><Types/>',
+        "xl/worksheets/sheet1.xml": f"<worksheet><sheetData>{rows}</sheetData></worksheet>".encode(),
+        "xl/media/image1.png": rng.randbytes(200_000),
+        "xl/sharedStrings.xml": ("<sst>" + "<si><t>Société ACME</t></si>" * 2000 + "</sst>").encode(),
+        "docProps/core.xml": b"<cp:coreProperties/>",
+        "xl/empty.bin": b"",
+    }
+
+
+def _build_package(path: Path, contents: dict[str, bytes]) -> None:
+    """Write the source package: half of the entries through an unseekable stream."""
+    names = list(contents)
+    stream = _Unseekable()
+    with zipfile.ZipFile(stream, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name in names[:3]:
+            with zf.open(name, "w") as out:
+                out.write(contents[name])
+    # Append the seekable entries to the package written with data descriptors
+    path.write_bytes(bytes(stream.buffer))
+    with zipfile.ZipFile(path, "a", zipfile.ZIP_DEFLATED) as zf:
+        for i, name in enumerate(names[3:]):
+            if i == 0:
+                info = zipfile.ZipInfo(name, date_time=(2024, 1, 2, 3, 4, 6))
+                info.compress_type = zipfile.ZIP_DEFLATED
+                with zf.open(info, "w", force_zip64=True) as out:
+                    out.write(contents[name])
+            else:
+                zf.writestr(name, contents[name], compress_type=zipfile.ZIP_STORED)
+
+
+def _local_extra_ids(path: Path, info: zipfile.ZipInfo) -> list[int]:
+    """Header IDs of the extra fields in the local header of an entry."""
+    with open(path, "rb") as f:
+        f.seek(info.header_offset)
+        fields = _LOCAL_HEADER.unpack(f.read(_LOCAL_HEADER.size))
+        name_len, extra_len = fields[-2:]
+        f.seek(name_len, io.SEEK_CUR)
+        extra = f.read(extra_len)
+    ids = []
+    while len(extra) >= 4:
+        header_id, size = struct.unpack("<2H", extra[:4])
+        ids.append(header_id)
+        extra = extra[4 + size:]
+    return ids
+
+
+def _check_source(path: Path) -> None:
+    """Make sure the source package has the entry shapes under test."""
+    with zipfile.ZipFile(path) as zf:
+        infos = zf.infolist()
+    assert any(i.flag_bits & _FLAG_DATA_DESCRIPTOR for i in infos), "no data descriptor entry"
+    assert any(i.compress_type == zipfile.ZIP_STORED for i in infos), "no stored entry"
+    assert any(_ZIP64_EXTRA_ID in _local_extra_ids(path, i) for i in infos), "no zip64 entry"
+
+
+def _check_layout(path: Path, label: str) -> None:
+    """Check each local header against the central directory, as streaming readers see it.
+
+    zipfile itself trusts the central directory; other readers walk the local
+    headers, and need a data descriptor after the data when bit 3 is set.
+    """
+    with zipfile.ZipFile(path) as zf, open(path, "rb") as f:
+        for info in zf.infolist():
+            f.seek(info.header_offset)
+            fields = _LOCAL_HEADER.unpack(f.read(_LOCAL_HEADER.size))
+            assert fields[0] == _LOCAL_HEADER_SIGNATURE, f"{label}: bad local header for {info.filename}"
+            flags, crc, compress_size = fields[2], fields[6], fields[7]
+            name_len, extra_len = fields[-2:]
+            assert flags == info.flag_bits, f"{label}: flags of {info.filename} differ"
+            f.seek(name_len + extra_len + info.compress_size, io.SEEK_CUR)
+            if flags & _FLAG_DATA_DESCRIPTOR:
+                descriptor = f.read(4)
+                if descriptor == _DESCRIPTOR_SIGNATURE:
+                    descriptor = f.read(4)
+                assert struct.unpack("<L", descriptor)[0] == info.CRC, f"{label}: no descriptor for {info.filename}"
+            else:
+                assert crc == info.CRC, f"{label}: local CRC of {info.filename} differs"
+                assert compress_size in (info.compress_size, 0xFFFFFFFF), f"{label}: local size of {info.filename}"
+
+
+def _check_output(path: Path, contents: dict[str, bytes], label: str) -> None:
+    _check_layout(path, label)
+    with zipfile.ZipFile(path) as zf:
+        bad = zf.testzip()
+        assert bad is None, f"{label}: corrupt entry {bad}"
+        names = zf.namelist()
+        assert names == list(contents), f"{label}: entries {names}"
+        for name, data in contents.items():
+            assert zf.read(name) == data, f"{label}: content of {name} differs"
+    print(f"{label}: ok ({len(contents)} entries)")
+
+
+def main() -> None:
+    contents = _contents()
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        source = tmp / "source.xlsx"
+        _build_package(source, contents)
+        _check_source(source)
+        _check_output(source, contents, "source")
+
+        copied = tmp / "copied.xlsx"
+        with ZipRewriter(source, copied) as rw:
+            for info in rw.infolist():
+                rw.copy(info)
+        _check_output(copied, contents, "copy")
+
+        mixed = tmp / "mixed.xlsx"
+        with ZipRewriter(source, mixed) as rw:
+            for i, info in enumerate(rw.infolist()):
+                if i % 3 == 0:
+                    rw.copy(info)
+                elif i % 3 == 1:
+                    rw.write(info, rw.read(info.filename))
+                else:
+                    with rw.open(info.filename) as src, rw.open_write(info) as out:
+                        out.write(src.read())
+        _check_output(mixed, contents, "copy + write + open_write")
+
+        with ZipRewriter(copied, copied) as rw:
+            for info in rw.infolist():
+                rw.copy(info)
+        _check_output(copied, contents, "copy in place")
+
+
+if __name__ == "__main__":
+    main()